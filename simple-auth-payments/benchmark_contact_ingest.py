@@ -0,0 +1,97 @@
+"""
+Benchmark /contacts/submit ingestion: one commit per lead vs group commit.
+
+Usage:
+  python benchmark_contact_ingest.py                     # 2,000 leads from 32 concurrent clients
+  python benchmark_contact_ingest.py --rows 10000 --clients 64
+
+Simulates concurrent request threads against a throwaway SQLite file database
+(never the configured one) and reports leads/second, latency and commits.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from database import Base
+import models
+from utils.group_commit import GroupCommitWriter
+
+
+def arg(name, default):
+    return int(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+rows = arg("--rows", 2000)
+clients = arg("--clients", 32)
+
+
+def new_contact(i):
+    now = datetime.utcnow()
+    return models.ContactRequest(
+        first_name="Bench", last_name=f"Lead{i}", email=f"lead{i}@example.com",
+        phone=str(500000000 + i), country_code="+966", country="Saudi Arabia",
+        business_name="Benchmark Co.", num_locations="1", referral_source="search",
+        marketing_consent=False, language_preference="en", status="new",
+        created_at=now, updated_at=now
+    )
+
+
+def run(label, submit_factory):
+    path = os.path.join(tempfile.mkdtemp(), "benchmark_ingest.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    commits = [0]
+    event.listen(engine, "commit", lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+    submit, cleanup = submit_factory(engine)
+    latencies = []
+
+    def one(i):
+        started = time.perf_counter()
+        contact = submit(new_contact(i))
+        latencies.append(time.perf_counter() - started)
+        return contact.id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        ids = list(pool.map(one, range(rows)))
+    elapsed = time.perf_counter() - started
+    cleanup()
+
+    assert len(set(ids)) == rows and None not in ids
+    with Session(bind=engine) as session:
+        assert session.query(models.ContactRequest).count() == rows
+
+    latencies.sort()
+    print(
+        f"{label:<16}{rows / elapsed:>12,.0f}{statistics.median(latencies) * 1000:>10.1f}"
+        f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.1f}{commits[0]:>10,}"
+    )
+    engine.dispose()
+    os.remove(path)
+
+
+def per_row(engine):
+    def submit(contact):
+        with Session(bind=engine) as session:
+            session.add(contact)
+            session.commit()
+            session.refresh(contact)
+            return contact
+    return submit, lambda: None
+
+
+def grouped(engine):
+    writer = GroupCommitWriter(engine, max_rows=100, max_wait_ms=10)
+    return writer.submit, writer.stop
+
+
+print(f"{rows:,} leads, {clients} concurrent clients")
+print(f"{'mode':<16}{'leads/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'commits':>10}")
+run("commit per lead", per_row)
+run("group commit", grouped)
@@ -0,0 +1,119 @@
+"""
+Benchmark CSV import duplicate detection: per-row lookups vs the chunked
+IN lookups in CSVImporter.match_and_report.
+
+Usage:
+  python benchmark_csv_duplicates.py                          # 100,000 CSV rows against 1,000,000 leads
+  python benchmark_csv_duplicates.py --rows 20000 --leads 200000
+
+Runs against a throwaway SQLite database, never the configured one. The
+per-row baseline is timed on the first --sample rows and extrapolated.
+A third of the CSV rows match an existing lead by email, a third by phone.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from database import Base
+import models
+from utils import lead_keys
+from utils.csv_importer import CSVImporter
+
+
+def arg(name, default):
+    return int(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+rows = arg("--rows", 100_000)
+leads = arg("--leads", 1_000_000)
+sample = min(arg("--sample", 5_000), rows)
+
+path = os.path.join(tempfile.mkdtemp(), "benchmark_csv_duplicates.db")
+engine = create_engine(f"sqlite:///{path}")
+Base.metadata.create_all(bind=engine)
+queries = [0]
+event.listen(engine, "before_cursor_execute", lambda *args: queries.__setitem__(0, queries[0] + 1))
+
+print(f"Generating {leads:,} leads...")
+now = datetime.utcnow()
+with engine.begin() as conn:
+    batch = []
+    for i in range(leads):
+        email = f"lead{i}@example.com"
+        phone = str(500000000 + i)
+        batch.append({
+            "first_name": "Existing", "last_name": f"Lead{i}", "email": email, "phone": phone,
+            "country_code": "+966", "country": "Saudi Arabia", "business_name": "Benchmark Co.",
+            "num_locations": "1", "referral_source": "search", "marketing_consent": False,
+            "language_preference": "en", "status": "new", "created_at": now, "updated_at": now,
+            "email_norm": lead_keys.normalize_email(email),
+            "phone_norm": lead_keys.normalize_phone(phone, "+966")
+        })
+        if len(batch) == 10_000:
+            conn.execute(insert(models.ContactRequest), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(models.ContactRequest), batch)
+
+
+def csv_row(i):
+    # Spread matches across the table: email match, phone match, new lead
+    existing = i * (leads // rows or 1) % leads
+    kind = i % 3
+    return {
+        "first_name": "Csv", "last_name": f"Row{i}",
+        "email": f"lead{existing}@example.com" if kind == 0 else f"csv{i}@example.org",
+        "phone": f"0{500000000 + existing}" if kind == 1 else str(700000000 + i),
+        "country_code": "+966", "row_number": i + 2
+    }
+
+
+csv_rows = [csv_row(i) for i in range(rows)]
+
+
+def per_row(db, leads):
+    # The previous implementation: up to two queries per row
+    found = 0
+    for lead in leads:
+        if db.query(models.ContactRequest).filter(
+            models.ContactRequest.email_norm == lead_keys.normalize_email(lead['email'])
+        ).first():
+            found += 1
+            continue
+        phone_norm = lead_keys.normalize_phone(lead['phone'], lead['country_code'])
+        if phone_norm and db.query(models.ContactRequest).filter(
+            models.ContactRequest.phone_norm == phone_norm
+        ).first():
+            found += 1
+    return found
+
+
+def timed(function, *args):
+    queries[0] = 0
+    with Session(bind=engine) as session:
+        started = time.perf_counter()
+        result = function(session, *args)
+        return result, time.perf_counter() - started, queries[0]
+
+
+found, elapsed, count = timed(per_row, csv_rows[:sample])
+scale = rows / sample
+print()
+print(f"{'method':<22}{'rows':>10}{'seconds':>10}{'queries':>10}{'duplicates':>12}")
+print(f"{'per-row (sampled)':<22}{sample:>10,}{elapsed:>10.2f}{count:>10,}{found:>12,}")
+print(f"{'per-row (projected)':<22}{rows:>10,}{elapsed * scale:>10.2f}{int(count * scale):>10,}{'':>12}")
+
+def chunked(db, leads):
+    importer = CSVImporter(db)
+    _, duplicates = importer.match_and_report(leads, importer.normalize_keys(leads))
+    return len(duplicates)
+
+
+found, elapsed, count = timed(chunked, csv_rows)
+print(f"{'chunked IN':<22}{rows:>10,}{elapsed:>10.2f}{count:>10,}{found:>12,}")
+
+engine.dispose()
+os.remove(path)
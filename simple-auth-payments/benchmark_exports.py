@@ -0,0 +1,89 @@
+"""
+Benchmark the lead export formats: bytes on the wire and CPU time for
+CSV / NDJSON, plain and gzip.
+
+Usage:
+  python benchmark_exports.py              # 100,000 synthetic leads in a temporary SQLite DB
+  python benchmark_exports.py --rows 500000
+
+Runs against a throwaway database, never the configured one.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from database import Base
+import models
+from routers.contacts import CONTACT_EXPORT_COLUMNS, CONTACT_EXPORT_HEADER, contact_export_row
+from utils import exports
+
+rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 100_000
+
+path = os.path.join(tempfile.mkdtemp(), "benchmark_exports.db")
+engine = create_engine(f"sqlite:///{path}")
+Base.metadata.create_all(bind=engine)
+
+print(f"Generating {rows:,} leads...")
+first_names = ["John", "Sara", "محمد", "أحمد", "Fatima", "Omar", "Lina", "Khalid", "نورة", "Ali"]
+countries = ["Saudi Arabia", "Egypt", "UAE", "Jordan", "United States"]
+now = datetime.utcnow()
+with engine.begin() as conn:
+    batch = []
+    for i in range(rows):
+        created = now - timedelta(minutes=i)
+        batch.append({
+            "first_name": random.choice(first_names),
+            "last_name": f"Lastname{i % 5000}",
+            "email": f"lead{i}@example{i % 300}.com",
+            "phone": str(500000000 + i),
+            "country_code": "+966",
+            "country": random.choice(countries),
+            "business_name": f"Business {i % 20000} Trading Co.",
+            "num_locations": random.choice(["1", "2-5", "6-10", "10+"]),
+            "referral_source": random.choice(["google", "instagram", "friend", "other"]),
+            "marketing_consent": i % 2 == 0,
+            "language_preference": random.choice(["en", "ar"]),
+            "status": random.choice(["new", "contacted", "qualified"]),
+            "created_at": created,
+            "updated_at": created
+        })
+        if len(batch) == 10_000:
+            conn.execute(insert(models.ContactRequest), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(models.ContactRequest), batch)
+
+with Session(bind=engine) as session:
+    statement = session.query(*CONTACT_EXPORT_COLUMNS).order_by(models.ContactRequest.created_at.desc()).statement
+
+
+def run(format, compression):
+    if format == "ndjson":
+        chunks = exports.ndjson_stream(engine, statement)
+    else:
+        chunks = exports.csv_stream(engine, statement, CONTACT_EXPORT_HEADER, contact_export_row)
+    if compression == "gzip":
+        chunks = exports.gzip_stream(chunks)
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    size = sum(len(chunk) for chunk in chunks)
+    return size, time.process_time() - cpu_started, time.perf_counter() - wall_started
+
+
+print()
+print(f"{'format':<14}{'bytes':>16}{'ratio':>9}{'cpu s':>9}{'wall s':>9}")
+baseline = None
+for format in exports.FORMATS:
+    for compression in (None, "gzip"):
+        size, cpu, wall = run(format, compression)
+        baseline = baseline or size
+        label = format + (".gz" if compression else "")
+        print(f"{label:<14}{size:>16,}{size / baseline:>9.2f}{cpu:>9.2f}{wall:>9.2f}")
+
+engine.dispose()
+os.remove(path)
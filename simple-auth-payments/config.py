@@ -23,6 +23,23 @@ class Settings(BaseSettings):
     ADMIN_PANEL_URL: Optional[str] = "http://localhost:8000/admin.html"
     ENABLE_EMAIL_NOTIFICATIONS: Optional[bool] = False
 
+    # Background export jobs
+    EXPORT_DIR: str = "exports"
+    EXPORT_TTL_HOURS: int = 24
+    EXPORT_MAX_ACTIVE_JOBS_PER_USER: int = 2
+
+    # Validated CSV imports waiting for execute
+    IMPORT_DIR: str = "imports"
+    IMPORT_SESSION_TTL_MINUTES: int = 60
+
+    # Batch /contacts/submit inserts into group commits (opt-in, for campaign bursts)
+    CONTACT_GROUP_COMMIT: bool = False
+    CONTACT_GROUP_COMMIT_MAX_ROWS: int = 100
+    CONTACT_GROUP_COMMIT_MAX_WAIT_MS: int = 10
+
+    # Assign new leads automatically: round_robin, least_loaded or country_affinity (unset = manual)
+    LEAD_AUTO_ASSIGN_STRATEGY: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
@@ -9,7 +9,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
-from database import Base, get_db
+from database import Base, get_db, enable_sqlite_savepoints
 from main import app
 from models import User, ContactRequest, LeadAssignment
 from utils.security import hash_password
@@ -26,6 +26,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,  # Critical: keeps the in-memory database alive
 )
+enable_sqlite_savepoints(engine)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,11 +1,31 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
+
+
+def enable_sqlite_savepoints(engine) -> None:
+    """
+    Make begin_nested() savepoints nest inside a real transaction on SQLite.
+    pysqlite only sends BEGIN ahead of INSERT/UPDATE, so a SAVEPOINT that comes
+    first opens the transaction itself and its RELEASE commits it. BEGIN is
+    sent just before such a savepoint; transactions without savepoints keep
+    pysqlite's behaviour (reads hold no lock between statements).
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "savepoint")
+    def _begin_before_savepoint(connection, name):
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+
+
 engine = create_engine(
     settings.DATABASE_URL, connect_args={"check_same_thread": False}
 )
+enable_sqlite_savepoints(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -14,7 +14,7 @@ from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from database import engine, Base, SessionLocal
 import models
-from routers import auth, payments, admin, contacts
+from routers import auth, payments, admin, contacts, exports
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -25,6 +25,14 @@ import time
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Add columns/indexes introduced after the database was first created
+from utils.schema import upgrade_schema
+upgrade_schema(engine)
+
+# Full-text lead search (SQLite FTS5 table + sync triggers; backfilled when first created)
+from utils.search import ensure_search_index
+ensure_search_index(engine)
+
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
@@ -129,12 +137,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 # Mount static files AFTER CORS
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+# Stops the export cleanup thread started at startup
+_export_cleanup_stop = None
+
+
 @app.on_event("startup")
 def seed_bundles():
     """Seed initial bundles and default admin user if they don't exist"""
@@ -147,6 +160,53 @@ def seed_bundles():
     # NO AUTO-RESTORE - Only create default data if needed
     db = SessionLocal()
     try:
+        # Seed stats counters on first start (or after restoring an older backup)
+        from utils.stats_counters import rebuild_counters, record_user_created
+        from utils.analytics import mark_day_dirty, rebuild_rollups
+        from datetime import datetime
+        # Duplicate-detection keys for leads stored before the columns existed
+        from utils.lead_keys import backfill as backfill_lead_keys
+        backfilled = backfill_lead_keys(db)
+        if backfilled:
+            print(f"✓ Computed duplicate-detection keys for {backfilled} lead(s)")
+        
+        if db.query(models.StatsCounter).first() is None:
+            rebuild_counters(db)
+            db.commit()
+            print("✓ Built stats counters")
+        
+        # Build analytics rollups on first start; afterwards they are refreshed incrementally
+        if db.query(models.DailyRollup).first() is None and db.query(models.RollupDirtyDay).first() is None:
+            rebuild_rollups(db)
+            db.commit()
+        
+        # Same for the lead funnel rollups
+        from utils.lead_funnel import rebuild_funnel
+        if db.query(models.LeadFunnelRollup).first() is None and db.query(models.ContactRequest).first() is not None:
+            rebuild_funnel(db)
+            db.commit()
+        
+        # Release export jobs left running by a previous process and drop expired files
+        from utils import export_jobs
+        if export_jobs.fail_interrupted(db) + export_jobs.cleanup_expired(db):
+            db.commit()
+        # ...and keep doing so while the process runs
+        global _export_cleanup_stop
+        _export_cleanup_stop = export_jobs.start_cleanup_thread(engine)
+        
+        # Drop staged CSV imports that were never executed
+        from utils import import_sessions
+        if import_sessions.cleanup_expired(db):
+            db.commit()
+        
+        # Resume import jobs whose worker died, from their last committed chunk
+        from utils import import_jobs
+        requeued = import_jobs.requeue_interrupted(db)
+        if requeued:
+            db.commit()
+        for job_id in requeued:
+            import_jobs.start_in_thread(engine, job_id)
+        
         # Always ensure default admin exists
         admin = db.query(models.User).filter(models.User.email == "admin@admin.com").first()
         if not admin:
@@ -159,6 +219,8 @@ def seed_bundles():
                 is_verified=True
             )
             db.add(default_admin)
+            record_user_created(db, default_admin)
+            mark_day_dirty(db, datetime.utcnow())
             db.commit()
             print("✓ Created default admin user")
             print("  Email: admin@admin.com")
@@ -201,11 +263,25 @@ def seed_bundles():
         db.close()
 
 
+@app.on_event("shutdown")
+def flush_group_commits():
+    """Commit any contact submissions still queued for the group-commit writer"""
+    from utils.group_commit import stop_all
+    stop_all()
+
+
+@app.on_event("shutdown")
+def stop_export_cleanup():
+    if _export_cleanup_stop is not None:
+        _export_cleanup_stop.set()
+
+
 # Include routers with rate limiting
 app.include_router(auth.router)
 app.include_router(payments.router)
 app.include_router(admin.router)
 app.include_router(contacts.router)
+app.include_router(exports.router)
 
 # Apply rate limiting to specific endpoints
 @app.middleware("http")
@@ -0,0 +1,91 @@
+"""
+Merge duplicate leads that share a normalized email or phone number.
+
+Usage:
+  python merge_duplicate_leads.py           # dry run: list what would be merged
+  python merge_duplicate_leads.py --apply   # merge
+
+For each group the oldest lead is kept. Notes from the other leads move to
+it, it inherits an assignment if it has none, and its duplicate_count grows
+by the number of leads merged into it. The other leads are then deleted,
+leaving tombstones so /admin/changes reports them.
+Each group is merged in its own transaction.
+"""
+import sys
+from sqlalchemy import func
+from database import SessionLocal, Base, engine
+import models
+from utils import changes, lead_keys, stats_counters
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+apply = "--apply" in sys.argv
+
+db = SessionLocal()
+try:
+    backfilled = lead_keys.backfill(db)
+    if backfilled:
+        print(f"✓ Computed keys for {backfilled} lead(s)")
+
+    groups = lead_keys.duplicate_groups(db)
+    print(f"Found {len(groups)} duplicate group(s) covering {sum(len(g) for g in groups)} lead(s)")
+
+    merged = 0
+    for group in groups:
+        survivor_id, duplicate_ids = group[0], group[1:]
+        survivor = db.get(models.ContactRequest, survivor_id)
+        duplicates = db.query(models.ContactRequest).filter(models.ContactRequest.id.in_(duplicate_ids)).all()
+        print(f"  #{survivor_id} {survivor.email} <- " + ", ".join(f"#{d.id} {d.email}" for d in duplicates))
+        if not apply:
+            continue
+
+        # Notes and status history follow the surviving lead
+        for model in (models.ContactNote, models.LeadStatusChange):
+            db.query(model).filter(
+                model.contact_request_id.in_(duplicate_ids)
+            ).update({model.contact_request_id: survivor_id}, synchronize_session=False)
+
+        # Keep the survivor's assignment, or adopt the earliest one from a duplicate
+        assignments = db.query(models.LeadAssignment).filter(
+            models.LeadAssignment.contact_request_id.in_(duplicate_ids)
+        ).order_by(models.LeadAssignment.assigned_at).all()
+        has_assignment = db.query(models.LeadAssignment).filter(
+            models.LeadAssignment.contact_request_id == survivor_id
+        ).first() is not None
+        for assignment in assignments:
+            changes.record_deletion(db, "lead_assignments", assignment.contact_request_id, owner_id=assignment.salesman_id)
+            if not has_assignment:
+                assignment.contact_request_id = survivor_id
+                has_assignment = True
+            else:
+                db.delete(assignment)
+        db.flush()
+
+        survivor.duplicate_count = (survivor.duplicate_count or 0) + sum(
+            (d.duplicate_count or 0) + 1 for d in duplicates
+        )
+        submitted = [d.last_submitted_at or d.created_at for d in duplicates] + [survivor.last_submitted_at]
+        survivor.last_submitted_at = max(moment for moment in submitted if moment)
+        stats_counters.bump(db, stats_counters.LEADS_DUPLICATES, len(duplicates))
+
+        # Delta-sync clients drop the merged-away leads
+        changes.record_deletions(db, "contacts", [(lead_id, None) for lead_id in duplicate_ids])
+        db.query(models.ContactRequest).filter(
+            models.ContactRequest.id.in_(duplicate_ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        merged += len(duplicates)
+
+    if apply:
+        remaining = db.query(func.count(models.ContactRequest.id)).scalar()
+        print(f"✓ Merged {merged} duplicate lead(s); {remaining} lead(s) remain")
+    elif groups:
+        print("Dry run only. Re-run with --apply to merge.")
+except Exception as e:
+    print(f"✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    db.rollback()
+finally:
+    db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, ForeignKey, DateTime, Date, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -15,6 +15,8 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     role = Column(String, default="user")
     allow_access_without_subscription = Column(Boolean, default=False)  # Admin override
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # NULL for users created before this column existed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     payments = relationship("Payment", back_populates="user")
     subscriptions = relationship("Subscription", back_populates="user")
@@ -33,6 +35,7 @@ class Bundle(Base):
     logo_type = Column(String, default="silver")  # silver, gold, diamond
     description = Column(String, nullable=True)  # Custom or predefined description
     main_description = Column(String, nullable=True)  # Custom main description
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     payments = relationship("Payment", back_populates="bundle")
     subscriptions = relationship("Subscription", back_populates="bundle")
@@ -48,7 +51,7 @@ class DiscountRule(Base):
     discount_percentage = Column(Integer, nullable=False)  # Discount percentage (e.g., 10)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 
 class Payment(Base):
@@ -61,11 +64,12 @@ class Payment(Base):
     amount_cents = Column(Integer, nullable=False)
     currency = Column(String, default="usd")
     status = Column(String, default="pending")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     subscription_end_date = Column(DateTime, nullable=True)  # 30 days from payment
     looker_studio_url = Column(String, nullable=True)  # Custom Looker Studio link
     months_purchased = Column(Integer, default=1)  # Number of months purchased
     discount_percentage = Column(Integer, default=0)  # Discount applied
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="payments")
     bundle = relationship("Bundle", back_populates="payments")
@@ -82,6 +86,7 @@ class Subscription(Base):
     is_active = Column(Boolean, default=True)
     auto_renew = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="subscriptions")
     bundle = relationship("Bundle", back_populates="subscriptions")
@@ -94,7 +99,7 @@ class Dashboard(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     looker_studio_url = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="dashboard")
 
@@ -116,17 +121,35 @@ class ContactRequest(Base):
     language_preference = Column(String(10), default="en")
     status = Column(String(50), default="new")
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Normalized identity keys for duplicate detection (maintained by _set_lead_keys below)
+    email_norm = Column(String(255), nullable=True, index=True)
+    phone_norm = Column(String(20), nullable=True, index=True)  # E.164
+    duplicate_count = Column(Integer, default=0)  # repeat submissions linked to this lead
+    last_submitted_at = Column(DateTime, nullable=True)
 
     notes = relationship("ContactNote", back_populates="contact_request", cascade="all, delete-orphan")
     assignment = relationship("LeadAssignment", back_populates="contact_request", uselist=False)
 
+    __table_args__ = (
+        Index("ix_contact_requests_created_at_id", "created_at", "id"),
+    )
+
+
+@event.listens_for(ContactRequest, "before_insert")
+@event.listens_for(ContactRequest, "before_update")
+def _set_lead_keys(mapper, connection, target):
+    """Keep email_norm / phone_norm in step with email and phone on every ORM write"""
+    from utils.lead_keys import apply_keys
+    apply_keys(target)
+
 
 class ContactNote(Base):
     __tablename__ = "contact_notes"
 
     id = Column(Integer, primary_key=True, index=True)
-    contact_request_id = Column(Integer, ForeignKey("contact_requests.id"), nullable=False)
+    contact_request_id = Column(Integer, ForeignKey("contact_requests.id"), nullable=False, index=True)
     admin_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     note_text = Column(String(2000), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -134,18 +157,194 @@ class ContactNote(Base):
     contact_request = relationship("ContactRequest", back_populates="notes")
     admin = relationship("User")
 
+    __table_args__ = (
+        Index("ix_contact_notes_admin_id_created_at", "admin_id", "created_at"),
+        Index("ix_contact_notes_contact_request_id_created_at_id", "contact_request_id", "created_at", "id"),
+    )
+
 
 class LeadAssignment(Base):
     __tablename__ = "lead_assignments"
 
     id = Column(Integer, primary_key=True, index=True)
     contact_request_id = Column(Integer, ForeignKey("contact_requests.id"), nullable=False, unique=True)
-    salesman_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    salesman_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     assigned_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assigned_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     contact_request = relationship("ContactRequest", back_populates="assignment")
     salesman = relationship("User", foreign_keys=[salesman_id])
     assigned_by = relationship("User", foreign_keys=[assigned_by_id])
 
+
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+
+    name = Column(String(100), primary_key=True)  # e.g. "users_total", "payments:succeeded", "revenue_cents:usd"
+    value = Column(Integer, nullable=False, default=0)
+
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    metric = Column(String(20), nullable=False)  # "revenue" or "signups"
+    bundle_id = Column(Integer, nullable=True)  # revenue only
+    currency = Column(String(10), nullable=True)  # revenue only
+    count = Column(Integer, default=0)  # succeeded payments or new users
+    amount_cents = Column(Integer, default=0)  # revenue only
+
+    __table_args__ = (
+        Index("ix_daily_rollups_metric_day", "metric", "day"),
+    )
+
+
+class LeadStatusChange(Base):
+    __tablename__ = "lead_status_changes"
+
+    # Append-only history of lead status changes (source for the funnel rollups)
+    id = Column(Integer, primary_key=True, index=True)
+    contact_request_id = Column(Integer, ForeignKey("contact_requests.id"), nullable=False, index=True)
+    from_status = Column(String(50), nullable=False)
+    to_status = Column(String(50), nullable=False)
+    changed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class LeadEvent(Base):
+    __tablename__ = "lead_events"
+
+    # Short-lived log of lead activity for the admin event stream (see utils/lead_events.py)
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(30), nullable=False)
+    contact_request_id = Column(Integer, nullable=False)
+    salesman_id = Column(Integer, nullable=True)  # lead's salesman when the event happened
+    payload = Column(Text, nullable=True)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # AUTOINCREMENT so ids are never reused after pruning (clients resume by id)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class LeadFunnelRollup(Base):
+    __tablename__ = "lead_funnel_rollups"
+
+    # Leads entering a status per day and lead segment. from_status is "created"
+    # for new leads (to_status is then their initial status). Rows are bumped
+    # without a unique key, so readers always SUM(count).
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    from_status = Column(String(50), nullable=False)
+    to_status = Column(String(50), nullable=False)
+    country = Column(String(100), nullable=False, default="")
+    referral_source = Column(String(100), nullable=False, default="")
+    language_preference = Column(String(10), nullable=False, default="")
+    num_locations = Column(String(20), nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_lead_funnel_rollups_day", "day"),
+    )
+
+
+class RollupDirtyDay(Base):
+    __tablename__ = "rollup_dirty_days"
+
+    # Append-only queue of days whose rollups must be recomputed.
+    # Duplicates are fine; the refresh job collapses them.
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+
+
+class DeletedRecord(Base):
+    __tablename__ = "deleted_records"
+
+    # Tombstones for /admin/changes so clients can drop deleted rows
+    id = Column(Integer, primary_key=True, index=True)
+    feed = Column(String(50), nullable=False)  # e.g. "users", "discount_rules", "lead_assignments"
+    record_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=True)  # lead_assignments: the salesman the lead was taken from
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_deleted_records_feed_deleted_at", "feed", "deleted_at"),
+    )
+
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    # Background export written to disk and downloaded later (see utils/export_jobs.py)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    kind = Column(String(50), nullable=False)  # "contacts" or "payments"
+    params = Column(Text, nullable=True)  # JSON of the filters used
+    format = Column(String(20), nullable=False, default="csv")
+    compression = Column(String(20), nullable=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed, expired
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=True)
+    rows_total = Column(Integer, nullable=True)
+    rows_written = Column(Integer, default=0)
+    bytes_written = Column(BigInteger, default=0)
+    error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User")
+
+
+class ImportSession(Base):
+    __tablename__ = "import_sessions"
+
+    # CSV rows parsed and duplicate-checked by /admin/leads/import/validate, kept on disk
+    # until /admin/leads/import/execute runs them or they expire (see utils/import_sessions.py)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=True)
+    status = Column(String(20), nullable=False, default="ready", index=True)  # ready, executing, executed, failed, expired
+    valid_rows = Column(Integer, default=0)
+    invalid_rows = Column(Integer, default=0)
+    duplicate_count = Column(Integer, default=0)
+    error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    executed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+
+    user = relationship("User")
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    # Background run of a staged import session, checkpointed per chunk (see utils/import_jobs.py)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    import_session_id = Column(Integer, ForeignKey("import_sessions.id"), nullable=False, index=True)
+    duplicate_action = Column(String(20), nullable=False, default="skip")
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed, cancelled
+    cancel_requested = Column(Boolean, default=False)
+    rows_total = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, default=0)  # staged rows committed so far; a resumed run starts after them
+    rows_at_start = Column(Integer, default=0)  # rows_done when the current run started (for the rate / ETA)
+    imported = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    failed_rows = Column(Text, nullable=True)  # JSON list of {"row", "error"}
+    attempts = Column(Integer, default=0)
+    error = Column(String(1000), nullable=True)
+    lease_owner = Column(String(100), nullable=True)  # worker running the job (host:pid:token)
+    heartbeat_at = Column(DateTime, nullable=True)  # renewed by the running worker; the lease lapses STALE_AFTER later
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User")
+    import_session = relationship("ImportSession")
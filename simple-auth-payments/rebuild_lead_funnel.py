@@ -0,0 +1,29 @@
+"""
+Rebuild the lead funnel rollups behind /admin/analytics/leads from
+contact_requests and lead_status_changes.
+Run this after scripts that write leads or statuses directly (restores,
+bulk SQL fixes); the API keeps the rollups current on its own.
+"""
+from database import SessionLocal, Base, engine
+from utils.lead_funnel import rebuild_funnel, funnel
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    rows = rebuild_funnel(db)
+    db.commit()
+
+    summary = funnel(db)
+    print(f"✓ Lead funnel rollups rebuilt ({rows} rows)")
+    print(f"  Leads: {summary['leads']}")
+    for stage in summary["stages"]:
+        print(f"  {stage['status']}: {stage['count']}")
+except Exception as e:
+    print(f"✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    db.rollback()
+finally:
+    db.close()
@@ -0,0 +1,33 @@
+"""
+Backfill / rebuild the lead full-text search index (SQLite only).
+
+The index is kept in sync by triggers, so this is only needed after loading
+data with triggers disabled, restoring an older backup, or to compact the
+index after heavy churn.
+"""
+import time
+from database import SessionLocal, Base, engine
+from utils.search import ensure_search_index, rebuild_search_index, is_supported
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+if not is_supported(engine):
+    print("✗ Full-text search index requires SQLite (FTS5); other databases use the LIKE fallback")
+    raise SystemExit(1)
+
+ensure_search_index(engine)
+
+db = SessionLocal()
+try:
+    started = time.perf_counter()
+    indexed = rebuild_search_index(db)
+    db.commit()
+    print(f"✓ Indexed {indexed} lead(s) in {time.perf_counter() - started:.1f}s")
+except Exception as e:
+    print(f"✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    db.rollback()
+finally:
+    db.close()
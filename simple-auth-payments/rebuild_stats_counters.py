@@ -0,0 +1,28 @@
+"""
+Rebuild the /admin/stats counters from the users and payments tables.
+Run this if the counters drift (e.g. after restoring a backup or running
+scripts that write users/payments directly).
+"""
+from database import SessionLocal, Base, engine
+from utils.stats_counters import rebuild_counters, build_stats
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    counters = rebuild_counters(db)
+    db.commit()
+
+    stats = build_stats(counters)
+    print("✓ Stats counters rebuilt")
+    print(f"  Users: {stats['total_users']} ({stats['active_users']} active)")
+    print(f"  Payments: {stats['total_payments']} {stats['payments_by_status']}")
+    print(f"  Revenue (cents): {stats['revenue_by_currency']}")
+except Exception as e:
+    print(f"✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    db.rollback()
+finally:
+    db.close()
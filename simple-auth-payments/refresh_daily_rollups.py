@@ -0,0 +1,33 @@
+"""
+Refresh the daily revenue/signup rollups behind /admin/analytics.
+
+Usage:
+  python refresh_daily_rollups.py          # recompute only days with new users/payments
+  python refresh_daily_rollups.py --full   # rebuild every day from scratch
+
+Safe to run from cron; the analytics endpoints also refresh dirty days on read.
+"""
+import sys
+from database import SessionLocal, Base, engine
+from utils.analytics import refresh_rollups, rebuild_rollups
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    if "--full" in sys.argv:
+        rows = rebuild_rollups(db)
+        db.commit()
+        print(f"✓ Rebuilt daily rollups ({rows} rows)")
+    else:
+        days = refresh_rollups(db)
+        db.commit()
+        print(f"✓ Refreshed {days} dirty day(s)")
+except Exception as e:
+    print(f"✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    db.rollback()
+finally:
+    db.close()
@@ -1,25 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import case, func
 from typing import List
 from database import get_db
-from routers.auth import get_current_user, require_admin, require_admin_or_accountant, require_admin_or_technical
+from routers.auth import get_current_user, get_current_user_from_cookie, require_admin, require_admin_or_accountant, require_admin_or_technical
 import models
-from datetime import datetime
+from datetime import datetime, timedelta
 from utils.bundle_helpers import get_logo_options, get_description_options, get_svg_html, get_predefined_description
-from schemas import LeadAssignmentCreate, LeadAssignmentResponse
+from schemas import LeadAssignmentCreate, LeadAssignmentResponse, LeadDistributeRequest
 from utils.backup import BackupManager
+from utils import stats_counters, analytics, auto_assign, changes, conditional, exports, lead_events, lead_funnel
+from utils.cache import TTLCache
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
-@router.get("/users")
-def get_all_users(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin_or_technical)
-):
-    """Get all users (admin or technical)"""
-    users = db.query(models.User).all()
-    return [{
+# Row serializers shared by the list endpoints and /admin/changes
+
+def _user_to_dict(user: models.User) -> dict:
+    return {
         "id": user.id,
         "email": user.email,
         "full_name": user.full_name,
@@ -27,7 +26,78 @@ def get_all_users(
         "is_verified": user.is_verified,
         "role": user.role,
         "allow_access_without_subscription": user.allow_access_without_subscription
-    } for user in users]
+    }
+
+
+def _payment_to_dict(payment: models.Payment) -> dict:
+    return {
+        "id": payment.id,
+        "user_id": payment.user_id,
+        "user_email": payment.user.email,
+        "bundle_id": payment.bundle_id,
+        "bundle_name": payment.bundle.name,
+        "amount_cents": payment.amount_cents,
+        "currency": payment.currency,
+        "status": payment.status,
+        "stripe_pi_id": payment.stripe_pi_id,
+        "months_purchased": payment.months_purchased,
+        "discount_percentage": payment.discount_percentage,
+        "created_at": payment.created_at.isoformat()
+    }
+
+
+def _subscription_to_dict(sub: models.Subscription) -> dict:
+    return {
+        "id": sub.id,
+        "user_id": sub.user_id,
+        "user_email": sub.user.email,
+        "bundle_id": sub.bundle_id,
+        "bundle_name": sub.bundle.name,
+        "start_date": sub.start_date.isoformat(),
+        "end_date": sub.end_date.isoformat(),
+        "is_active": sub.is_active and sub.end_date > datetime.utcnow(),
+        "auto_renew": sub.auto_renew
+    }
+
+
+def _dashboard_to_dict(d: models.Dashboard) -> dict:
+    return {
+        "id": d.id,
+        "user_id": d.user_id,
+        "user_email": d.user.email,
+        "looker_studio_url": d.looker_studio_url,
+        "created_at": d.created_at.isoformat(),
+        "updated_at": d.updated_at.isoformat()
+    }
+
+
+def _discount_rule_to_dict(rule: models.DiscountRule) -> dict:
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "min_months": rule.min_months,
+        "max_months": rule.max_months,
+        "discount_percentage": rule.discount_percentage,
+        "is_active": rule.is_active,
+        "created_at": rule.created_at.isoformat() if rule.created_at else None,
+        "updated_at": rule.updated_at.isoformat() if rule.updated_at else None
+    }
+
+
+@router.get("/users")
+def get_all_users(
+    request: Request = None,
+    response: Response = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_technical)
+):
+    """Get all users (admin or technical). Supports If-None-Match."""
+    not_modified = conditional.check(request, response, db, "admin.users", [models.User])
+    if not_modified:
+        return not_modified
+    
+    users = db.query(models.User).all()
+    return [_user_to_dict(user) for user in users]
 
 
 @router.put("/users/{user_id}/role")
@@ -66,6 +136,7 @@ def update_user_status(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    stats_counters.record_user_status_change(db, user.is_active, is_active)
     user.is_active = is_active
     db.commit()
     return {"message": "User status updated", "user_id": user_id, "is_active": is_active}
@@ -86,6 +157,9 @@ def delete_user(
     if user.id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
+    stats_counters.record_user_deleted(db, user)
+    analytics.mark_day_dirty(db, user.created_at)
+    changes.record_deletion(db, "users", user.id)
     db.delete(user)
     db.commit()
     return {"message": "User deleted", "user_id": user_id}
@@ -98,28 +172,104 @@ def get_all_payments(
 ):
     """Get all payments (admin only)"""
     payments = db.query(models.Payment).all()
-    return [{
-        "id": payment.id,
-        "user_id": payment.user_id,
-        "user_email": payment.user.email,
-        "bundle_id": payment.bundle_id,
-        "bundle_name": payment.bundle.name,
-        "amount_cents": payment.amount_cents,
-        "currency": payment.currency,
-        "status": payment.status,
-        "stripe_pi_id": payment.stripe_pi_id,
-        "months_purchased": payment.months_purchased,
-        "discount_percentage": payment.discount_percentage,
-        "created_at": payment.created_at.isoformat()
-    } for payment in payments]
+    return [_payment_to_dict(payment) for payment in payments]
+
+
+PAYMENT_EXPORT_COLUMNS = [
+    models.Payment.id,
+    models.Payment.user_id,
+    models.User.email.label("user_email"),
+    models.Payment.bundle_id,
+    models.Bundle.name.label("bundle_name"),
+    models.Payment.amount_cents,
+    models.Payment.currency,
+    models.Payment.status,
+    models.Payment.stripe_pi_id,
+    models.Payment.months_purchased,
+    models.Payment.discount_percentage,
+    models.Payment.created_at
+]
+PAYMENT_EXPORT_HEADER = [column.key for column in PAYMENT_EXPORT_COLUMNS]
+
+
+def payment_export_row(row) -> list:
+    values = list(row)
+    values[-1] = exports.format_datetime(row.created_at)
+    return values
+
+
+def payment_export_query(
+    db: Session,
+    status: str = None,
+    currency: str = None,
+    bundle_id: int = None,
+    start_date: str = None,
+    end_date: str = None
+):
+    """Filtered, newest-first query over the payment export columns (shared with export jobs)"""
+    query = db.query(*PAYMENT_EXPORT_COLUMNS).join(
+        models.User, models.User.id == models.Payment.user_id
+    ).join(
+        models.Bundle, models.Bundle.id == models.Payment.bundle_id
+    )
+    
+    if status:
+        query = query.filter(models.Payment.status == status)
+    if currency:
+        query = query.filter(func.lower(models.Payment.currency) == currency.lower())
+    if bundle_id is not None:
+        query = query.filter(models.Payment.bundle_id == bundle_id)
+    if start_date:
+        start = _parse_date_param(start_date, "start_date")
+        query = query.filter(models.Payment.created_at >= datetime.combine(start, datetime.min.time()))
+    if end_date:
+        end = _parse_date_param(end_date, "end_date")
+        query = query.filter(models.Payment.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    
+    return query.order_by(models.Payment.created_at.desc(), models.Payment.id.desc())
+
+
+def payment_export_filename() -> str:
+    return f"payments_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+
+
+@router.get("/payments/export")
+def export_payments(
+    status: str = None,
+    currency: str = None,
+    bundle_id: int = None,
+    start_date: str = None,
+    end_date: str = None,
+    format: str = "csv",
+    compression: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Stream payments as CSV (default) or NDJSON, optionally gzip-compressed
+    (admin/accountant only). Dates are YYYY-MM-DD, end_date inclusive.
+    """
+    exports.validate_options(format, compression)
+    query = payment_export_query(db, status, currency, bundle_id, start_date, end_date)
+    return exports.export_response(
+        db.get_bind(), query.statement, payment_export_filename(),
+        format, compression,
+        header=PAYMENT_EXPORT_HEADER, format_row=payment_export_row
+    )
 
 
 @router.get("/bundles")
 def get_all_bundles(
+    request: Request = None,
+    response: Response = None,
     db: Session = Depends(get_db),
     admin: models.User = Depends(require_admin)
 ):
-    """Get all bundles including inactive (admin only)"""
+    """Get all bundles including inactive (admin only). Supports If-None-Match."""
+    not_modified = conditional.check(request, response, db, "admin.bundles", [models.Bundle])
+    if not_modified:
+        return not_modified
+    
     bundles = db.query(models.Bundle).all()
     return [{
         "id": bundle.id,
@@ -203,31 +353,195 @@ def update_bundle(
 
 @router.get("/stats")
 def get_stats(
+    exact: bool = False,
     db: Session = Depends(get_db),
     admin: models.User = Depends(require_admin)
 ):
-    """Get system statistics (admin only)"""
-    total_users = db.query(models.User).count()
-    active_users = db.query(models.User).filter(models.User.is_active == True).count()
-    total_payments = db.query(models.Payment).count()
-    successful_payments = db.query(models.Payment).filter(models.Payment.status == "succeeded").count()
+    """
+    Get system statistics (admin only).
+    Served from the stats_counters table; pass exact=true to recompute
+    everything from the source tables instead.
+    """
+    if exact:
+        counters = stats_counters.compute_exact(db)
+    else:
+        counters = stats_counters.read_counters(db)
+    
+    return stats_counters.build_stats(counters)
+
+
+@router.post("/stats/rebuild")
+def rebuild_stats(
+    db: Session = Depends(get_db),
+    admin: models.User = Depends(require_admin)
+):
+    """Rebuild stats counters from the source tables (admin only)"""
+    try:
+        counters = stats_counters.rebuild_counters(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild stats: {str(e)}")
+    
+    return {"message": "Stats counters rebuilt", "stats": stats_counters.build_stats(counters)}
+
+
+@router.get("/conditional-stats")
+def get_conditional_stats(
+    admin: models.User = Depends(require_admin)
+):
+    """304 hit rate of the ETag-enabled list endpoints for this worker (admin only)"""
+    return conditional.stats.report()
+
+
+def _parse_date_param(value: str, name: str):
+    """Parse a YYYY-MM-DD query parameter"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use YYYY-MM-DD")
+
+
+def _analytics_range(granularity: str, start_date: str, end_date: str):
+    if granularity not in analytics.GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid granularity. Must be one of: {', '.join(analytics.GRANULARITIES)}"
+        )
+    start = _parse_date_param(start_date, "start_date") if start_date else None
+    end = _parse_date_param(end_date, "end_date") if end_date else None
+    return start, end
+
+
+@router.get("/analytics/revenue")
+def get_revenue_analytics(
+    granularity: str = "day",
+    start_date: str = None,
+    end_date: str = None,
+    bundle_id: int = None,
+    currency: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Succeeded payments and revenue bucketed by day, week or month (admin/accountant only).
+    Served from the daily_rollups table; dirty days are refreshed first.
+    """
+    start, end = _analytics_range(granularity, start_date, end_date)
+    
+    if analytics.refresh_rollups(db):
+        db.commit()
+    
+    return {
+        "granularity": granularity,
+        "buckets": analytics.revenue_series(db, granularity, start, end, bundle_id, currency)
+    }
+
+
+@router.get("/analytics/signups")
+def get_signup_analytics(
+    granularity: str = "day",
+    start_date: str = None,
+    end_date: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    New user signups bucketed by day, week or month (admin/accountant only).
+    Served from the daily_rollups table; dirty days are refreshed first.
+    Users created before signup dates were recorded are not in any bucket;
+    undated_users counts them.
+    """
+    start, end = _analytics_range(granularity, start_date, end_date)
     
-    total_revenue = db.query(models.Payment).filter(
-        models.Payment.status == "succeeded"
-    ).with_entities(models.Payment.amount_cents).all()
+    if analytics.refresh_rollups(db):
+        db.commit()
     
-    revenue_cents = sum([p[0] for p in total_revenue]) if total_revenue else 0
+    return {
+        "granularity": granularity,
+        "buckets": analytics.signup_series(db, granularity, start, end),
+        "undated_users": analytics.undated_users(db)
+    }
+
+
+def _lead_segment_filters(country, referral_source, language_preference, num_locations) -> dict:
+    return {
+        "country": country,
+        "referral_source": referral_source,
+        "language_preference": language_preference,
+        "num_locations": num_locations
+    }
+
+
+@router.get("/analytics/leads")
+def get_lead_analytics(
+    granularity: str = "day",
+    start_date: str = None,
+    end_date: str = None,
+    country: str = None,
+    referral_source: str = None,
+    language_preference: str = None,
+    num_locations: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    New leads, status entries and status transitions bucketed by day, week or
+    month (admin/accountant only). Served from the lead_funnel_rollups table.
+    """
+    start, end = _analytics_range(granularity, start_date, end_date)
+    filters = _lead_segment_filters(country, referral_source, language_preference, num_locations)
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_payments": total_payments,
-        "successful_payments": successful_payments,
-        "total_revenue_cents": revenue_cents,
-        "total_revenue_usd": revenue_cents / 100
+        "granularity": granularity,
+        "buckets": lead_funnel.funnel_series(db, granularity, start, end, filters)
     }
 
 
+@router.get("/analytics/leads/funnel")
+def get_lead_funnel(
+    start_date: str = None,
+    end_date: str = None,
+    country: str = None,
+    referral_source: str = None,
+    language_preference: str = None,
+    num_locations: str = None,
+    group_by: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Lead funnel for a date range (admin/accountant only): leads created and
+    leads entering each status, with rates relative to leads created.
+    group_by splits it by country, referral_source, language_preference or num_locations.
+    """
+    start, end = _analytics_range("day", start_date, end_date)
+    if group_by is not None and group_by not in lead_funnel.DIMENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid group_by. Must be one of: {', '.join(lead_funnel.DIMENSIONS)}"
+        )
+    filters = _lead_segment_filters(country, referral_source, language_preference, num_locations)
+    
+    return lead_funnel.funnel(db, start, end, filters, group_by)
+
+
+@router.post("/analytics/leads/rebuild")
+def rebuild_lead_analytics(
+    db: Session = Depends(get_db),
+    admin: models.User = Depends(require_admin)
+):
+    """Rebuild the lead funnel rollups from leads and their status history (admin only)"""
+    try:
+        rows = lead_funnel.rebuild_funnel(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild lead analytics: {str(e)}")
+    
+    return {"message": "Lead funnel rollups rebuilt", "rows": rows}
+
+
 @router.post("/users/create")
 def create_user(
     email: str,
@@ -264,6 +578,8 @@ def create_user(
     )
     
     db.add(new_user)
+    stats_counters.record_user_created(db, new_user)
+    analytics.mark_day_dirty(db, datetime.utcnow())
     db.commit()
     db.refresh(new_user)
     
@@ -341,14 +657,7 @@ def get_all_dashboards(
 ):
     """Get all dashboards (admin or technical)"""
     dashboards = db.query(models.Dashboard).all()
-    return [{
-        "id": d.id,
-        "user_id": d.user_id,
-        "user_email": d.user.email,
-        "looker_studio_url": d.looker_studio_url,
-        "created_at": d.created_at.isoformat(),
-        "updated_at": d.updated_at.isoformat()
-    } for d in dashboards]
+    return [_dashboard_to_dict(d) for d in dashboards]
 
 
 @router.get("/subscriptions")
@@ -357,42 +666,25 @@ def get_all_subscriptions(
     admin: models.User = Depends(require_admin)
 ):
     """Get all subscriptions"""
-    from datetime import datetime
     subscriptions = db.query(models.Subscription).all()
-    return [{
-        "id": sub.id,
-        "user_id": sub.user_id,
-        "user_email": sub.user.email,
-        "bundle_id": sub.bundle_id,
-        "bundle_name": sub.bundle.name,
-        "start_date": sub.start_date.isoformat(),
-        "end_date": sub.end_date.isoformat(),
-        "is_active": sub.is_active and sub.end_date > datetime.utcnow(),
-        "auto_renew": sub.auto_renew
-    } for sub in subscriptions]
+    return [_subscription_to_dict(sub) for sub in subscriptions]
 
 
 @router.get("/discount-rules")
 def get_discount_rules(
+    request: Request = None,
+    response: Response = None,
     admin: models.User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get all discount rules (admin only)"""
+    """Get all discount rules (admin only). Supports If-None-Match."""
+    not_modified = conditional.check(request, response, db, "admin.discount_rules", [models.DiscountRule])
+    if not_modified:
+        return not_modified
+    
     try:
         rules = db.query(models.DiscountRule).order_by(models.DiscountRule.min_months).all()
-        result = []
-        for rule in rules:
-            result.append({
-                "id": rule.id,
-                "name": rule.name,
-                "min_months": rule.min_months,
-                "max_months": rule.max_months,
-                "discount_percentage": rule.discount_percentage,
-                "is_active": rule.is_active,
-                "created_at": rule.created_at.isoformat() if rule.created_at else None,
-                "updated_at": rule.updated_at.isoformat() if rule.updated_at else None
-            })
-        return result
+        return [_discount_rule_to_dict(rule) for rule in rules]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading discount rules: {str(e)}")
 
@@ -493,6 +785,7 @@ def delete_discount_rule(
     if not rule:
         raise HTTPException(status_code=404, detail="Discount rule not found")
     
+    changes.record_deletion(db, "discount_rules", rule.id)
     db.delete(rule)
     db.commit()
     return {"message": "Discount rule deleted", "rule_id": rule_id}
@@ -565,6 +858,9 @@ def assign_lead_to_salesman(
     ).first()
     
     if existing_assignment:
+        if existing_assignment.salesman_id != assignment_data.salesman_id:
+            # The previous salesman's delta sync drops the lead
+            changes.record_deletion(db, "lead_assignments", lead_id, owner_id=existing_assignment.salesman_id)
         # Update existing assignment
         existing_assignment.salesman_id = assignment_data.salesman_id
         existing_assignment.assigned_by_id = current_user.id
@@ -581,9 +877,15 @@ def assign_lead_to_salesman(
         )
         db.add(assignment)
     
+    lead_events.record(
+        db, lead_events.ASSIGNED, lead_id, salesman.id,
+        salesman_email=salesman.email, by=current_user.email
+    )
+    
     try:
         db.commit()
         db.refresh(assignment)
+        auto_assign.engine.invalidate()
         
         return LeadAssignmentResponse(
             id=assignment.id,
@@ -625,8 +927,11 @@ def unassign_lead(
         raise HTTPException(status_code=404, detail="Lead is not assigned")
     
     try:
+        # Assignment tombstones are keyed by lead id so the lead is re-sent by /admin/changes
+        changes.record_deletion(db, "lead_assignments", lead_id, owner_id=assignment.salesman_id)
         db.delete(assignment)
         db.commit()
+        auto_assign.engine.invalidate()
         return {"message": "Lead unassigned successfully", "lead_id": lead_id}
     except Exception as e:
         db.rollback()
@@ -636,6 +941,33 @@ def unassign_lead(
         )
 
 
+@router.post("/leads/distribute")
+def distribute_unassigned_leads(
+    distribute_data: LeadDistributeRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Assign all open, unassigned leads to active salesmen (admin/accountant only).
+    Strategies: round_robin, least_loaded (default), country_affinity.
+    """
+    try:
+        assigned = auto_assign.distribute_unassigned(db, distribute_data.strategy, current_user.id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to distribute leads")
+
+    return {
+        "message": f"Assigned {sum(assigned.values())} lead(s)",
+        "strategy": distribute_data.strategy,
+        "assigned": sum(assigned.values()),
+        "by_salesman": [
+            {"salesman_id": salesman_id, "count": count}
+            for salesman_id, count in sorted(assigned.items())
+        ]
+    }
+
+
 @router.get("/salesmen")
 def get_salesmen(
     db: Session = Depends(get_db),
@@ -657,6 +989,83 @@ def get_salesmen(
     } for s in salesmen]
 
 
+LEAD_STATUSES = ("new", "contacted", "qualified", "converted", "not_interested")
+
+# Per-worker cache; the summary is a dashboard view, 30s stale is fine
+_salesmen_summary_cache = TTLCache(ttl_seconds=30)
+
+
+def _salesmen_summary(db: Session, days: int) -> list:
+    now = datetime.utcnow()
+
+    # Notes each user wrote in the window, pre-aggregated so the join below does not fan out
+    recent_notes = db.query(
+        models.ContactNote.admin_id.label("user_id"),
+        func.count(models.ContactNote.id).label("notes")
+    ).filter(
+        models.ContactNote.created_at >= now - timedelta(days=days)
+    ).group_by(models.ContactNote.admin_id).subquery()
+
+    status_counts = [
+        func.sum(case((models.ContactRequest.status == lead_status, 1), else_=0)).label(lead_status)
+        for lead_status in LEAD_STATUSES
+    ]
+    rows = db.query(
+        models.User.id,
+        models.User.email,
+        models.User.full_name,
+        func.count(models.ContactRequest.id).label("total"),
+        *status_counts,
+        func.min(case((models.ContactRequest.status == "new", models.ContactRequest.created_at))).label("oldest_new_at"),
+        func.coalesce(recent_notes.c.notes, 0).label("notes")
+    ).outerjoin(
+        models.LeadAssignment, models.LeadAssignment.salesman_id == models.User.id
+    ).outerjoin(
+        models.ContactRequest, models.ContactRequest.id == models.LeadAssignment.contact_request_id
+    ).outerjoin(
+        recent_notes, recent_notes.c.user_id == models.User.id
+    ).filter(
+        models.User.role == "salesman",
+        models.User.is_active == True
+    ).group_by(
+        models.User.id, models.User.email, models.User.full_name, recent_notes.c.notes
+    ).order_by(models.User.id).all()
+
+    summary = []
+    for row in rows:
+        by_status = {lead_status: getattr(row, lead_status) or 0 for lead_status in LEAD_STATUSES}
+        summary.append({
+            "id": row.id,
+            "email": row.email,
+            "full_name": row.full_name,
+            "total_leads": row.total,
+            "open_leads": row.total - sum(by_status[s] for s in auto_assign.CLOSED_STATUSES),
+            "by_status": by_status,
+            "oldest_untouched_at": row.oldest_new_at.isoformat() if row.oldest_new_at else None,
+            "oldest_untouched_age_days": round((now - row.oldest_new_at).total_seconds() / 86400, 1) if row.oldest_new_at else None,
+            "notes_last_days": row.notes
+        })
+    return summary
+
+
+@router.get("/salesmen/summary")
+def get_salesmen_summary(
+    days: int = 7,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Workload per active salesman (admin/accountant only): lead counts by status,
+    the oldest lead still in "new" and notes written in the last `days` days.
+    Cached for 30 seconds.
+    """
+    if not 1 <= days <= 365:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 365")
+
+    summary, _ = _salesmen_summary_cache.get_or_compute(days, lambda: _salesmen_summary(db, days))
+    return {"days": days, "salesmen": summary}
+
+
 # Database Backup Endpoints
 
 @router.post("/backup/create")
@@ -922,93 +1331,243 @@ def validate_backup_endpoint(
 
 # CSV Lead Import Endpoints
 from utils.csv_importer import CSVImporter
+from utils import import_jobs, import_sessions
+from fastapi import BackgroundTasks
 from fastapi.responses import StreamingResponse
+from schemas import ImportJobCreate
+
+def _check_csv_upload(file: UploadFile) -> None:
+    """Reject non-CSV and oversized uploads without reading them into memory"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only .csv files allowed")
+    
+    file.file.seek(0, 2)
+    file_size = file.file.tell()
+    file.file.seek(0)
+    if file_size > CSVImporter.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large (max {CSVImporter.MAX_FILE_SIZE // (1024 * 1024)}MB)"
+        )
+
 
 @router.post("/leads/import/validate")
-async def validate_csv_import(
+def validate_csv_import(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin)
 ):
-    """Validate CSV file and detect duplicates (admin only)"""
-    # Validate file type
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only .csv files allowed")
-    
-    # Check file size (10MB limit)
-    content = await file.read()
-    if len(content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
+    """
+    Validate CSV file and detect duplicates (admin only).
+    The parsed rows are kept server-side; pass the returned import_session_id
+    to /leads/import/execute instead of uploading the file again.
+    """
+    _check_csv_upload(file)
+    importer = CSVImporter(db)
+    if import_sessions.cleanup_expired(db):
+        db.commit()
     
-    # Decode content
     try:
-        file_content = content.decode('utf-8')
-    except:
+        # Validate format
+        format_check = importer.validate_csv_format(file.file)
+        if not format_check["valid"]:
+            raise HTTPException(status_code=400, detail=format_check["error"])
+        
+        # Parse, duplicate-check and stage the rows as they stream in
+        staged = import_sessions.stage(db, importer, current_user.id, file.filename, file.file)
+    except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Invalid file encoding (use UTF-8)")
+    db.commit()
     
-    # Validate format
-    importer = CSVImporter(db)
-    format_check = importer.validate_csv_format(file_content)
-    
-    if not format_check["valid"]:
-        raise HTTPException(status_code=400, detail=format_check["error"])
-    
-    # Parse CSV
-    parse_result = importer.parse_csv(file_content)
-    leads = parse_result["leads"]
-    errors = parse_result["errors"]
-    
-    # Detect duplicates
-    duplicate_result = importer.detect_duplicates(leads)
+    import_session = staged["session"]
+    errors = staged["errors"]
     
-    # Get preview (first 10 rows)
-    preview = leads[:10]
+    # Preview (first 10 rows)
+    preview = staged["preview"]
     for p in preview:
         p.pop('row_number', None)
     
     return {
         "success": True,
-        "total_rows": len(leads) + len(errors),
-        "valid_rows": len(leads),
+        "import_session_id": import_session.id,
+        "expires_at": import_session.expires_at.isoformat(),
+        "total_rows": import_session.valid_rows + len(errors),
+        "valid_rows": import_session.valid_rows,
         "invalid_rows": len(errors),
         "errors": errors,
-        "duplicates": duplicate_result,
+        "duplicates": staged["duplicates"],
         "preview": preview
     }
 
 
+def _claim_import_session(db: Session, import_session_id: int, user: models.User) -> models.ImportSession:
+    """Claim a staged import session for one run (commits); only its owner may run it"""
+    import_session = db.query(models.ImportSession).filter(
+        models.ImportSession.id == import_session_id,
+        models.ImportSession.user_id == user.id
+    ).first()
+    if not import_session:
+        raise HTTPException(status_code=404, detail="Import session not found")
+    if import_sessions.is_expired(import_session):
+        raise HTTPException(status_code=410, detail="Import session has expired, upload the file again")
+    if not import_sessions.claim(db, import_session):
+        raise HTTPException(status_code=409, detail=f"Import session is already {import_session.status}")
+    db.commit()
+    return import_session
+
+
+def _run_import_session(
+    db: Session,
+    importer: CSVImporter,
+    import_session_id: int,
+    user: models.User,
+    duplicate_action: str
+) -> dict:
+    """Run a staged import session inside the request"""
+    import_session = _claim_import_session(db, import_session_id, user)
+    try:
+        result = importer.import_leads(import_sessions.iter_rows(import_session), duplicate_action)
+    except Exception as e:
+        db.rollback()
+        import_sessions.finish(db, import_session, error=str(e))
+        db.commit()
+        raise
+    import_sessions.finish(db, import_session)
+    db.commit()
+    return result
+
+
 @router.post("/leads/import/execute")
-async def execute_csv_import(
-    file: UploadFile = File(...),
+def execute_csv_import(
+    file: UploadFile = File(None),
     duplicate_action: str = "skip",
+    import_session_id: int = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin)
 ):
-    """Execute CSV import with duplicate handling (admin only)"""
+    """
+    Execute CSV import with duplicate handling (admin only).
+    Runs the rows staged by /leads/import/validate when import_session_id is
+    given; otherwise parses an uploaded file.
+    """
     # Validate duplicate_action
     if duplicate_action not in ["skip", "overwrite", "import_all"]:
         raise HTTPException(status_code=400, detail="Invalid duplicate_action")
     
-    # Read and parse
-    content = await file.read()
-    file_content = content.decode('utf-8')
-    
     importer = CSVImporter(db)
-    parse_result = importer.parse_csv(file_content)
-    leads = parse_result["leads"]
+    if import_session_id is not None:
+        result = _run_import_session(db, importer, import_session_id, current_user, duplicate_action)
+    elif file is not None:
+        _check_csv_upload(file)
+        # Chunks commit as they go, so a bad byte must be found before the first one
+        try:
+            importer.check_encoding(file.file)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid file encoding (use UTF-8)")
+        # Parse and import as the rows stream in
+        result = importer.import_leads(importer.iter_leads(file.file, []), duplicate_action)
+    else:
+        raise HTTPException(status_code=400, detail="Provide import_session_id or a file")
     
-    if not leads:
+    if not result["total_processed"]:
         raise HTTPException(status_code=400, detail="No valid leads found")
     
-    # Import
-    result = importer.import_leads(leads, duplicate_action)
-    
     return {
         "success": True,
         "results": result
     }
 
 
+def _resume_import_jobs(db: Session, background_tasks: BackgroundTasks) -> None:
+    """Restart import jobs whose worker died, from their last committed chunk"""
+    requeued = import_jobs.requeue_interrupted(db)
+    if requeued:
+        db.commit()
+    for job_id in requeued:
+        background_tasks.add_task(import_jobs.run_job, db.get_bind(), job_id)
+
+
+def _get_own_import_job(db: Session, job_id: int, user: models.User) -> models.ImportJob:
+    job = db.query(models.ImportJob).filter(
+        models.ImportJob.id == job_id,
+        models.ImportJob.user_id == user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.post("/leads/import/jobs", status_code=status.HTTP_202_ACCEPTED)
+def create_import_job(
+    job_data: ImportJobCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    Run a validated import in the background (admin only).
+    Poll GET /leads/import/jobs/{id} for progress and ETA.
+    """
+    import_session = _claim_import_session(db, job_data.import_session_id, current_user)
+    job = models.ImportJob(
+        user_id=current_user.id,
+        import_session_id=import_session.id,
+        duplicate_action=job_data.duplicate_action,
+        status=import_jobs.QUEUED,
+        rows_total=import_session.valid_rows or 0
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    background_tasks.add_task(import_jobs.run_job, db.get_bind(), job.id)
+    return import_jobs.job_to_dict(job)
+
+
+@router.get("/leads/import/jobs")
+def list_import_jobs(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """List your import jobs, newest first (admin only)"""
+    _resume_import_jobs(db, background_tasks)
+    jobs = db.query(models.ImportJob).filter(
+        models.ImportJob.user_id == current_user.id
+    ).order_by(models.ImportJob.id.desc()).limit(50).all()
+    return [import_jobs.job_to_dict(job) for job in jobs]
+
+
+@router.get("/leads/import/jobs/{job_id}")
+def get_import_job(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """Import job status, progress and ETA (admin only)"""
+    _resume_import_jobs(db, background_tasks)
+    return import_jobs.job_to_dict(_get_own_import_job(db, job_id, current_user))
+
+
+@router.post("/leads/import/jobs/{job_id}/cancel")
+def cancel_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    Cancel an import job (admin only). A running job stops after its current
+    chunk; leads from chunks already committed stay imported.
+    """
+    job = _get_own_import_job(db, job_id, current_user)
+    if job.status not in import_jobs.ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Import job is already {job.status}")
+    
+    import_jobs.cancel(db, job)
+    return import_jobs.job_to_dict(job)
+
+
 @router.get("/leads/import/template")
 def download_csv_template(
     current_user: models.User = Depends(require_admin)
@@ -1023,3 +1582,206 @@ def download_csv_template(
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=leads_template.csv"}
     )
+
+
+# Admin Panel Bootstrap
+import time
+from routers import contacts as contacts_router
+from routers.auth import ADMIN_ROLES, ADMIN_OR_ACCOUNTANT_ROLES, ADMIN_OR_TECHNICAL_ROLES, LEAD_ACCESS_ROLES
+
+# Sections mirroring what admin.html loads on open: (roles, loader). The roles
+# are the ones the section's own route requires, so a role gets exactly the
+# sections it could fetch one by one.
+BOOTSTRAP_LOADERS = {
+    "stats": (ADMIN_ROLES, lambda db, user: get_stats(exact=False, db=db, admin=user)),
+    "users": (ADMIN_OR_TECHNICAL_ROLES, lambda db, user: get_all_users(db=db, current_user=user)),
+    "subscriptions": (ADMIN_ROLES, lambda db, user: get_all_subscriptions(db=db, admin=user)),
+    "dashboards": (ADMIN_OR_TECHNICAL_ROLES, lambda db, user: get_all_dashboards(db=db, current_user=user)),
+    "payments": (ADMIN_ROLES, lambda db, user: get_all_payments(db=db, admin=user)),
+    "bundles": (ADMIN_ROLES, lambda db, user: get_all_bundles(db=db, admin=user)),
+    "discount_rules": (ADMIN_ROLES, lambda db, user: get_discount_rules(admin=user, db=db)),
+    "contacts": (LEAD_ACCESS_ROLES, lambda db, user: contacts_router.get_all_contacts(status=None, limit=100, offset=0, db=db, current_user=user)),
+    "salesmen": (ADMIN_OR_ACCOUNTANT_ROLES, lambda db, user: get_salesmen(db=db, current_user=user)),
+    "backups": (ADMIN_OR_TECHNICAL_ROLES, lambda db, user: list_database_backups(current_user=user)),
+}
+
+
+def bootstrap_sections(role: str) -> List[str]:
+    """Sections returned to `role`, in BOOTSTRAP_LOADERS order"""
+    return [section for section, (roles, _) in BOOTSTRAP_LOADERS.items() if role in roles]
+
+
+# Seconds each section may be served from cache (per worker)
+BOOTSTRAP_CACHE_TTL = {"backups": 30}
+BOOTSTRAP_DEFAULT_TTL = 5
+
+_bootstrap_cache = TTLCache(ttl_seconds=BOOTSTRAP_DEFAULT_TTL)
+
+
+def _bootstrap_cache_key(section: str, user: models.User):
+    # Salesmen only see their own leads, so their contacts are cached per user
+    if section == "contacts" and user.role == "salesman":
+        return (section, user.role, user.id)
+    return (section, user.role)
+
+
+def _load_bootstrap_section(db: Session, section: str, user: models.User):
+    """Run one section loader; returns (data, error, was_cached, elapsed_ms)"""
+    started = time.perf_counter()
+    _, loader = BOOTSTRAP_LOADERS[section]
+    
+    try:
+        data, was_cached = _bootstrap_cache.get_or_compute(
+            _bootstrap_cache_key(section, user),
+            lambda: loader(db, user),
+            ttl_seconds=BOOTSTRAP_CACHE_TTL.get(section, BOOTSTRAP_DEFAULT_TTL)
+        )
+        error = None
+    except HTTPException as e:
+        data, was_cached, error = None, False, e.detail
+    except Exception as e:
+        # Leave the session usable for the remaining sections
+        db.rollback()
+        data, was_cached, error = None, False, str(e)
+    
+    return data, error, was_cached, round((time.perf_counter() - started) * 1000, 2)
+
+
+@router.get("/bootstrap")
+def get_admin_bootstrap(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_from_cookie)
+):
+    """
+    Initial admin panel dataset in a single request.
+    Returns the sections the user's role can see, each briefly cached, with a
+    per-section timing breakdown. Sections load one after another: on SQLite
+    extra threads would only contend for the same database file.
+    """
+    sections = bootstrap_sections(current_user.role)
+    if not sections:
+        raise HTTPException(status_code=403, detail="Access denied. Staff role required")
+    
+    started = time.perf_counter()
+    results = [_load_bootstrap_section(db, section, current_user) for section in sections]
+    
+    response = {
+        "user": {
+            "id": current_user.id,
+            "email": current_user.email,
+            "full_name": current_user.full_name,
+            "role": current_user.role
+        },
+        "sections": {},
+        "errors": {},
+        "cached": [],
+        "timings_ms": {}
+    }
+    for section, (data, error, was_cached, elapsed_ms) in zip(sections, results):
+        if error is None:
+            response["sections"][section] = data
+        else:
+            response["errors"][section] = error
+        if was_cached:
+            response["cached"].append(section)
+        response["timings_ms"][section] = elapsed_ms
+    response["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    return response
+
+
+# Delta Sync
+from sqlalchemy.orm import joinedload
+
+# Feeds each role may poll, matching the lists it can load
+CHANGE_FEEDS_BY_ROLE = {
+    "admin": ["users", "payments", "subscriptions", "dashboards", "discount_rules", "contacts"],
+    "accountant": ["contacts"],
+    "salesman": ["contacts"],
+    "technical": ["users", "dashboards"],
+}
+
+CHANGE_FEEDS = {
+    "users": (models.User, [], _user_to_dict),
+    "payments": (models.Payment, [joinedload(models.Payment.user), joinedload(models.Payment.bundle)], _payment_to_dict),
+    "subscriptions": (models.Subscription, [joinedload(models.Subscription.user), joinedload(models.Subscription.bundle)], _subscription_to_dict),
+    "dashboards": (models.Dashboard, [joinedload(models.Dashboard.user)], _dashboard_to_dict),
+    "discount_rules": (models.DiscountRule, [], _discount_rule_to_dict),
+}
+
+
+@router.get("/changes")
+def get_changes(
+    since: str = None,
+    limit: int = 500,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_from_cookie)
+):
+    """
+    Rows inserted or updated since a cursor, plus tombstones for deletions.
+    Call without `since` to get a starting cursor, then poll with the cursor
+    from each response. If `reset` is true the cursor expired or too much
+    changed; reload the full lists and continue from the new cursor.
+    """
+    feeds = CHANGE_FEEDS_BY_ROLE.get(current_user.role)
+    if feeds is None:
+        raise HTTPException(status_code=403, detail="Access denied. Staff role required")
+    
+    limit = max(1, min(limit, 5000))
+    now = datetime.utcnow()
+    response = {
+        "cursor": changes.encode_cursor(now),
+        "reset": False,
+        "changes": {},
+        "deleted": {}
+    }
+    
+    if since is None:
+        return response
+    
+    try:
+        since_at = changes.decode_cursor(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if since_at < now - changes.TOMBSTONE_RETENTION:
+        response["reset"] = True
+        return response
+    
+    window_start = since_at - changes.CURSOR_OVERLAP
+    
+    for feed in feeds:
+        if feed == "contacts":
+            rows, truncated = contacts_router.get_contact_changes(db, current_user, window_start, limit)
+        else:
+            model, options, serialize = CHANGE_FEEDS[feed]
+            records = db.query(model).options(*options).filter(
+                model.updated_at > window_start
+            ).order_by(model.updated_at).limit(limit + 1).all()
+            truncated = len(records) > limit
+            rows = [serialize(record) for record in records[:limit]]
+        
+        if truncated:
+            response["reset"] = True
+            response["changes"] = {}
+            response["deleted"] = {}
+            return response
+        if rows:
+            response["changes"][feed] = rows
+    
+    tombstones = db.query(models.DeletedRecord.feed, models.DeletedRecord.record_id).filter(
+        models.DeletedRecord.feed.in_(feeds),
+        models.DeletedRecord.deleted_at > window_start
+    ).all()
+    for feed, record_id in tombstones:
+        response["deleted"].setdefault(feed, []).append(record_id)
+    
+    if "contacts" in feeds:
+        # Salesmen drop leads that were unassigned or reassigned away from them
+        deleted_contacts = set(response["deleted"].get("contacts", []))
+        lost = [lead_id for lead_id in contacts_router.get_lost_contact_ids(db, current_user, window_start)
+                if lead_id not in deleted_contacts]
+        if lost:
+            response["deleted"].setdefault("contacts", []).extend(lost)
+    
+    return response
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import datetime
 from database import get_db
 from utils.security import hash_password, verify_password, verify_and_update_password, create_access_token, decode_access_token
 from schemas import UserCreate, UserResponse, Token, UserLogin
+from utils import stats_counters, analytics
 import models
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -71,6 +73,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 
 
 # Role-based authorization helpers
+
+# Roles each require_* dependency below admits; code that has to agree with a
+# route's access (e.g. /admin/bootstrap) uses the same tuple
+ADMIN_ROLES = ("admin",)
+ADMIN_OR_ACCOUNTANT_ROLES = ("admin", "accountant")
+ADMIN_OR_TECHNICAL_ROLES = ("admin", "technical")
+LEAD_ACCESS_ROLES = ("admin", "accountant", "salesman")
+
+
 def require_role(allowed_roles: List[str]):
     """Dependency factory for role-based access control"""
     def role_checker(current_user: models.User = Depends(get_current_user_from_cookie)):
@@ -85,7 +96,7 @@ def require_role(allowed_roles: List[str]):
 
 def require_admin(current_user: models.User = Depends(get_current_user_from_cookie)):
     """Require admin role"""
-    if current_user.role != "admin":
+    if current_user.role not in ADMIN_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin role required"
@@ -95,7 +106,7 @@ def require_admin(current_user: models.User = Depends(get_current_user_from_cook
 
 def require_admin_or_accountant(current_user: models.User = Depends(get_current_user_from_cookie)):
     """Require admin or accountant role"""
-    if current_user.role not in ["admin", "accountant"]:
+    if current_user.role not in ADMIN_OR_ACCOUNTANT_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin or accountant role required"
@@ -105,7 +116,7 @@ def require_admin_or_accountant(current_user: models.User = Depends(get_current_
 
 def require_admin_or_technical(current_user: models.User = Depends(get_current_user_from_cookie)):
     """Require admin or technical role"""
-    if current_user.role not in ["admin", "technical"]:
+    if current_user.role not in ADMIN_OR_TECHNICAL_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin or technical role required"
@@ -115,7 +126,7 @@ def require_admin_or_technical(current_user: models.User = Depends(get_current_u
 
 def require_lead_access(current_user: models.User = Depends(get_current_user_from_cookie)):
     """Require admin, accountant, or salesman role (lead access)"""
-    if current_user.role not in ["admin", "accountant", "salesman"]:
+    if current_user.role not in LEAD_ACCESS_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin, accountant, or salesman role required"
@@ -145,6 +156,8 @@ def register(request: Request, user_data: UserCreate, db: Session = Depends(get_
     )
     
     db.add(new_user)
+    stats_counters.record_user_created(db, new_user)
+    analytics.mark_day_dirty(db, datetime.utcnow())
     db.commit()
     db.refresh(new_user)
     
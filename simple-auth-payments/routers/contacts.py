@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, update
 from database import get_db
-from schemas import ContactRequestCreate, ContactRequestResponse, ContactStatusUpdate, ContactNoteCreate, ContactNoteResponse
+from schemas import ContactRequestCreate, ContactRequestResponse, ContactStatusUpdate, ContactNoteCreate, ContactNoteResponse, ContactBulkOperation
 from routers.auth import get_current_user, require_lead_access, require_admin_or_accountant
+from config import settings
+from utils import auto_assign, changes, conditional, exports, group_commit, lead_events, lead_funnel, lead_keys, pagination, search, stats_counters
 import models
 from datetime import datetime
-from typing import List, Optional
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import json
 import time
-import csv
-import io
 
 # Email notification system (currently disabled)
 # Uncomment the import below to enable email notifications
@@ -19,6 +23,119 @@ import io
 router = APIRouter(prefix="/contacts", tags=["Contacts"])
 
 
+def contact_to_dict(contact: models.ContactRequest) -> dict:
+    """Base lead fields shared by the list and change-feed responses"""
+    return {
+        "id": contact.id,
+        "first_name": contact.first_name,
+        "last_name": contact.last_name,
+        "email": contact.email,
+        "phone": contact.phone,
+        "country_code": contact.country_code,
+        "country": contact.country,
+        "business_name": contact.business_name,
+        "num_locations": contact.num_locations,
+        "referral_source": contact.referral_source,
+        "marketing_consent": contact.marketing_consent,
+        "language_preference": contact.language_preference,
+        "status": contact.status,
+        "created_at": contact.created_at,
+        "updated_at": contact.updated_at
+    }
+
+
+def lead_list_query(db: Session, current_user: models.User):
+    """
+    Leads with their assignee and notes count in a single SELECT:
+    outer joins to the assignment and salesman plus a correlated COUNT over notes.
+    Salesmen only get leads assigned to them. Rows feed lead_rows().
+    """
+    notes_count = select(func.count(models.ContactNote.id)).where(
+        models.ContactNote.contact_request_id == models.ContactRequest.id
+    ).correlate(models.ContactRequest).scalar_subquery()
+    
+    query = db.query(
+        models.ContactRequest,
+        models.LeadAssignment.salesman_id,
+        models.User.email,
+        models.User.full_name,
+        notes_count.label("notes_count")
+    ).outerjoin(
+        models.LeadAssignment,
+        models.LeadAssignment.contact_request_id == models.ContactRequest.id
+    ).outerjoin(
+        models.User,
+        models.User.id == models.LeadAssignment.salesman_id
+    )
+    
+    if current_user.role == "salesman":
+        query = query.filter(models.LeadAssignment.salesman_id == current_user.id)
+    
+    return query
+
+
+def lead_rows(results) -> List[dict]:
+    """Shape lead_list_query() rows into lead list dicts"""
+    rows = []
+    for contact, salesman_id, salesman_email, salesman_name, notes_count in results:
+        row = contact_to_dict(contact)
+        row["notes_count"] = notes_count or 0
+        row["assigned_to"] = {
+            "id": salesman_id,
+            "email": salesman_email,
+            "full_name": salesman_name
+        } if salesman_id is not None else None
+        rows.append(row)
+    return rows
+
+
+def get_contact_changes(db: Session, current_user: models.User, since: datetime, limit: int):
+    """
+    Leads changed after `since`, in the same shape as the lead list.
+    A lead counts as changed when its row, its assignment or its notes changed,
+    or when its assignment was removed.
+    Returns (rows, truncated).
+    """
+    changed_ids = db.query(models.ContactRequest.id).filter(
+        models.ContactRequest.updated_at > since
+    ).union(
+        db.query(models.LeadAssignment.contact_request_id).filter(models.LeadAssignment.updated_at > since),
+        db.query(models.ContactNote.contact_request_id).filter(models.ContactNote.created_at > since),
+        db.query(models.DeletedRecord.record_id).filter(
+            models.DeletedRecord.feed == "lead_assignments",
+            models.DeletedRecord.deleted_at > since
+        )
+    ).subquery()
+    
+    results = lead_list_query(db, current_user).filter(
+        models.ContactRequest.id.in_(db.query(changed_ids))
+    ).order_by(models.ContactRequest.id).limit(limit + 1).all()
+    
+    truncated = len(results) > limit
+    return lead_rows(results[:limit]), truncated
+
+
+def get_lost_contact_ids(db: Session, current_user: models.User, since: datetime) -> List[int]:
+    """
+    Leads unassigned or reassigned away from a salesman after `since` that they
+    do not hold again, from the lead_assignments tombstones. Empty for roles
+    that see every lead.
+    """
+    if current_user.role != "salesman":
+        return []
+    
+    held = db.query(models.LeadAssignment.contact_request_id).filter(
+        models.LeadAssignment.salesman_id == current_user.id
+    )
+    lost = db.query(models.DeletedRecord.record_id).filter(
+        models.DeletedRecord.feed == "lead_assignments",
+        models.DeletedRecord.owner_id == current_user.id,
+        models.DeletedRecord.deleted_at > since,
+        models.DeletedRecord.record_id.not_in(held)
+    ).distinct().order_by(models.DeletedRecord.record_id).all()
+    return [lead_id for (lead_id,) in lost]
+
+
 def require_admin(current_user: models.User = Depends(get_current_user)):
     """Dependency to check if user is admin"""
     if current_user.role != "admin":
@@ -29,6 +146,83 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 
+class LeadAccess:
+    """
+    Leads loaded for the current request together with their assigned salesman.
+    Each load is one joined query; leads already loaded are not fetched again,
+    so several access checks in one request cost a single round trip.
+    """
+
+    def __init__(self, db: Session, user: models.User):
+        self.db = db
+        self.user = user
+        self._leads: Dict[int, models.ContactRequest] = {}
+        self._owners: Dict[int, Optional[int]] = {}
+
+    def load(self, lead_ids: Iterable[int]) -> Dict[int, models.ContactRequest]:
+        """Load the given leads (those that exist) and their assignments"""
+        lead_ids = list(lead_ids)
+        missing = [lead_id for lead_id in lead_ids if lead_id not in self._owners]
+        if missing:
+            for lead_id in missing:
+                self._owners[lead_id] = None
+            rows = self.db.query(models.ContactRequest, models.LeadAssignment.salesman_id).outerjoin(
+                models.LeadAssignment, models.LeadAssignment.contact_request_id == models.ContactRequest.id
+            ).filter(models.ContactRequest.id.in_(missing)).all()
+            for lead, salesman_id in rows:
+                self._leads[lead.id] = lead
+                self._owners[lead.id] = salesman_id
+        return {lead_id: self._leads[lead_id] for lead_id in lead_ids if lead_id in self._leads}
+
+    def salesman_id(self, lead_id: int) -> Optional[int]:
+        self.load([lead_id])
+        return self._owners[lead_id]
+
+    def can_access(self, lead_id: int) -> bool:
+        """Admins and accountants can access any lead; salesmen only the leads assigned to them"""
+        return self.user.role != "salesman" or self.salesman_id(lead_id) == self.user.id
+
+    def get(self, lead_id: int, action: str = "access") -> models.ContactRequest:
+        """The lead, or 404 if it does not exist / 403 if the user may not touch it"""
+        lead = self.load([lead_id]).get(lead_id)
+        if lead is None:
+            raise HTTPException(status_code=404, detail="Contact request not found")
+        if not self.can_access(lead_id):
+            raise HTTPException(status_code=403, detail=f"You can only {action} leads assigned to you")
+        return lead
+
+
+def get_lead_access(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_lead_access)
+) -> LeadAccess:
+    """Per-request LeadAccess (FastAPI caches dependencies within a request)"""
+    return LeadAccess(db, current_user)
+
+
+def accessible_lead(action: str = "access"):
+    """Dependency that loads /{contact_id} and checks the current user may `action` it"""
+    def dependency(contact_id: int, access: LeadAccess = Depends(get_lead_access)) -> models.ContactRequest:
+        return access.get(contact_id, action)
+    return dependency
+
+
+def record_lead_created_event(db: Session, contact: models.ContactRequest) -> None:
+    lead_events.record(
+        db, lead_events.LEAD_CREATED, contact.id,
+        name=f"{contact.first_name} {contact.last_name}",
+        business_name=contact.business_name,
+        country=contact.country,
+        referral_source=contact.referral_source
+    )
+
+
+def record_new_lead(db: Session, contact: models.ContactRequest) -> None:
+    """Funnel rollup and lead.created event for a flushed new lead, in its transaction"""
+    lead_funnel.record_lead_created(db, contact)
+    record_lead_created_event(db, contact)
+
+
 @router.post("/submit", status_code=status.HTTP_201_CREATED)
 def submit_contact_form(
     request: Request,
@@ -38,9 +232,35 @@ def submit_contact_form(
     """
     Public endpoint to submit contact form data.
     Rate limited to 5 requests per minute per IP (handled by middleware).
+    With CONTACT_GROUP_COMMIT enabled, submissions are committed in small
+    batches by a shared writer; the id is still durable before the 201.
+    A repeat submission (same normalized email or phone) is linked to the
+    existing lead instead of creating a new one; what was submitted is kept
+    as a lead.resubmitted event on that lead.
     """
-    # Create ContactRequest in database
     try:
+        # Repeat submission: count it on the existing lead (indexed lookup)
+        existing = lead_keys.find_existing(db, contact_data.email, contact_data.phone, contact_data.country_code)
+        if existing:
+            db.query(models.ContactRequest).filter(models.ContactRequest.id == existing.id).update({
+                models.ContactRequest.duplicate_count: func.coalesce(models.ContactRequest.duplicate_count, 0) + 1,
+                models.ContactRequest.last_submitted_at: datetime.utcnow()
+            }, synchronize_session=False)
+            stats_counters.record_duplicate_lead(db)
+            lead_events.record(
+                db, lead_events.RESUBMITTED, existing.id,
+                existing.assignment.salesman_id if existing.assignment else None,
+                **contact_data.model_dump()
+            )
+            db.commit()
+            # Same response as a new lead so the form cannot be used to probe for existing contacts
+            return {
+                "id": existing.id,
+                "message": "Contact request submitted successfully",
+                "created_at": existing.created_at.isoformat()
+            }
+        
+        # Create ContactRequest in database
         new_contact = models.ContactRequest(
             first_name=contact_data.first_name,
             last_name=contact_data.last_name,
@@ -58,9 +278,27 @@ def submit_contact_form(
             updated_at=datetime.utcnow()
         )
         
-        db.add(new_contact)
-        db.commit()
-        db.refresh(new_contact)
+        if settings.CONTACT_GROUP_COMMIT:
+            writer = group_commit.writer_for(
+                db.get_bind(),
+                settings.CONTACT_GROUP_COMMIT_MAX_ROWS,
+                settings.CONTACT_GROUP_COMMIT_MAX_WAIT_MS
+            )
+            # The rollup and event commit in the writer's batch transaction, with the lead
+            new_contact = writer.submit(new_contact, after_insert=record_new_lead)
+        else:
+            db.add(new_contact)
+            db.flush()
+            record_new_lead(db, new_contact)
+            db.commit()
+            db.refresh(new_contact)
+        
+        if settings.LEAD_AUTO_ASSIGN_STRATEGY:
+            try:
+                auto_assign.assign_new_lead(db, new_contact, settings.LEAD_AUTO_ASSIGN_STRATEGY)
+            except Exception:
+                # The lead is saved; it just stays unassigned
+                db.rollback()
         
         # ========================================================================
         # EMAIL NOTIFICATION (Currently Disabled)
@@ -116,33 +354,49 @@ def submit_contact_form(
 
 # Admin Endpoints
 
-@router.get("/admin/contacts/export")
-def export_contacts(
+# Export columns (import-compatible names)
+CONTACT_EXPORT_COLUMNS = [
+    models.ContactRequest.id,
+    models.ContactRequest.first_name,
+    models.ContactRequest.last_name,
+    models.ContactRequest.email,
+    models.ContactRequest.phone,
+    models.ContactRequest.country_code,
+    models.ContactRequest.country,
+    models.ContactRequest.business_name,
+    models.ContactRequest.num_locations,
+    models.ContactRequest.referral_source,
+    models.ContactRequest.marketing_consent,
+    models.ContactRequest.language_preference,
+    models.ContactRequest.status,
+    models.ContactRequest.created_at,
+    models.ContactRequest.updated_at
+]
+CONTACT_EXPORT_HEADER = [column.key for column in CONTACT_EXPORT_COLUMNS]
+
+
+def contact_export_row(row) -> list:
+    values = list(row)
+    # Marketing consent as Yes/No, dates as YYYY-MM-DD HH:MM:SS
+    values[10] = "Yes" if row.marketing_consent else "No"
+    values[13] = exports.format_datetime(row.created_at)
+    values[14] = exports.format_datetime(row.updated_at)
+    return values
+
+
+def contact_export_query(
+    db: Session,
     status: Optional[str] = None,
     country: Optional[str] = None,
     referral_source: Optional[str] = None,
     language_preference: Optional[str] = None,
     marketing_consent: Optional[bool] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin_or_accountant)
+    end_date: Optional[str] = None
 ):
-    """
-    Export contact requests as CSV file with multiple filters.
-    Admin and accountant only endpoint.
-    
-    Filters:
-    - status: Filter by contact status
-    - country: Filter by country
-    - referral_source: Filter by referral source
-    - language_preference: Filter by language (en/ar)
-    - marketing_consent: Filter by marketing consent (true/false)
-    - start_date: Filter by created date (YYYY-MM-DD) - from this date
-    - end_date: Filter by created date (YYYY-MM-DD) - to this date
-    """
-    # Build query
-    query = db.query(models.ContactRequest)
+    """Filtered, newest-first query over the export columns (shared with export jobs)"""
+    # Build query (only the exported columns, no ORM objects)
+    query = db.query(*CONTACT_EXPORT_COLUMNS)
     
     # Apply filters
     if status:
@@ -167,7 +421,7 @@ def export_contacts(
             query = query.filter(models.ContactRequest.created_at >= start_datetime)
         except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
+                status_code=400,
                 detail="Invalid start_date format. Use YYYY-MM-DD"
             )
     
@@ -179,99 +433,83 @@ def export_contacts(
             query = query.filter(models.ContactRequest.created_at <= end_datetime)
         except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
+                status_code=400,
                 detail="Invalid end_date format. Use YYYY-MM-DD"
             )
     
     # Order by created_at descending (newest first)
-    query = query.order_by(models.ContactRequest.created_at.desc())
-    
-    # Get all contacts
-    contacts = query.all()
-    
-    # Create CSV in memory with UTF-8 BOM for Excel compatibility
-    output = io.StringIO()
-    
-    # Write UTF-8 BOM (Byte Order Mark) for Excel to recognize UTF-8 encoding
-    # This fixes Arabic text corruption in Excel
-    output.write('\ufeff')
-    
-    writer = csv.writer(output)
-    
-    # Write header row (using import-compatible column names)
-    writer.writerow([
-        'id',
-        'first_name',
-        'last_name',
-        'email',
-        'phone',
-        'country_code',
-        'country',
-        'business_name',
-        'num_locations',
-        'referral_source',
-        'marketing_consent',
-        'language_preference',
-        'status',
-        'created_at',
-        'updated_at'
-    ])
-    
-    # Write data rows
-    for contact in contacts:
-        # Format dates in readable format (YYYY-MM-DD HH:MM:SS)
-        created_at_formatted = contact.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        updated_at_formatted = contact.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Format marketing consent as Yes/No
-        marketing_consent_formatted = "Yes" if contact.marketing_consent else "No"
-        
-        writer.writerow([
-            contact.id,
-            contact.first_name,
-            contact.last_name,
-            contact.email,
-            contact.phone,
-            contact.country_code,
-            contact.country,
-            contact.business_name,
-            contact.num_locations,
-            contact.referral_source,
-            marketing_consent_formatted,
-            contact.language_preference,
-            contact.status,
-            created_at_formatted,
-            updated_at_formatted
-        ])
-    
-    # Prepare CSV for download
-    output.seek(0)
-    
-    # Generate filename with timestamp and filter info
+    return query.order_by(models.ContactRequest.created_at.desc())
+
+
+def contact_export_filename(
+    status: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> str:
+    """Export filename (without extension) with timestamp and filter info"""
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     filter_suffix = ""
     if status:
         filter_suffix += f"_{status}"
     if start_date or end_date:
         filter_suffix += "_filtered"
+    return f"contact_requests{filter_suffix}_{timestamp}"
+
+
+@router.get("/admin/contacts/export")
+def export_contacts(
+    status: Optional[str] = None,
+    country: Optional[str] = None,
+    referral_source: Optional[str] = None,
+    language_preference: Optional[str] = None,
+    marketing_consent: Optional[bool] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Export contact requests as CSV (default) or NDJSON with multiple filters,
+    optionally gzip-compressed (compression=gzip).
+    Admin and accountant only endpoint.
+    
+    Filters:
+    - status: Filter by contact status
+    - country: Filter by country
+    - referral_source: Filter by referral source
+    - language_preference: Filter by language (en/ar)
+    - marketing_consent: Filter by marketing consent (true/false)
+    - start_date: Filter by created date (YYYY-MM-DD) - from this date
+    - end_date: Filter by created date (YYYY-MM-DD) - to this date
+    """
+    exports.validate_options(format, compression)
     
-    filename = f"contact_requests{filter_suffix}_{timestamp}.csv"
+    query = contact_export_query(
+        db, status, country, referral_source, language_preference,
+        marketing_consent, start_date, end_date
+    )
     
-    # Return as streaming response with proper headers
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+    # Rows are fetched and encoded batch by batch while the response streams
+    return exports.export_response(
+        db.get_bind(), query.statement, contact_export_filename(status, start_date, end_date),
+        format, compression,
+        header=CONTACT_EXPORT_HEADER, format_row=contact_export_row
     )
 
 
 @router.get("/admin/contacts", response_model=List[ContactRequestResponse])
 def get_all_contacts(
     status: Optional[str] = None,
+    country: Optional[str] = None,
+    referral_source: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    cursor: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    request: Request = None,
+    response: Response = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_lead_access)
 ):
@@ -281,6 +519,10 @@ def get_all_contacts(
     - Admin/Accountant: See all leads
     - Salesman: See only assigned leads
     - Technical: 403 Forbidden
+    Filters: status, country, referral_source, assigned_to (salesman id or "unassigned").
+    Paginate with the opaque cursors returned in the X-Next-Cursor / X-Prev-Cursor
+    headers; `offset` is deprecated and ignored when a cursor is given.
+    Supports If-None-Match; unchanged pages return 304.
     """
     # Technical users should not access this endpoint
     if current_user.role == "technical":
@@ -289,118 +531,259 @@ def get_all_contacts(
             detail="Technical users cannot access leads"
         )
     
-    query = db.query(models.ContactRequest)
+    # Leads, assignments, notes and salesman names all feed into the page
+    not_modified = conditional.check(
+        request, response, db, "contacts.admin_contacts",
+        [models.ContactRequest, models.LeadAssignment, models.ContactNote, models.User],
+        current_user.role, current_user.id, status, country, referral_source,
+        assigned_to, cursor, limit, offset
+    )
+    if not_modified:
+        return not_modified
     
-    # Filter based on role
-    if current_user.role == "salesman":
-        # Salesman: only see assigned leads
-        assigned_lead_ids = db.query(models.LeadAssignment.contact_request_id).filter(
-            models.LeadAssignment.salesman_id == current_user.id
-        ).subquery()
-        query = query.filter(models.ContactRequest.id.in_(assigned_lead_ids))
-    # Admin and accountant see all leads (no additional filter)
-    
-    # Apply status filter if provided
+    # One query: leads + assignee + notes count (salesmen only see assigned leads)
+    query = lead_list_query(db, current_user)
+    
+    # Apply filters
     if status:
         query = query.filter(models.ContactRequest.status == status)
     
-    # Order by created_at descending (newest first)
-    query = query.order_by(models.ContactRequest.created_at.desc())
-    
-    # Apply pagination
-    contacts = query.offset(offset).limit(limit).all()
-    
-    # Build response with notes count and assignment info
-    result = []
-    for contact in contacts:
-        # Get assignment info
-        assignment = db.query(models.LeadAssignment).filter(
-            models.LeadAssignment.contact_request_id == contact.id
-        ).first()
-        
-        contact_dict = {
-            "id": contact.id,
-            "first_name": contact.first_name,
-            "last_name": contact.last_name,
-            "email": contact.email,
-            "phone": contact.phone,
-            "country_code": contact.country_code,
-            "country": contact.country,
-            "business_name": contact.business_name,
-            "num_locations": contact.num_locations,
-            "referral_source": contact.referral_source,
-            "marketing_consent": contact.marketing_consent,
-            "language_preference": contact.language_preference,
-            "status": contact.status,
-            "created_at": contact.created_at,
-            "updated_at": contact.updated_at,
-            "notes_count": len(contact.notes)
-        }
+    if country:
+        query = query.filter(models.ContactRequest.country == country)
+    
+    if referral_source:
+        query = query.filter(models.ContactRequest.referral_source == referral_source)
+    
+    if assigned_to == "unassigned":
+        query = query.filter(models.LeadAssignment.id.is_(None))
+    elif assigned_to:
+        try:
+            salesman_id = int(assigned_to)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="assigned_to must be a salesman id or 'unassigned'")
+        query = query.filter(models.LeadAssignment.salesman_id == salesman_id)
+    
+    limit = max(1, min(limit, 500))
+    
+    if cursor is None:
+        # First page, or the deprecated OFFSET fallback
+        query = query.order_by(
+            models.ContactRequest.created_at.desc(),
+            models.ContactRequest.id.desc()
+        )
+        results = query.offset(offset).limit(limit + 1).all()
+        has_more = len(results) > limit
+        results = results[:limit]
+        has_next, has_prev = has_more, offset > 0
+        if offset and response is not None:
+            response.headers["Deprecation"] = "true"
+    else:
+        try:
+            created_at, row_id, direction = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         
-        # Add assignment info if exists
-        if assignment:
-            contact_dict["assigned_to"] = {
-                "id": assignment.salesman_id,
-                "email": assignment.salesman.email,
-                "full_name": assignment.salesman.full_name
-            }
+        query = pagination.seek(
+            query, models.ContactRequest.created_at, models.ContactRequest.id,
+            created_at, row_id, direction
+        )
+        results = query.limit(limit + 1).all()
+        has_more = len(results) > limit
+        results = results[:limit]
+        if direction == pagination.PREV:
+            results.reverse()
+            has_next, has_prev = True, has_more
         else:
-            contact_dict["assigned_to"] = None
-        
-        result.append(contact_dict)
+            has_next, has_prev = has_more, True
+    
+    if response is not None and results:
+        first, last = results[0][0], results[-1][0]
+        if has_next:
+            response.headers["X-Next-Cursor"] = pagination.encode_cursor(last.created_at, last.id, pagination.NEXT)
+        if has_prev:
+            response.headers["X-Prev-Cursor"] = pagination.encode_cursor(first.created_at, first.id, pagination.PREV)
+    
+    return lead_rows(results)
+
+
+@router.get("/admin/contacts/search")
+def search_contacts(
+    q: str,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_lead_access)
+):
+    """
+    Full-text search over lead name, email, phone, business name and notes.
+    Every word must match as a prefix; Arabic is matched without diacritics.
+    Results are ranked best first. Salesmen only see their assigned leads.
+    """
+    if current_user.role == "technical":
+        raise HTTPException(status_code=403, detail="Technical users cannot access leads")
+    
+    if len(q) > 200:
+        raise HTTPException(status_code=400, detail="Search query is too long")
+    
+    search.ensure_search_index(db.get_bind())
+    matches = search.search_lead_ids(db, q, current_user, max(1, min(limit, 100)))
+    if not matches:
+        return []
+    
+    scores = dict(matches)
+    rank = {lead_id: position for position, (lead_id, _) in enumerate(matches)}
+    results = lead_list_query(db, current_user).filter(
+        models.ContactRequest.id.in_(scores)
+    ).all()
+    
+    rows = lead_rows(results)
+    for row in rows:
+        row["score"] = scores[row["id"]]
+    rows.sort(key=lambda row: rank[row["id"]])
+    return rows
+
+
+# Seconds between keep-alive comments on an idle event stream (proxies drop silent connections)
+EVENT_STREAM_KEEPALIVE = 15
+
+
+def sse_message(event_type: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event_type}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/admin/contacts/events")
+async def stream_lead_events(
+    request: Request,
+    last_event_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_lead_access)
+):
+    """
+    Server-sent events for lead activity: lead.created, lead.status_changed,
+    lead.assigned and lead.note_added. Salesmen only receive events for leads
+    assigned to them.
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) to replay what
+    they missed; a "reset" event means the gap is no longer retained and the
+    client should reload its lead list; it is also sent when more events were
+    missed than can be replayed, or when the client reads too slowly to keep up.
+    """
+    engine = db.get_bind()
+    # The stream outlives the request; release the pooled connection now
+    user = SimpleNamespace(id=current_user.id, role=current_user.role)
+    db.close()
+    header = request.headers.get("last-event-id", "")
+    if last_event_id is None and header.isdigit():
+        last_event_id = int(header)
+    
+    bus = lead_events.bus_for(engine)
+    queue = bus.subscribe()
+    
+    async def stream():
+        try:
+            replayed = set()
+            if last_event_id is None:
+                latest = await run_in_threadpool(lead_events.latest_id, engine)
+                yield sse_message("ready", {}, latest)
+            else:
+                missed = await run_in_threadpool(lead_events.replay, engine, last_event_id, user)
+                if missed is None:
+                    latest = await run_in_threadpool(lead_events.latest_id, engine)
+                    yield sse_message(lead_events.RESET, {}, latest)
+                else:
+                    for lead_event in missed:
+                        replayed.add(lead_event["id"])
+                        yield sse_message(lead_event["type"], lead_event, lead_event["id"])
+            
+            while not await request.is_disconnected():
+                try:
+                    lead_event = await asyncio.wait_for(queue.get(), EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if lead_event["type"] == lead_events.RESET:
+                    yield sse_message(lead_events.RESET, {}, lead_event["id"])
+                    continue
+                if lead_event["id"] in replayed or not lead_events.visible_to(lead_event, user):
+                    continue
+                yield sse_message(lead_event["type"], lead_event, lead_event["id"])
+        finally:
+            bus.unsubscribe(queue)
     
-    return result
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def contact_notes_page(db: Session, contact_id: int, limit: int, cursor: Optional[str], newest_first: bool):
+    """One page of a lead's notes with author emails, in a single joined query; returns (notes, next_cursor)"""
+    query = db.query(
+        models.ContactNote.id,
+        models.ContactNote.note_text,
+        models.ContactNote.created_at,
+        models.User.email
+    ).join(
+        models.User, models.User.id == models.ContactNote.admin_id
+    ).filter(models.ContactNote.contact_request_id == contact_id)
+    
+    if cursor is None and newest_first:
+        query = query.order_by(models.ContactNote.created_at.desc(), models.ContactNote.id.desc())
+    elif cursor is None:
+        query = query.order_by(models.ContactNote.created_at.asc(), models.ContactNote.id.asc())
+    else:
+        try:
+            created_at, row_id, direction = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid notes cursor")
+        query = pagination.seek(
+            query, models.ContactNote.created_at, models.ContactNote.id,
+            created_at, row_id, pagination.NEXT, newest_first
+        )
+    
+    results = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = pagination.encode_cursor(last.created_at, last.id, pagination.NEXT)
+    
+    notes = [{
+        "id": note.id,
+        "note_text": note.note_text,
+        "admin_email": note.email,
+        "created_at": note.created_at.isoformat()
+    } for note in results]
+    return notes, next_cursor
 
 
 @router.get("/admin/contacts/{contact_id}")
 def get_contact_detail(
     contact_id: int,
+    include_notes: bool = True,
+    notes_limit: int = 100,
+    notes_cursor: Optional[str] = None,
+    notes_order: str = "asc",
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_lead_access)
+    contact: models.ContactRequest = Depends(accessible_lead("access"))
 ):
     """
     Get detailed contact request with notes.
+    Notes come oldest first (notes_order=desc for newest first), notes_limit
+    per page; follow notes_next_cursor for more. include_notes=false returns
+    the lead only (for list hovers).
     Role-based access:
     - Admin/Accountant: Can access any lead
     - Salesman: Can only access assigned leads
     """
-    contact = db.query(models.ContactRequest).filter(
-        models.ContactRequest.id == contact_id
-    ).first()
-    
-    if not contact:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contact request not found"
-        )
+    if notes_order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="notes_order must be 'asc' or 'desc'")
+    notes_limit = max(1, min(notes_limit, 500))
     
-    # Check if salesman is trying to access unassigned lead
-    if current_user.role == "salesman":
-        assignment = db.query(models.LeadAssignment).filter(
-            models.LeadAssignment.contact_request_id == contact_id,
-            models.LeadAssignment.salesman_id == current_user.id
-        ).first()
-        
-        if not assignment:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only access leads assigned to you"
-            )
-    
-    # Build notes list
-    notes = []
-    for note in contact.notes:
-        notes.append({
-            "id": note.id,
-            "note_text": note.note_text,
-            "admin_email": note.admin.email,
-            "created_at": note.created_at.isoformat()
-        })
-    
-    # Sort notes chronologically (oldest first)
-    notes.sort(key=lambda x: x["created_at"])
-    
-    return {
+    detail = {
         "id": contact.id,
         "first_name": contact.first_name,
         "last_name": contact.last_name,
@@ -416,8 +799,16 @@ def get_contact_detail(
         "status": contact.status,
         "created_at": contact.created_at.isoformat(),
         "updated_at": contact.updated_at.isoformat(),
-        "notes": notes
+        "duplicate_count": contact.duplicate_count or 0,
+        "last_submitted_at": contact.last_submitted_at.isoformat() if contact.last_submitted_at else None
     }
+    
+    if include_notes:
+        detail["notes"], detail["notes_next_cursor"] = contact_notes_page(
+            db, contact_id, notes_limit, notes_cursor, notes_order == "desc"
+        )
+    
+    return detail
 
 
 @router.put("/admin/contacts/{contact_id}/status")
@@ -425,7 +816,8 @@ def update_contact_status(
     contact_id: int,
     status_update: ContactStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_lead_access)
+    access: LeadAccess = Depends(get_lead_access),
+    contact: models.ContactRequest = Depends(accessible_lead("update"))
 ):
     """
     Update contact request status.
@@ -433,30 +825,13 @@ def update_contact_status(
     - Admin/Accountant: Can update any lead
     - Salesman: Can only update assigned leads
     """
-    contact = db.query(models.ContactRequest).filter(
-        models.ContactRequest.id == contact_id
-    ).first()
-    
-    if not contact:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contact request not found"
-        )
-    
-    # Check if salesman is trying to update unassigned lead
-    if current_user.role == "salesman":
-        assignment = db.query(models.LeadAssignment).filter(
-            models.LeadAssignment.contact_request_id == contact_id,
-            models.LeadAssignment.salesman_id == current_user.id
-        ).first()
-        
-        if not assignment:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only update leads assigned to you"
-            )
-    
     # Update status
+    lead_funnel.record_status_change(db, contact, contact.status, status_update.status, access.user.id)
+    if contact.status != status_update.status:
+        lead_events.record(
+            db, lead_events.STATUS_CHANGED, contact.id, access.salesman_id(contact.id),
+            from_status=contact.status, to_status=status_update.status, by=access.user.email
+        )
     contact.status = status_update.status
     contact.updated_at = datetime.utcnow()
     
@@ -482,7 +857,8 @@ def add_contact_note(
     contact_id: int,
     note_data: ContactNoteCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_lead_access)
+    access: LeadAccess = Depends(get_lead_access),
+    contact: models.ContactRequest = Depends(accessible_lead("add notes to"))
 ):
     """
     Add note to contact request.
@@ -490,40 +866,21 @@ def add_contact_note(
     - Admin/Accountant: Can add notes to any lead
     - Salesman: Can only add notes to assigned leads
     """
-    # Check if contact exists
-    contact = db.query(models.ContactRequest).filter(
-        models.ContactRequest.id == contact_id
-    ).first()
-    
-    if not contact:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contact request not found"
-        )
-    
-    # Check if salesman is trying to add note to unassigned lead
-    if current_user.role == "salesman":
-        assignment = db.query(models.LeadAssignment).filter(
-            models.LeadAssignment.contact_request_id == contact_id,
-            models.LeadAssignment.salesman_id == current_user.id
-        ).first()
-        
-        if not assignment:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only add notes to leads assigned to you"
-            )
-    
     # Create note
     new_note = models.ContactNote(
         contact_request_id=contact_id,
-        admin_id=current_user.id,
+        admin_id=access.user.id,
         note_text=note_data.note_text,
         created_at=datetime.utcnow()
     )
     
     try:
         db.add(new_note)
+        db.flush()
+        lead_events.record(
+            db, lead_events.NOTE_ADDED, contact_id, access.salesman_id(contact_id),
+            note_id=new_note.id, note_text=new_note.note_text, by=access.user.email
+        )
         db.commit()
         db.refresh(new_note)
         
@@ -531,7 +888,7 @@ def add_contact_note(
             "id": new_note.id,
             "contact_request_id": new_note.contact_request_id,
             "note_text": new_note.note_text,
-            "admin_email": current_user.email,
+            "admin_email": access.user.email,
             "created_at": new_note.created_at
         }
     except Exception as e:
@@ -540,3 +897,125 @@ def add_contact_note(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to add note"
         )
+
+
+@router.post("/admin/contacts/bulk")
+def bulk_update_contacts(
+    operation: ContactBulkOperation,
+    db: Session = Depends(get_db),
+    access: LeadAccess = Depends(get_lead_access)
+):
+    """
+    Apply status / assignment / note changes to many leads in one transaction.
+    Role-based access:
+    - Admin/Accountant: Any lead; can assign (salesman_id)
+    - Salesman: Only assigned leads; cannot assign
+    Returns a per-lead result: updated, not_found or forbidden.
+    """
+    if operation.status is None and operation.salesman_id is None and operation.note_text is None:
+        raise HTTPException(status_code=400, detail="Nothing to do. Provide status, salesman_id and/or note_text")
+
+    if operation.salesman_id is not None:
+        if access.user.role == "salesman":
+            raise HTTPException(status_code=403, detail="Salesmen cannot assign leads")
+        salesman = db.query(models.User).filter(models.User.id == operation.salesman_id).first()
+        if not salesman:
+            raise HTTPException(status_code=404, detail="Salesman not found")
+        if salesman.role != "salesman":
+            raise HTTPException(status_code=400, detail=f"User {salesman.email} does not have salesman role")
+
+    lead_ids = list(dict.fromkeys(operation.lead_ids))
+
+    # One lookup for existence, current assignment and role scoping
+    leads = access.load(lead_ids)
+    current = {lead_id: access.salesman_id(lead_id) for lead_id in leads}
+
+    results = []
+    allowed = []
+    for lead_id in lead_ids:
+        if lead_id not in leads:
+            results.append({"id": lead_id, "result": "not_found"})
+        elif not access.can_access(lead_id):
+            results.append({"id": lead_id, "result": "forbidden"})
+        else:
+            results.append({"id": lead_id, "result": "updated"})
+            allowed.append(lead_id)
+
+    if allowed:
+        now = datetime.utcnow()
+        # Salesman each lead belongs to once this operation is applied (scopes the stream events)
+        owners = {lead_id: operation.salesman_id or current[lead_id] for lead_id in allowed}
+        try:
+            if operation.status is not None:
+                lead_funnel.record_status_changes(
+                    db, [(leads[lead_id], leads[lead_id].status) for lead_id in allowed], operation.status, access.user.id
+                )
+                lead_events.record_many(db, lead_events.STATUS_CHANGED, [
+                    (lead_id, owners[lead_id], {"from_status": leads[lead_id].status, "to_status": operation.status, "by": access.user.email})
+                    for lead_id in allowed if leads[lead_id].status != operation.status
+                ])
+                db.execute(
+                    update(models.ContactRequest)
+                    .where(models.ContactRequest.id.in_(allowed))
+                    .values(status=operation.status, updated_at=now),
+                    execution_options={"synchronize_session": False}
+                )
+
+            if operation.salesman_id is not None:
+                reassigned = [lead_id for lead_id in allowed if current[lead_id] is not None]
+                unassigned = [lead_id for lead_id in allowed if current[lead_id] is None]
+                if reassigned:
+                    # Salesmen who lose a lead drop it on their next delta sync
+                    changes.record_deletions(db, "lead_assignments", [
+                        (lead_id, current[lead_id]) for lead_id in reassigned
+                        if current[lead_id] != operation.salesman_id
+                    ])
+                    db.execute(
+                        update(models.LeadAssignment)
+                        .where(models.LeadAssignment.contact_request_id.in_(reassigned))
+                        .values(salesman_id=operation.salesman_id, assigned_by_id=access.user.id, updated_at=now),
+                        execution_options={"synchronize_session": False}
+                    )
+                if unassigned:
+                    db.execute(insert(models.LeadAssignment), [
+                        {
+                            "contact_request_id": lead_id,
+                            "salesman_id": operation.salesman_id,
+                            "assigned_by_id": access.user.id,
+                            "assigned_at": now,
+                            "updated_at": now
+                        }
+                        for lead_id in unassigned
+                    ])
+                lead_events.record_many(db, lead_events.ASSIGNED, [
+                    (lead_id, operation.salesman_id, {"by": access.user.email})
+                    for lead_id in allowed
+                ])
+
+            if operation.note_text is not None:
+                db.execute(insert(models.ContactNote), [
+                    {
+                        "contact_request_id": lead_id,
+                        "admin_id": access.user.id,
+                        "note_text": operation.note_text,
+                        "created_at": now
+                    }
+                    for lead_id in allowed
+                ])
+                lead_events.record_many(db, lead_events.NOTE_ADDED, [
+                    (lead_id, owners[lead_id], {"note_text": operation.note_text, "by": access.user.email})
+                    for lead_id in allowed
+                ])
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail="Failed to update leads")
+        if operation.salesman_id is not None:
+            auto_assign.engine.invalidate()
+
+    return {
+        "updated": len(allowed),
+        "skipped": len(lead_ids) - len(allowed),
+        "results": results
+    }
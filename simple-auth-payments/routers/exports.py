@@ -0,0 +1,164 @@
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_db
+from routers.auth import require_admin_or_accountant
+from routers import admin as admin_router
+from routers import contacts as contacts_router
+from schemas import ExportJobCreate
+from utils import export_jobs, exports
+import models
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+# kind -> (query builder, filename builder, CSV header, CSV row formatter)
+EXPORT_KINDS = {
+    "contacts": (
+        contacts_router.contact_export_query,
+        lambda filters: contacts_router.contact_export_filename(
+            filters.get("status"), filters.get("start_date"), filters.get("end_date")
+        ),
+        contacts_router.CONTACT_EXPORT_HEADER,
+        contacts_router.contact_export_row
+    ),
+    "payments": (
+        admin_router.payment_export_query,
+        lambda filters: admin_router.payment_export_filename(),
+        admin_router.PAYMENT_EXPORT_HEADER,
+        admin_router.payment_export_row
+    )
+}
+
+
+def _housekeeping(db: Session) -> None:
+    """Expire old export files and release jobs whose worker died"""
+    if export_jobs.cleanup_expired(db) + export_jobs.fail_interrupted(db):
+        db.commit()
+
+
+def _get_own_job(db: Session, job_id: int, user: models.User) -> models.ExportJob:
+    job = db.query(models.ExportJob).filter(
+        models.ExportJob.id == job_id,
+        models.ExportJob.user_id == user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(
+    job_data: ExportJobCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Start a background export (kind: contacts or payments) with the same filters,
+    format and compression options as the direct export endpoints.
+    Poll GET /exports/{id} for progress, then download from /exports/{id}/download.
+    """
+    if job_data.kind not in EXPORT_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid kind. Must be one of: {', '.join(EXPORT_KINDS)}"
+        )
+    exports.validate_options(job_data.format, job_data.compression)
+
+    _housekeeping(db)
+    active = export_jobs.active_job_count(db, current_user.id)
+    if active >= settings.EXPORT_MAX_ACTIVE_JOBS_PER_USER:
+        raise HTTPException(
+            status_code=429,
+            detail=f"You already have {active} export(s) in progress. Wait for one to finish."
+        )
+
+    build_query, build_filename, header, format_row = EXPORT_KINDS[job_data.kind]
+    try:
+        query = build_query(db, **job_data.filters)
+    except TypeError:
+        raise HTTPException(status_code=400, detail="Invalid export filters")
+
+    job = models.ExportJob(
+        user_id=current_user.id,
+        kind=job_data.kind,
+        params=json.dumps(job_data.filters),
+        format=job_data.format,
+        compression=job_data.compression,
+        status=export_jobs.QUEUED,
+        filename=exports.export_filename(build_filename(job_data.filters), job_data.format, job_data.compression)
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    background_tasks.add_task(export_jobs.run_job, db.get_bind(), job.id, query.statement, header, format_row)
+    return export_jobs.job_to_dict(job)
+
+
+@router.get("")
+def list_export_jobs(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """List your export jobs, newest first"""
+    _housekeeping(db)
+    jobs = db.query(models.ExportJob).filter(
+        models.ExportJob.user_id == current_user.id
+    ).order_by(models.ExportJob.id.desc()).limit(50).all()
+    return [export_jobs.job_to_dict(job) for job in jobs]
+
+
+@router.get("/{job_id}")
+def get_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """Export job status and progress"""
+    return export_jobs.job_to_dict(_get_own_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """
+    Download a finished export. Supports Range requests, so an interrupted
+    download can be resumed (e.g. curl -C -).
+    """
+    job = _get_own_job(db, job_id, current_user)
+    if export_jobs.expire_if_due(job):
+        db.commit()
+    if job.status == export_jobs.EXPIRED:
+        raise HTTPException(status_code=410, detail="Export has expired")
+    if job.status != export_jobs.COMPLETED or not job.file_path:
+        raise HTTPException(status_code=409, detail=f"Export is not ready (status: {job.status})")
+
+    return FileResponse(
+        job.file_path,
+        media_type=exports.media_type(job.format, job.compression),
+        filename=job.filename
+    )
+
+
+@router.delete("/{job_id}")
+def delete_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin_or_accountant)
+):
+    """Delete a finished export job and its file"""
+    job = _get_own_job(db, job_id, current_user)
+    if job.status in export_jobs.ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail="Export is still running")
+
+    export_jobs.delete_job_file(job)
+    db.delete(job)
+    db.commit()
+    return {"message": "Export deleted", "job_id": job_id}
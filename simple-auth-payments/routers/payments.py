@@ -6,6 +6,7 @@ from schemas import BundleResponse, PaymentCreate
 from routers.auth import get_current_user_from_cookie
 import models
 from services.stripe_service import create_payment_intent, verify_webhook_signature
+from utils import stats_counters, analytics
 import stripe
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -184,6 +185,7 @@ def create_payment(
     )
     
     db.add(new_payment)
+    stats_counters.record_payment_created(db, new_payment)
     db.commit()
     db.refresh(new_payment)
     
@@ -235,7 +237,9 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         if payment:
             from datetime import datetime, timedelta
             
+            stats_counters.record_payment_status_change(db, payment, payment.status, "succeeded")
             payment.status = "succeeded"
+            analytics.mark_day_dirty(db, payment.created_at)
             
             # Get months from payment record
             months = payment.months_purchased or 1
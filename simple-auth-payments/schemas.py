@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -109,12 +109,23 @@ class ContactStatusUpdate(BaseModel):
     status: str = Field(..., pattern=r'^(new|contacted|qualified|converted|not_interested)$')
 
 
+class ContactBulkOperation(BaseModel):
+    lead_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: Optional[str] = Field(None, pattern=r'^(new|contacted|qualified|converted|not_interested)$')
+    salesman_id: Optional[int] = Field(None, gt=0)
+    note_text: Optional[str] = Field(None, min_length=1, max_length=2000)
+
+
 # Lead Assignment Schemas
 
 class LeadAssignmentCreate(BaseModel):
     salesman_id: int = Field(..., gt=0)
 
 
+class LeadDistributeRequest(BaseModel):
+    strategy: str = Field("least_loaded", pattern=r'^(round_robin|least_loaded|country_affinity)$')
+
+
 class LeadAssignmentResponse(BaseModel):
     id: int
     contact_request_id: int
@@ -126,3 +137,19 @@ class LeadAssignmentResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# Export Job Schemas
+
+class ExportJobCreate(BaseModel):
+    kind: str = Field(..., max_length=50)  # "contacts" or "payments"
+    format: str = Field("csv", max_length=20)
+    compression: Optional[str] = Field(None, max_length=20)
+    filters: Dict[str, Optional[Union[bool, int, str]]] = {}  # same filters as the export endpoint
+
+
+# Import Job Schemas
+
+class ImportJobCreate(BaseModel):
+    import_session_id: int  # returned by /admin/leads/import/validate
+    duplicate_action: str = Field("skip", pattern=r'^(skip|overwrite|import_all)$')
@@ -0,0 +1,125 @@
+"""
+Background CSV import jobs: a worker that dies mid-job must resume from its
+last committed chunk without importing any row twice.
+"""
+import io
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+import models
+from conftest import TestingSessionLocal, create_test_user, engine
+from config import settings
+from utils import import_jobs, import_sessions
+from utils.csv_importer import CSVImporter
+
+
+ROWS = 10
+CHUNK = 3
+
+
+class WorkerDied(BaseException):
+    """Stands in for the process dying; not an Exception, so run_job cannot catch it"""
+
+
+def _csv() -> io.BytesIO:
+    lines = ["first_name,last_name,email,phone,country_code"]
+    lines += [f"Lead,{i},lead{i}@example.com,50000{i:04d},+966" for i in range(ROWS)]
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+@pytest.fixture
+def staged_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(CSVImporter, "CHUNK_SIZE", CHUNK)
+    admin = create_test_user("importer@example.com", "password123", role="admin")
+    db = TestingSessionLocal()
+    try:
+        staged = import_sessions.stage(db, CSVImporter(db), admin.id, "leads.csv", _csv())
+        import_session = staged["session"]
+        import_session.status = import_sessions.EXECUTING
+        job = models.ImportJob(
+            user_id=admin.id,
+            import_session_id=import_session.id,
+            duplicate_action="import_all",
+            status=import_jobs.QUEUED,
+            rows_total=import_session.valid_rows
+        )
+        db.add(job)
+        db.commit()
+        yield job.id
+    finally:
+        db.query(models.ImportJob).delete()
+        db.query(models.ImportSession).delete()
+        db.commit()
+        db.close()
+
+
+def test_resume_after_crash_on_checkpoint_does_not_duplicate_rows(staged_job):
+    checkpoints = [0]
+
+    def die_on_second_checkpoint(mapper, connection, target):
+        checkpoints[0] += 1
+        if checkpoints[0] == 2:
+            raise WorkerDied()
+
+    # Fires when on_chunk flushes the job's checkpoint, after the chunk's leads were written
+    event.listen(models.ImportJob, "before_update", die_on_second_checkpoint)
+    try:
+        with pytest.raises(WorkerDied):
+            import_jobs.run_job(engine, staged_job)
+    finally:
+        event.remove(models.ImportJob, "before_update", die_on_second_checkpoint)
+
+    db = TestingSessionLocal()
+    try:
+        job = db.get(models.ImportJob, staged_job)
+        # Only the first chunk and its checkpoint were committed
+        assert job.status == import_jobs.RUNNING
+        assert job.rows_done == CHUNK
+        assert db.query(models.ContactRequest).count() == CHUNK
+
+        # A live lease keeps the job from being requeued
+        assert import_jobs.requeue_interrupted(db) == []
+        job.heartbeat_at = datetime.utcnow() - import_jobs.STALE_AFTER - timedelta(seconds=1)
+        db.commit()
+        assert import_jobs.requeue_interrupted(db) == [staged_job]
+        db.commit()
+    finally:
+        db.close()
+
+    import_jobs.run_job(engine, staged_job)
+
+    db = TestingSessionLocal()
+    try:
+        job = db.get(models.ImportJob, staged_job)
+        assert job.status == import_jobs.COMPLETED
+        assert job.rows_done == ROWS
+        assert job.imported == ROWS
+        assert job.attempts == 2
+        emails = [email for (email,) in db.query(models.ContactRequest.email)]
+        assert sorted(emails) == sorted(f"lead{i}@example.com" for i in range(ROWS))
+    finally:
+        db.close()
+
+
+def test_worker_that_lost_its_lease_rolls_back_its_chunk(staged_job, monkeypatch):
+    renew = import_jobs._renew_lease
+    calls = [0]
+
+    def taken_over_after_first_chunk(db, job_id, owner):
+        calls[0] += 1
+        return calls[0] == 1 and renew(db, job_id, owner)
+
+    # Another worker requeued and claimed the job while the second chunk was written
+    monkeypatch.setattr(import_jobs, "_renew_lease", taken_over_after_first_chunk)
+    import_jobs.run_job(engine, staged_job)
+
+    db = TestingSessionLocal()
+    try:
+        job = db.get(models.ImportJob, staged_job)
+        # Left to the new owner: not finished, and the second chunk was not committed
+        assert job.status == import_jobs.RUNNING
+        assert job.rows_done == CHUNK
+        assert db.query(models.ContactRequest).count() == CHUNK
+    finally:
+        db.close()
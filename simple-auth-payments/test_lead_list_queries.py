@@ -0,0 +1,93 @@
+"""
+Query budget for the lead list: a page of leads with their assignee and notes
+count must stay at one or two SQL statements however many leads, assignments
+and notes it holds (no per-row lookups).
+"""
+from contextlib import contextmanager
+from fastapi import Response
+from sqlalchemy import event
+import models
+from conftest import TestingSessionLocal, create_test_user, engine
+from routers.contacts import get_all_contacts
+
+
+LEADS = 60
+PAGE = 25
+QUERY_BUDGET = 2
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Transaction control is not a query
+        if statement != "BEGIN":
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _seed(admin: models.User, salesman: models.User) -> None:
+    db = TestingSessionLocal()
+    try:
+        for i in range(LEADS):
+            lead = models.ContactRequest(
+                first_name="Lead", last_name=str(i), email=f"lead{i}@example.com",
+                phone=f"50000{i:04d}", country_code="+966", country="Saudi Arabia",
+                business_name="Business", num_locations="1", referral_source="other"
+            )
+            db.add(lead)
+            db.flush()
+            if i % 2:
+                db.add(models.LeadAssignment(
+                    contact_request_id=lead.id, salesman_id=salesman.id, assigned_by_id=admin.id
+                ))
+            for _ in range(i % 3):
+                db.add(models.ContactNote(contact_request_id=lead.id, admin_id=admin.id, note_text="Called"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pages(db, user: models.User) -> list:
+    """Every page of the lead list for `user`, each with the statements it ran"""
+    pages = []
+    cursor = None
+    while True:
+        response = Response()
+        with count_queries() as statements:
+            rows = get_all_contacts(cursor=cursor, limit=PAGE, response=response, db=db, current_user=user)
+        pages.append((rows, statements))
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_lead_list_pages_stay_within_query_budget():
+    admin = create_test_user("admin@example.com", "password123", role="admin")
+    salesman = create_test_user("salesman@example.com", "password123", role="salesman")
+    _seed(admin, salesman)
+
+    db = TestingSessionLocal()
+    try:
+        for user, expected in ((admin, LEADS), (salesman, LEADS // 2)):
+            user = db.get(models.User, user.id)
+            pages = _pages(db, user)
+            for rows, statements in pages:
+                assert len(statements) <= QUERY_BUDGET, statements
+
+            rows = [row for page_rows, _ in pages for row in page_rows]
+            assert len(rows) == expected
+            assert sum(row["notes_count"] for row in rows) == sum(
+                i % 3 for i in range(LEADS) if user.role == "admin" or i % 2
+            )
+            assigned = [row for row in rows if row["assigned_to"]]
+            assert len(assigned) == LEADS // 2
+            assert all(row["assigned_to"]["email"] == "salesman@example.com" for row in assigned)
+    finally:
+        db.close()
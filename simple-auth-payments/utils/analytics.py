@@ -0,0 +1,213 @@
+"""
+Daily revenue and signup rollups behind /admin/analytics.
+
+Write paths mark the day they touched as dirty (mark_day_dirty) in their own
+transaction. refresh_rollups() then recomputes only those days from the
+source tables, so reading a year of buckets never scans users or payments.
+
+Refreshes are serialized: each one first bumps the rollup_refreshes stats
+counter, whose row lock (the write lock on SQLite) holds off any other refresh
+until it commits, so two workers never rewrite the same day side by side.
+
+Users created before users.created_at existed have it NULL. They are left out
+of the signup rollups explicitly (there is no day to put them on) and counted
+separately by undated_users().
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+from sqlalchemy import Date, func, insert, type_coerce
+from sqlalchemy.orm import Session
+import models
+from utils import stats_counters
+
+
+SIGNUPS = "signups"
+REVENUE = "revenue"
+GRANULARITIES = ("day", "week", "month")
+REFRESH_LOCK = "rollup_refreshes"
+
+
+def mark_day_dirty(db: Session, when) -> None:
+    """Queue a day for rollup recomputation (does not commit)"""
+    if when is None:
+        return
+    day = when.date() if isinstance(when, datetime) else when
+    db.execute(insert(models.RollupDirtyDay).values(day=day))
+
+
+def _day_of(column):
+    return type_coerce(func.date(column), Date)
+
+
+def _recompute(db: Session, start: date, end: date, days: Optional[Set[date]] = None) -> None:
+    """Recompute rollups for [start, end], restricted to `days` when given"""
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    stale = db.query(models.DailyRollup).filter(
+        models.DailyRollup.day >= start,
+        models.DailyRollup.day <= end
+    )
+    if days is not None:
+        stale = stale.filter(models.DailyRollup.day.in_(days))
+    stale.delete(synchronize_session=False)
+
+    rows = []
+
+    signup_day = _day_of(models.User.created_at)
+    signups = db.query(signup_day, func.count(models.User.id)).filter(
+        models.User.created_at.isnot(None),
+        models.User.created_at >= range_start,
+        models.User.created_at < range_end
+    ).group_by(signup_day)
+    for day, count in signups:
+        if days is None or day in days:
+            rows.append({"day": day, "metric": SIGNUPS, "count": count, "amount_cents": 0})
+
+    payment_day = _day_of(models.Payment.created_at)
+    currency = func.lower(func.coalesce(models.Payment.currency, "usd"))
+    revenue = db.query(
+        payment_day,
+        models.Payment.bundle_id,
+        currency,
+        func.count(models.Payment.id),
+        func.sum(models.Payment.amount_cents)
+    ).filter(
+        models.Payment.status == "succeeded",
+        models.Payment.created_at >= range_start,
+        models.Payment.created_at < range_end
+    ).group_by(payment_day, models.Payment.bundle_id, currency)
+    for day, bundle_id, currency_code, count, amount in revenue:
+        if days is None or day in days:
+            rows.append({
+                "day": day,
+                "metric": REVENUE,
+                "bundle_id": bundle_id,
+                "currency": currency_code,
+                "count": count,
+                "amount_cents": amount or 0
+            })
+
+    if rows:
+        db.execute(insert(models.DailyRollup), rows)
+
+
+def refresh_rollups(db: Session) -> int:
+    """Recompute rollups for every dirty day; returns the number of days processed (caller commits)"""
+    if db.query(models.RollupDirtyDay.id).first() is None:
+        return 0
+
+    # Wait for any other refresh to commit, then see what it left dirty
+    stats_counters.bump(db, REFRESH_LOCK)
+    dirty = db.query(models.RollupDirtyDay.id, models.RollupDirtyDay.day).all()
+    if not dirty:
+        return 0
+
+    max_id = max(row.id for row in dirty)
+    days = {row.day for row in dirty}
+    _recompute(db, min(days), max(days), days)
+
+    db.query(models.RollupDirtyDay).filter(
+        models.RollupDirtyDay.id <= max_id
+    ).delete(synchronize_session=False)
+    return len(days)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute all rollups from scratch; returns the number of rollup rows (caller commits)"""
+    stats_counters.bump(db, REFRESH_LOCK)
+    bounds = [
+        db.query(func.min(models.User.created_at), func.max(models.User.created_at)).one(),
+        db.query(func.min(models.Payment.created_at), func.max(models.Payment.created_at)).one()
+    ]
+    starts = [low for low, _ in bounds if low is not None]
+    ends = [high for _, high in bounds if high is not None]
+
+    db.query(models.RollupDirtyDay).delete(synchronize_session=False)
+    db.query(models.DailyRollup).delete(synchronize_session=False)
+    if starts:
+        _recompute(db, min(starts).date(), max(ends).date())
+
+    return db.query(models.DailyRollup).count()
+
+
+def undated_users(db: Session) -> int:
+    """Users with no created_at, which the signup rollups cannot place on a day"""
+    return db.query(func.count(models.User.id)).filter(models.User.created_at.is_(None)).scalar()
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _filtered(query, start: Optional[date], end: Optional[date]):
+    if start:
+        query = query.filter(models.DailyRollup.day >= start)
+    if end:
+        query = query.filter(models.DailyRollup.day <= end)
+    return query
+
+
+def revenue_series(
+    db: Session,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bundle_id: Optional[int] = None,
+    currency: Optional[str] = None
+) -> List[Dict]:
+    """Succeeded payments and revenue per bucket"""
+    query = db.query(
+        models.DailyRollup.day,
+        models.DailyRollup.currency,
+        func.sum(models.DailyRollup.count),
+        func.sum(models.DailyRollup.amount_cents)
+    ).filter(models.DailyRollup.metric == REVENUE)
+    query = _filtered(query, start, end)
+    if bundle_id is not None:
+        query = query.filter(models.DailyRollup.bundle_id == bundle_id)
+    if currency:
+        query = query.filter(models.DailyRollup.currency == currency.lower())
+    query = query.group_by(models.DailyRollup.day, models.DailyRollup.currency)
+
+    buckets: Dict[date, Dict] = {}
+    for day, currency_code, count, amount in query:
+        period = bucket_start(day, granularity)
+        bucket = buckets.setdefault(period, {
+            "period": period.isoformat(),
+            "payments": 0,
+            "revenue_cents": 0,
+            "revenue_by_currency": {}
+        })
+        bucket["payments"] += count or 0
+        bucket["revenue_cents"] += amount or 0
+        by_currency = bucket["revenue_by_currency"]
+        by_currency[currency_code] = by_currency.get(currency_code, 0) + (amount or 0)
+
+    return [buckets[period] for period in sorted(buckets)]
+
+
+def signup_series(
+    db: Session,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> List[Dict]:
+    """New users per bucket"""
+    query = db.query(
+        models.DailyRollup.day,
+        models.DailyRollup.count
+    ).filter(models.DailyRollup.metric == SIGNUPS)
+    query = _filtered(query, start, end)
+
+    buckets: Dict[date, Dict] = {}
+    for day, count in query:
+        period = bucket_start(day, granularity)
+        bucket = buckets.setdefault(period, {"period": period.isoformat(), "signups": 0})
+        bucket["signups"] += count or 0
+
+    return [buckets[period] for period in sorted(buckets)]
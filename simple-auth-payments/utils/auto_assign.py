@@ -0,0 +1,194 @@
+"""
+Automatic lead assignment.
+
+Strategies:
+  round_robin       - salesmen take turns, in id order
+  least_loaded      - salesman with the fewest open leads
+  country_affinity  - least loaded salesman who already works leads from the
+                      lead's country, unless that salesman is more than
+                      AFFINITY_MAX_EXTRA_LEADS above the least loaded one;
+                      otherwise least_loaded
+
+Open-lead counts are kept in memory per worker, seeded from one GROUP BY over
+lead_assignments and bumped as this worker assigns. Other workers and manual
+(re)assignments make them drift, so they are re-seeded every RESEED_SECONDS
+and whenever a manual assignment calls invalidate().
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import and_, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from utils import lead_events
+
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+COUNTRY_AFFINITY = "country_affinity"
+STRATEGIES = (ROUND_ROBIN, LEAST_LOADED, COUNTRY_AFFINITY)
+
+CLOSED_STATUSES = ("converted", "not_interested")
+RESEED_SECONDS = 300
+AFFINITY_MAX_EXTRA_LEADS = 10
+BATCH_SIZE = 500
+
+
+class AssignmentEngine:
+    """Per-worker load counters and salesman picking"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads: Dict[int, int] = {}
+        self._country_loads: Dict[str, Dict[int, int]] = {}
+        self._assigned_by_id: Optional[int] = None
+        self._last_round_robin_id = 0
+        self._seeded_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Force a re-seed on next use (after manual assignments)"""
+        with self._lock:
+            self._seeded_at = None
+
+    def _seed(self, db: Session) -> None:
+        # Open leads per active salesman and country; salesmen with no leads come back with a count of 0
+        rows = db.query(
+            models.User.id,
+            models.ContactRequest.country,
+            func.count(models.ContactRequest.id)
+        ).outerjoin(
+            models.LeadAssignment, models.LeadAssignment.salesman_id == models.User.id
+        ).outerjoin(
+            models.ContactRequest, and_(
+                models.ContactRequest.id == models.LeadAssignment.contact_request_id,
+                models.ContactRequest.status.notin_(CLOSED_STATUSES)
+            )
+        ).filter(
+            models.User.role == "salesman",
+            models.User.is_active == True
+        ).group_by(models.User.id, models.ContactRequest.country).all()
+
+        loads: Dict[int, int] = {}
+        country_loads: Dict[str, Dict[int, int]] = {}
+        for salesman_id, country, count in rows:
+            loads[salesman_id] = loads.get(salesman_id, 0) + count
+            if country and count:
+                country_loads.setdefault(country, {})[salesman_id] = count
+
+        # Automatic assignments are recorded as made by the first admin account
+        admin_id = db.query(models.User.id).filter(
+            models.User.role == "admin",
+            models.User.is_active == True
+        ).order_by(models.User.id).limit(1).scalar()
+
+        self._loads = loads
+        self._country_loads = country_loads
+        self._assigned_by_id = admin_id
+        self._seeded_at = time.monotonic()
+
+    def _ensure_seeded(self, db: Session) -> None:
+        if self._seeded_at is None or time.monotonic() - self._seeded_at > RESEED_SECONDS:
+            self._seed(db)
+
+    def _least_loaded(self, candidates) -> int:
+        return min(candidates, key=lambda salesman_id: (self._loads[salesman_id], salesman_id))
+
+    def _pick(self, strategy: str, country: Optional[str]) -> Optional[int]:
+        if not self._loads:
+            return None
+        if strategy == ROUND_ROBIN:
+            ordered = sorted(self._loads)
+            salesman_id = next((s for s in ordered if s > self._last_round_robin_id), ordered[0])
+            self._last_round_robin_id = salesman_id
+        else:
+            salesman_id = self._least_loaded(self._loads)
+            familiar = [s for s in self._country_loads.get(country, {}) if s in self._loads]
+            if strategy == COUNTRY_AFFINITY and familiar:
+                preferred = self._least_loaded(familiar)
+                if self._loads[preferred] - self._loads[salesman_id] <= AFFINITY_MAX_EXTRA_LEADS:
+                    salesman_id = preferred
+
+        self._loads[salesman_id] += 1
+        if country:
+            per_country = self._country_loads.setdefault(country, {})
+            per_country[salesman_id] = per_country.get(salesman_id, 0) + 1
+        return salesman_id
+
+    def pick(self, db: Session, strategy: str, countries: List[Optional[str]]) -> List[Optional[int]]:
+        """A salesman id (or None if there are no salesmen) for each lead country, counting each pick as load"""
+        with self._lock:
+            self._ensure_seeded(db)
+            return [self._pick(strategy, country) for country in countries]
+
+    def assigned_by_id(self, db: Session) -> Optional[int]:
+        with self._lock:
+            self._ensure_seeded(db)
+            return self._assigned_by_id
+
+
+engine = AssignmentEngine()
+
+
+def assign_new_lead(db: Session, lead: models.ContactRequest, strategy: str) -> Optional[int]:
+    """Assign a just-submitted lead; returns the salesman id or None. Commits."""
+    assigned_by_id = engine.assigned_by_id(db)
+    salesman_id = engine.pick(db, strategy, [lead.country])[0]
+    if salesman_id is None or assigned_by_id is None:
+        return None
+
+    db.add(models.LeadAssignment(
+        contact_request_id=lead.id,
+        salesman_id=salesman_id,
+        assigned_by_id=assigned_by_id
+    ))
+    lead_events.record(db, lead_events.ASSIGNED, lead.id, salesman_id, by="auto")
+    db.commit()
+    return salesman_id
+
+
+def distribute_unassigned(db: Session, strategy: str, assigned_by_id: int, batch_size: int = BATCH_SIZE) -> Dict[int, int]:
+    """
+    Assign every open, unassigned lead (oldest first), inserting one batch of
+    assignments per transaction. Returns {salesman_id: leads assigned}.
+    """
+    assigned: Dict[int, int] = {}
+    last_id = 0
+    while True:
+        leads = db.query(models.ContactRequest.id, models.ContactRequest.country).outerjoin(
+            models.LeadAssignment, models.LeadAssignment.contact_request_id == models.ContactRequest.id
+        ).filter(
+            models.LeadAssignment.id.is_(None),
+            models.ContactRequest.status.notin_(CLOSED_STATUSES),
+            models.ContactRequest.id > last_id
+        ).order_by(models.ContactRequest.id).limit(batch_size).all()
+        if not leads:
+            return assigned
+
+        salesmen = engine.pick(db, strategy, [lead.country for lead in leads])
+        if salesmen[0] is None:
+            return assigned
+
+        try:
+            db.execute(insert(models.LeadAssignment), [
+                {
+                    "contact_request_id": lead.id,
+                    "salesman_id": salesman_id,
+                    "assigned_by_id": assigned_by_id
+                }
+                for lead, salesman_id in zip(leads, salesmen)
+            ])
+            lead_events.record_many(db, lead_events.ASSIGNED, [
+                (lead.id, salesman_id, {"by": "auto"})
+                for lead, salesman_id in zip(leads, salesmen)
+            ])
+            db.commit()
+        except IntegrityError:
+            # A lead in this batch was assigned concurrently; re-seed and redo the batch
+            db.rollback()
+            engine.invalidate()
+            continue
+
+        for salesman_id in salesmen:
+            assigned[salesman_id] = assigned.get(salesman_id, 0) + 1
+        last_id = leads[-1].id
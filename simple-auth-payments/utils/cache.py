@@ -0,0 +1,53 @@
+"""
+Small in-process TTL cache.
+
+Each gunicorn worker keeps its own copy, so only use this for data where a
+few seconds of staleness is acceptable.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe dict whose entries expire after ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, ttl_seconds: Optional[float] = None) -> Tuple[bool, Any]:
+        """Return (hit, value); ttl_seconds overrides the default TTL for this lookup"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > ttl:
+                del self._entries[key]
+                return False, None
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # Drop the oldest entry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic(), value)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl_seconds: Optional[float] = None) -> Tuple[Any, bool]:
+        """Return (value, was_cached), computing and storing the value on a miss"""
+        hit, value = self.get(key, ttl_seconds)
+        if hit:
+            return value, True
+        value = compute()
+        self.set(key, value)
+        return value, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
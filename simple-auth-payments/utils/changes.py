@@ -0,0 +1,59 @@
+"""
+Cursor and tombstone helpers for the /admin/changes delta-sync endpoint.
+
+A cursor is an opaque, URL-safe token wrapping the server time of the poll
+that produced it. Each poll returns rows whose updated_at is newer than the
+cursor (minus a small overlap, so rows committed slightly late are not
+missed). Clients upsert rows by id, so the overlap's duplicates are harmless.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+import models
+
+
+# Re-send rows updated this long before the cursor to cover in-flight transactions
+CURSOR_OVERLAP = timedelta(seconds=2)
+
+# Tombstones older than this are pruned; older cursors must do a full reload
+TOMBSTONE_RETENTION = timedelta(days=7)
+
+
+def encode_cursor(moment: datetime) -> str:
+    payload = json.dumps({"t": moment.isoformat()}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """Decode a cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def record_deletion(db: Session, feed: str, record_id: int, owner_id: Optional[int] = None) -> None:
+    """
+    Write a tombstone in the caller's transaction and prune expired ones (does not commit).
+    For lead_assignments, owner_id is the salesman the lead was taken from.
+    """
+    record_deletions(db, feed, [(record_id, owner_id)])
+
+
+def record_deletions(db: Session, feed: str, records: Iterable[tuple]) -> None:
+    """Bulk form of record_deletion(); `records` holds (record_id, owner_id) tuples"""
+    records = list(records)
+    if not records:
+        return
+    now = datetime.utcnow()
+    db.add_all([
+        models.DeletedRecord(feed=feed, record_id=record_id, owner_id=owner_id, deleted_at=now)
+        for record_id, owner_id in records
+    ])
+    db.query(models.DeletedRecord).filter(
+        models.DeletedRecord.deleted_at < now - TOMBSTONE_RETENTION
+    ).delete(synchronize_session=False)
@@ -0,0 +1,110 @@
+"""
+Conditional GET (ETag / If-None-Match) for list endpoints.
+
+The ETag is derived from cheap per-table version stamps (row count plus
+max(updated_at) or max(id)) and the request's query parameters, all read in
+one query. When it matches If-None-Match the endpoint returns 304 before
+running its main query or serializing anything.
+"""
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+
+class ConditionalGetStats:
+    """Per-endpoint request / 304 counters (per worker process)"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, not_modified: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {"requests": 0, "not_modified": 0})
+            counts["requests"] += 1
+            if not_modified:
+                counts["not_modified"] += 1
+
+    def report(self) -> Dict:
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counts.items()}
+        for counts in endpoints.values():
+            counts["hit_rate"] = round(counts["not_modified"] / counts["requests"], 4) if counts["requests"] else 0.0
+        requests = sum(c["requests"] for c in endpoints.values())
+        not_modified = sum(c["not_modified"] for c in endpoints.values())
+        return {
+            "requests": requests,
+            "not_modified": not_modified,
+            "hit_rate": round(not_modified / requests, 4) if requests else 0.0,
+            "endpoints": endpoints
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+stats = ConditionalGetStats()
+
+
+def _version_columns(model):
+    """Scalar subqueries that change whenever rows of `model` are added, removed or updated"""
+    stamp = model.updated_at if hasattr(model, "updated_at") else model.id
+    return [
+        select(func.count(model.id)).scalar_subquery(),
+        select(func.max(stamp)).scalar_subquery()
+    ]
+
+
+def compute_etag(db: Session, tracked_models: Iterable, *params) -> str:
+    """Weak ETag from the tracked tables' version stamps and the given parameters"""
+    columns = []
+    for model in tracked_models:
+        columns.extend(_version_columns(model))
+    versions = db.execute(select(*columns)).one()
+
+    digest = hashlib.sha1(repr((tuple(versions), params)).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    if "*" in candidates:
+        return True
+    # Weak comparison: ignore W/ prefixes
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates)
+
+
+def check(
+    request: Optional[Request],
+    response: Optional[Response],
+    db: Session,
+    endpoint: str,
+    tracked_models: Iterable,
+    *params
+) -> Optional[Response]:
+    """
+    Return a 304 response if the client's cached copy is current, otherwise
+    set the ETag header on `response` and return None.
+    Skipped (returns None) when called outside a request, e.g. from /admin/bootstrap.
+    """
+    if request is None or response is None:
+        return None
+
+    etag = compute_etag(db, tracked_models, *params)
+    not_modified = _matches(request, etag)
+    stats.record(endpoint, not_modified)
+
+    if not_modified:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return None
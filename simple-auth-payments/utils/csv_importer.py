@@ -1,9 +1,20 @@
 """CSV lead import utility"""
+import codecs
 import csv
 import io
-from typing import Dict, List
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from types import SimpleNamespace
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+from sqlalchemy import bindparam, insert, update
 from sqlalchemy.orm import Session
 import models
+from utils import lead_funnel, lead_keys
+
+
+# Bytes read per step when checking an upload's encoding
+DECODE_BLOCK_SIZE = 1024 * 1024
 
 
 class CSVImporter:
@@ -12,14 +23,26 @@ class CSVImporter:
     REQUIRED_COLUMNS = ['first_name', 'last_name', 'email', 'phone', 'country_code']
     OPTIONAL_COLUMNS = ['country', 'business_name', 'num_locations', 'referral_source', 'status']
     
+    # Columns written for a new lead, and the ones "overwrite" replaces on an existing lead
+    LEAD_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'country_code', 'country', 'business_name',
+                   'num_locations', 'referral_source', 'status', 'marketing_consent', 'language_preference']
+    OVERWRITE_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'country_code', 'country',
+                        'business_name', 'num_locations', 'referral_source', 'status']
+    
+    # Leads per executemany / savepoint / commit in import_leads
+    CHUNK_SIZE = 5000
+    
+    # Upload cap; rows are decoded and parsed as they are read, so memory stays flat
+    MAX_FILE_SIZE = 200 * 1024 * 1024
+    
     def __init__(self, db: Session):
         self.db = db
     
-    def validate_csv_format(self, file_content: str) -> Dict:
-        """Validate CSV format and columns"""
+    def validate_csv_format(self, source) -> Dict:
+        """Validate CSV format and columns (source: CSV text or a binary upload)"""
         try:
-            reader = csv.DictReader(io.StringIO(file_content))
-            headers = reader.fieldnames
+            with self._open(source) as text:
+                headers = csv.DictReader(text).fieldnames
             
             if not headers:
                 return {"valid": False, "error": "No headers found"}
@@ -32,153 +55,330 @@ class CSVImporter:
                 }
             
             return {"valid": True, "headers": headers}
+        except UnicodeDecodeError:
+            raise  # callers report encoding errors themselves
         except Exception as e:
             return {"valid": False, "error": str(e)}
     
-    def parse_csv(self, file_content: str) -> List[Dict]:
-        """Parse CSV and return list of lead dicts"""
-        reader = csv.DictReader(io.StringIO(file_content))
-        leads = []
-        errors = []
-        
-        for row_num, row in enumerate(reader, start=2):
-            # Validate required fields
-            missing = [col for col in self.REQUIRED_COLUMNS if not row.get(col, '').strip()]
-            if missing:
-                errors.append({
-                    "row": row_num,
-                    "error": f"Missing required fields: {', '.join(missing)}"
-                })
-                continue
+    def iter_leads(self, source, errors: List[Dict]) -> Iterator[Dict]:
+        """
+        Yield lead dicts one CSV row at a time; rows with missing required
+        fields are appended to `errors` instead. Decoding happens as rows are
+        read, so a bad byte raises UnicodeDecodeError mid-iteration.
+        """
+        with self._open(source) as text:
+            reader = csv.DictReader(text)
             
-            # Build lead dict
-            lead = {
-                "first_name": row['first_name'].strip(),
-                "last_name": row['last_name'].strip(),
-                "email": row['email'].strip().lower(),
-                "phone": row['phone'].strip(),
-                "country_code": row['country_code'].strip(),
-                "country": row.get('country', 'Unknown').strip(),
-                "business_name": row.get('business_name', '').strip(),
-                "num_locations": row.get('num_locations', '1').strip(),
-                "referral_source": row.get('referral_source', 'CSV Import').strip(),
-                "status": row.get('status', 'new').strip(),
-                "marketing_consent": False,
-                "language_preference": "en",
-                "row_number": row_num
-            }
-            
-            leads.append(lead)
-        
-        return {"leads": leads, "errors": errors}
+            for row_num, row in enumerate(reader, start=2):
+                # Validate required fields
+                missing = [col for col in self.REQUIRED_COLUMNS if not (row.get(col) or '').strip()]
+                if missing:
+                    errors.append({
+                        "row": row_num,
+                        "error": f"Missing required fields: {', '.join(missing)}"
+                    })
+                    continue
+                
+                # Build lead dict
+                yield {
+                    "first_name": row['first_name'].strip(),
+                    "last_name": row['last_name'].strip(),
+                    "email": row['email'].strip().lower(),
+                    "phone": row['phone'].strip(),
+                    "country_code": row['country_code'].strip(),
+                    "country": (row.get('country') or 'Unknown').strip(),
+                    "business_name": (row.get('business_name') or '').strip(),
+                    "num_locations": (row.get('num_locations') or '1').strip(),
+                    "referral_source": (row.get('referral_source') or 'CSV Import').strip(),
+                    "status": (row.get('status') or 'new').strip(),
+                    "marketing_consent": False,
+                    "language_preference": "en",
+                    "row_number": row_num
+                }
+    
+    @staticmethod
+    def check_encoding(source: BinaryIO) -> None:
+        """Decode a binary upload end to end in blocks; raises UnicodeDecodeError on bad input"""
+        source.seek(0)
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        for block in iter(lambda: source.read(DECODE_BLOCK_SIZE), b""):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+        source.seek(0)
+    
+    @staticmethod
+    @contextmanager
+    def _open(source) -> Iterator[TextIO]:
+        """
+        Text stream over CSV text or a binary file (e.g. UploadFile.file).
+        Binary input is rewound and decoded incrementally as UTF-8 (a BOM is
+        dropped) and is left open afterwards.
+        """
+        if isinstance(source, str):
+            yield io.StringIO(source)
+            return
+        source.seek(0)
+        text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        try:
+            yield text
+        finally:
+            text.detach()
     
-    def detect_duplicates(self, leads: List[Dict]) -> Dict:
-        """Detect duplicate leads by email or phone"""
+    def normalize_keys(self, leads: List[Dict]) -> List[tuple]:
+        """(email_norm, phone_norm) per lead; rows from an import session carry them already"""
+        return [
+            (lead['email_norm'], lead['phone_norm']) if 'email_norm' in lead else (
+                lead_keys.normalize_email(lead['email']),
+                lead_keys.normalize_phone(lead['phone'], lead['country_code'])
+            )
+            for lead in leads
+        ]
+    
+    def match_existing(self, keys: List[tuple]) -> List:
+        """
+        Oldest existing lead sharing each row's normalized email or phone, as in
+        lead_keys.find_existing: (id, status, *funnel segment) per row, or None.
+        """
+        return [match for match, _ in self._lookup(keys)]
+    
+    def match_and_report(self, leads: List[Dict], keys: List[tuple]) -> tuple:
+        """
+        match_existing for `leads` plus their duplicate report, from the same
+        lookups: (matches, duplicates). Each duplicate names the CSV row, the key
+        it matched on ("email" / "phone") and the existing lead it matched.
+        """
+        matches = []
         duplicates = []
+        name_fields = (models.ContactRequest.first_name, models.ContactRequest.last_name)
+        for lead, (found, match_type) in zip(leads, self._lookup(keys, *name_fields)):
+            if found is None:
+                matches.append(None)
+                continue
+            *match, first_name, last_name = found
+            matches.append(tuple(match))
+            if match_type == "email":
+                key = {"email": lead['email']}
+            else:
+                key = {"phone": f"{lead['country_code']} {lead['phone']}"}
+            duplicates.append({
+                "row": lead['row_number'],
+                **key,
+                "match_type": match_type,
+                "existing_id": match[0],
+                "existing_name": f"{first_name} {last_name}",
+                "new_name": f"{lead['first_name']} {lead['last_name']}"
+            })
+        return matches, duplicates
+    
+    def _lookup(self, keys: List[tuple], *extra_fields) -> List[tuple]:
+        """((id, status, *funnel segment, *extra_fields), "email" | "phone") per row, or (None, None)"""
+        # Everything the funnel needs about the existing lead
+        fields = [models.ContactRequest.status] + [
+            getattr(models.ContactRequest, dimension) for dimension in lead_funnel.DIMENSIONS
+        ] + list(extra_fields)
+        by_email = lead_keys.find_existing_many(
+            self.db, models.ContactRequest.email_norm, [email for email, _ in keys], *fields
+        )
+        by_phone = lead_keys.find_existing_many(
+            self.db, models.ContactRequest.phone_norm, [phone for _, phone in keys], *fields
+        )
+        matches = []
+        for email_norm, phone_norm in keys:
+            email_match = by_email.get(email_norm)
+            phone_match = by_phone.get(phone_norm)
+            if email_match and (not phone_match or email_match[0] <= phone_match[0]):
+                matches.append((email_match, "email"))
+            elif phone_match:
+                matches.append((phone_match, "phone"))
+            else:
+                matches.append((None, None))
+        return matches
+    
+    def _resolve(self, leads: List[Dict], duplicate_action: str, written: Set[str]) -> Dict:
+        """
+        Decide every row's fate before writing anything: a new lead, an update of
+        an existing lead (overwrite), or a skip. Rows repeating an earlier row of
+        the same batch are skipped, or folded into that row's insert (overwrite).
+        `written` holds the keys of earlier batches of this import; this batch's are added.
+        Returns {"entries": [...], "skipped": [row numbers]}; each entry writes one
+        lead and lists the CSV rows it stands for.
+        """
+        now = datetime.utcnow()
+        keys = self.normalize_keys(leads)
+        if duplicate_action == "import_all":
+            matched = [None] * len(leads)
+        elif all('existing' in lead for lead in leads):
+            # Matched when the import session was validated; rows repeating a
+            # lead that an earlier batch of this import wrote are looked up again
+            matched = [tuple(lead['existing']) if lead['existing'] else None for lead in leads]
+            again = [i for i, (email_norm, phone_norm) in enumerate(keys) if {email_norm, phone_norm} & written]
+            for i, match in zip(again, self.match_existing([keys[i] for i in again])):
+                matched[i] = match
+        else:
+            matched = self.match_existing(keys)
         
-        for lead in leads:
-            # Check by email
-            existing = self.db.query(models.ContactRequest).filter(
-                models.ContactRequest.email == lead['email']
-            ).first()
+        entries = []
+        skipped = []
+        updates: Dict[int, Dict] = {}
+        pending: Dict[str, Dict] = {}  # normalized key -> insert entry from an earlier row
+        
+        for lead, (email_norm, phone_norm), existing in zip(leads, keys, matched):
+            values = {field: lead[field] for field in self.LEAD_FIELDS}
+            values.update(email_norm=email_norm, phone_norm=phone_norm, updated_at=now)
             
-            if existing:
-                duplicates.append({
-                    "row": lead['row_number'],
-                    "email": lead['email'],
-                    "match_type": "email",
-                    "existing_id": existing.id,
-                    "existing_name": f"{existing.first_name} {existing.last_name}",
-                    "new_name": f"{lead['first_name']} {lead['last_name']}"
-                })
+            earlier = pending.get(email_norm) or pending.get(phone_norm)
+            
+            if duplicate_action == "skip" and (existing or earlier):
+                skipped.append(lead['row_number'])
                 continue
             
-            # Check by phone + country_code
-            existing = self.db.query(models.ContactRequest).filter(
-                models.ContactRequest.phone == lead['phone'],
-                models.ContactRequest.country_code == lead['country_code']
-            ).first()
+            if duplicate_action == "overwrite" and existing:
+                existing_id, old_status, *segment = existing
+                entry = updates.get(existing_id)
+                if entry is None:
+                    entry = updates[existing_id] = {
+                        "kind": "update", "rows": [], "old_status": old_status, "segment": segment
+                    }
+                    entries.append(entry)
+                entry["rows"].append(lead['row_number'])
+                entry["values"] = {
+                    "id": existing_id,
+                    **{field: values[field] for field in self.OVERWRITE_FIELDS},
+                    "email_norm": email_norm,
+                    "phone_norm": phone_norm,
+                    "updated_at": now
+                }
+                continue
             
-            if existing:
-                duplicates.append({
-                    "row": lead['row_number'],
-                    "phone": f"{lead['country_code']} {lead['phone']}",
-                    "match_type": "phone",
-                    "existing_id": existing.id,
-                    "existing_name": f"{existing.first_name} {existing.last_name}",
-                    "new_name": f"{lead['first_name']} {lead['last_name']}"
-                })
+            if duplicate_action == "overwrite" and earlier:
+                earlier["rows"].append(lead['row_number'])
+                earlier["values"].update({field: values[field] for field in self.OVERWRITE_FIELDS})
+                earlier["values"].update(email_norm=email_norm, phone_norm=phone_norm)
+                entry = earlier
+            else:
+                entry = {"kind": "insert", "rows": [lead['row_number']], "values": {**values, "created_at": now}}
+                entries.append(entry)
+            for key in (email_norm, phone_norm):
+                if key:
+                    pending.setdefault(key, entry)
         
-        return {
-            "count": len(duplicates),
-            "duplicates": duplicates
-        }
+        written.update(key for pair in keys for key in pair if key)
+        return {"entries": entries, "skipped": skipped}
+    
+    def _write(self, entries: List[Dict]) -> None:
+        """Insert / update a batch of entries with one executemany each (does not commit)"""
+        inserts = [entry["values"] for entry in entries if entry["kind"] == "insert"]
+        updates = [entry for entry in entries if entry["kind"] == "update"]
+        
+        table = models.ContactRequest.__table__
+        if inserts:
+            self.db.execute(insert(table), inserts)
+            lead_funnel.record_leads_created(self.db, inserts)
+        if updates:
+            # SET covers the columns in the row dicts
+            self.db.execute(
+                update(table).where(table.c.id == bindparam("lead_id")),
+                [
+                    {column: value for column, value in entry["values"].items() if column != "id"}
+                    | {"lead_id": entry["values"]["id"]}
+                    for entry in updates
+                ]
+            )
+            by_status: Dict[str, List] = {}
+            for entry in updates:
+                if entry["values"]["status"] == (entry["old_status"] or "new"):
+                    continue
+                # Dimensions that overwrite leaves alone keep the existing lead's value
+                lead = SimpleNamespace(**{**dict(zip(lead_funnel.DIMENSIONS, entry["segment"])), **entry["values"]})
+                by_status.setdefault(lead.status, []).append((lead, entry["old_status"]))
+            for new_status, changed in by_status.items():
+                lead_funnel.record_status_changes(self.db, changed, new_status)
     
-    def import_leads(self, leads: List[Dict], duplicate_action: str = "skip") -> Dict:
-        """Import leads with duplicate handling"""
+    def import_leads(
+        self,
+        leads: Iterable[Dict],
+        duplicate_action: str = "skip",
+        chunk_size: int = None,
+        resume_after: int = 0,
+        on_chunk: Optional[Callable[[int, Dict], bool]] = None
+    ) -> Dict:
+        """
+        Import leads with duplicate handling.
+        
+        `leads` may be a list or a row stream such as iter_leads() or
+        import_sessions.iter_rows(); it is read chunk_size rows at a time. Each
+        chunk's duplicates are resolved with one lookup, then its leads are
+        written with executemany inserts / updates in a savepoint and committed
+        on success. Rows repeating a lead from an earlier chunk find it in the
+        database like any existing lead. If a chunk fails it is rolled back and
+        retried one lead at a time, so only the offending rows are reported as
+        failed.
+        
+        The first `resume_after` rows were imported by an earlier run: they are
+        read for their duplicate keys but not written. `on_chunk(rows_done, chunk)`
+        runs inside each chunk's transaction, just before its commit (so a
+        checkpoint written there commits or rolls back with the chunk), with the
+        chunk's "imported" / "skipped" counts and "failed_rows"; returning False
+        stops the import once that chunk is committed.
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        rows = iter(leads)
+        written: Set[str] = set()
+        total = 0
         imported = []
         skipped = []
         failed = []
         
-        for lead in leads:
+        done = 0
+        while done < resume_after:
+            batch = list(islice(rows, min(chunk_size, resume_after - done)))
+            if not batch:
+                break
+            written.update(key for pair in self.normalize_keys(batch) for key in pair if key)
+            done += len(batch)
+        
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            total += len(batch)
+            plan = self._resolve(batch, duplicate_action, written)
+            chunk = plan["entries"]
+            chunk_imported = []
+            chunk_failed = []
             try:
-                # Check for duplicate
-                existing = self.db.query(models.ContactRequest).filter(
-                    (models.ContactRequest.email == lead['email']) |
-                    ((models.ContactRequest.phone == lead['phone']) &
-                     (models.ContactRequest.country_code == lead['country_code']))
-                ).first()
-                
-                if existing:
-                    if duplicate_action == "skip":
-                        skipped.append(lead['row_number'])
+                with self.db.begin_nested():
+                    self._write(chunk)
+            except Exception:
+                for entry in chunk:
+                    try:
+                        with self.db.begin_nested():
+                            self._write([entry])
+                    except Exception as e:
+                        chunk_failed.extend({"row": row, "error": str(e)} for row in entry["rows"])
                         continue
-                    elif duplicate_action == "overwrite":
-                        # Update existing
-                        existing.first_name = lead['first_name']
-                        existing.last_name = lead['last_name']
-                        existing.email = lead['email']
-                        existing.phone = lead['phone']
-                        existing.country_code = lead['country_code']
-                        existing.country = lead['country']
-                        existing.business_name = lead['business_name']
-                        existing.num_locations = lead['num_locations']
-                        existing.referral_source = lead['referral_source']
-                        existing.status = lead['status']
-                        self.db.commit()
-                        imported.append(lead['row_number'])
-                        continue
-                    # else: import_all - create new even if duplicate
-                
-                # Create new contact
-                contact = models.ContactRequest(
-                    first_name=lead['first_name'],
-                    last_name=lead['last_name'],
-                    email=lead['email'],
-                    phone=lead['phone'],
-                    country_code=lead['country_code'],
-                    country=lead['country'],
-                    business_name=lead['business_name'],
-                    num_locations=lead['num_locations'],
-                    referral_source=lead['referral_source'],
-                    status=lead['status'],
-                    marketing_consent=lead['marketing_consent'],
-                    language_preference=lead['language_preference']
-                )
-                
-                self.db.add(contact)
-                self.db.commit()
-                imported.append(lead['row_number'])
-                
-            except Exception as e:
-                self.db.rollback()
-                failed.append({
-                    "row": lead['row_number'],
-                    "error": str(e)
+                    chunk_imported.extend(entry["rows"])
+            else:
+                chunk_imported.extend(row for entry in chunk for row in entry["rows"])
+            
+            keep_going = True
+            if on_chunk:
+                keep_going = on_chunk(resume_after + total, {
+                    "imported": len(chunk_imported),
+                    "skipped": len(plan["skipped"]),
+                    "failed_rows": chunk_failed
                 })
+            self.db.commit()
+            imported.extend(chunk_imported)
+            skipped.extend(plan["skipped"])
+            failed.extend(chunk_failed)
+            if keep_going is False:
+                break
         
+        imported.sort()
+        failed.sort(key=lambda failure: failure["row"])
         return {
-            "total_processed": len(leads),
+            "total_processed": total,
             "imported": len(imported),
             "skipped": len(skipped),
             "failed": len(failed),
@@ -0,0 +1,225 @@
+"""
+Background export jobs.
+
+An export job runs the same streaming export as the download endpoints, but
+writes it to a file under settings.EXPORT_DIR from a background task and
+records progress on its ExportJob row. The finished file is then served with
+FileResponse, which supports HTTP Range requests, so interrupted downloads
+can resume. Files are deleted once the job expires: a cleanup thread sweeps
+expired jobs every CLEANUP_INTERVAL, and a download of an expired job deletes
+its file on the spot.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from config import settings
+from utils import exports
+import models
+
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+EXPIRED = "expired"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Minimum seconds between progress writes
+PROGRESS_INTERVAL = 1.0
+
+# Active jobs without a progress write for this long are treated as dead
+STALE_AFTER = timedelta(minutes=10)
+
+# Seconds between sweeps of the cleanup thread
+CLEANUP_INTERVAL = 300
+
+
+def export_dir() -> str:
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    return settings.EXPORT_DIR
+
+
+def job_path(job_id: int, format: str, compression: Optional[str]) -> str:
+    return os.path.join(export_dir(), f"export_{job_id}_{exports.export_filename('data', format, compression)}")
+
+
+def active_job_count(db: Session, user_id: int) -> int:
+    return db.query(func.count(models.ExportJob.id)).filter(
+        models.ExportJob.user_id == user_id,
+        models.ExportJob.status.in_(ACTIVE_STATUSES)
+    ).scalar()
+
+
+def job_to_dict(job: models.ExportJob) -> Dict:
+    percent = None
+    if job.status == COMPLETED:
+        percent = 100.0
+    elif job.rows_total:
+        percent = round(min(job.rows_written or 0, job.rows_total) * 100.0 / job.rows_total, 1)
+    elif job.rows_total == 0 and job.status == RUNNING:
+        percent = 0.0
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "format": job.format,
+        "compression": job.compression,
+        "status": job.status,
+        "filename": job.filename,
+        "rows_total": job.rows_total,
+        "rows_written": job.rows_written or 0,
+        "bytes_written": job.bytes_written or 0,
+        "percent": percent,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "expires_at": job.expires_at.isoformat() if job.expires_at else None,
+        "download_url": f"/exports/{job.id}/download" if job.status == COMPLETED else None
+    }
+
+
+def _update(engine: Engine, job_id: int, **values) -> None:
+    with Session(bind=engine) as session:
+        session.query(models.ExportJob).filter(models.ExportJob.id == job_id).update(
+            dict(values, updated_at=datetime.utcnow()), synchronize_session=False
+        )
+        session.commit()
+
+
+def run_job(
+    engine: Engine,
+    job_id: int,
+    statement,
+    header: Optional[Iterable[str]] = None,
+    format_row: Optional[Callable[[Sequence], Iterable]] = None
+) -> None:
+    """Write the export for `job_id` to disk, recording progress (runs as a background task)"""
+    with Session(bind=engine) as session:
+        job = session.get(models.ExportJob, job_id)
+        if job is None or job.status != QUEUED:
+            return
+        format, compression = job.format, job.compression
+        total = session.execute(
+            select(func.count()).select_from(statement.order_by(None).subquery())
+        ).scalar()
+
+    final_path = job_path(job_id, format, compression)
+    partial_path = final_path + ".part"
+    _update(engine, job_id, status=RUNNING, started_at=datetime.utcnow(), rows_total=total, rows_written=0)
+
+    progress = {"rows": 0, "bytes": 0, "reported_at": time.monotonic()}
+
+    def on_batch(count: int) -> None:
+        progress["rows"] += count
+        now = time.monotonic()
+        if now - progress["reported_at"] >= PROGRESS_INTERVAL:
+            progress["reported_at"] = now
+            _update(engine, job_id, rows_written=progress["rows"], bytes_written=progress["bytes"])
+
+    try:
+        chunks = exports.export_chunks(
+            engine, statement, format, compression,
+            header=header, format_row=format_row, on_batch=on_batch
+        )
+        with open(partial_path, "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+                progress["bytes"] += len(chunk)
+        os.replace(partial_path, final_path)
+    except Exception as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        _update(engine, job_id, status=FAILED, error=str(e)[:1000], finished_at=datetime.utcnow())
+        return
+
+    finished = datetime.utcnow()
+    _update(
+        engine, job_id,
+        status=COMPLETED,
+        file_path=final_path,
+        rows_written=progress["rows"],
+        bytes_written=progress["bytes"],
+        finished_at=finished,
+        expires_at=finished + timedelta(hours=settings.EXPORT_TTL_HOURS)
+    )
+
+
+def delete_job_file(job: models.ExportJob) -> None:
+    if job.file_path:
+        try:
+            os.remove(job.file_path)
+        except FileNotFoundError:
+            # Already removed (e.g. by another worker's sweep)
+            pass
+
+
+def _expire(job: models.ExportJob) -> None:
+    delete_job_file(job)
+    job.status = EXPIRED
+    job.file_path = None
+
+
+def expire_if_due(job: models.ExportJob) -> bool:
+    """Expire one completed job whose TTL has passed; returns True if it was expired (caller commits)"""
+    if job.status != COMPLETED or job.expires_at is None or job.expires_at > datetime.utcnow():
+        return False
+    _expire(job)
+    return True
+
+
+def cleanup_expired(db: Session) -> int:
+    """Delete files of expired jobs and mark them expired; returns the number of jobs expired (caller commits)"""
+    expired = db.query(models.ExportJob).filter(
+        models.ExportJob.status == COMPLETED,
+        models.ExportJob.expires_at <= datetime.utcnow()
+    ).all()
+    for job in expired:
+        _expire(job)
+    return len(expired)
+
+
+def fail_interrupted(db: Session) -> int:
+    """
+    Mark active jobs that stopped reporting progress (e.g. their worker was
+    restarted) as failed, so they no longer count against the per-user cap.
+    Returns the number of jobs failed (caller commits).
+    """
+    interrupted = db.query(models.ExportJob).filter(
+        models.ExportJob.status.in_(ACTIVE_STATUSES),
+        models.ExportJob.updated_at < datetime.utcnow() - STALE_AFTER
+    ).all()
+    for job in interrupted:
+        partial_path = job_path(job.id, job.format, job.compression) + ".part"
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = FAILED
+        job.error = "Export was interrupted"
+        job.finished_at = datetime.utcnow()
+    return len(interrupted)
+
+
+def _cleanup_loop(engine: Engine, interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        try:
+            with Session(bind=engine) as session:
+                if cleanup_expired(session) + fail_interrupted(session):
+                    session.commit()
+        except Exception:
+            # Keep sweeping; the next pass retries whatever failed
+            continue
+
+
+def start_cleanup_thread(engine: Engine, interval: float = CLEANUP_INTERVAL) -> threading.Event:
+    """Expire old export files and fail dead jobs every `interval` seconds; set the returned event to stop"""
+    stop = threading.Event()
+    threading.Thread(
+        target=_cleanup_loop, args=(engine, interval, stop), name="export-cleanup", daemon=True
+    ).start()
+    return stop
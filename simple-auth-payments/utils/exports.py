@@ -0,0 +1,169 @@
+"""
+Streaming CSV / NDJSON exports, optionally gzip-compressed.
+
+Rows are read with yield_per from a column-only SELECT, in a session owned by
+the generator (the request's session is closed once the endpoint returns).
+Each batch is encoded (and compressed) and handed to the client as soon as it
+is ready, so memory stays flat no matter how many rows are exported.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+BATCH_SIZE = 1000
+
+FORMATS = ("csv", "ndjson")
+COMPRESSIONS = ("gzip",)
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+GZIP_LEVEL = 6
+
+
+def format_datetime(value: Optional[datetime]) -> str:
+    """Readable timestamp (YYYY-MM-DD HH:MM:SS), empty if missing"""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ""
+
+
+def iter_batches(
+    engine: Engine,
+    statement,
+    batch_size: int = BATCH_SIZE,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Iterator[Sequence]:
+    """Yield lists of result rows, batch_size at a time, from a private session"""
+    with Session(bind=engine) as session:
+        result = session.execute(statement.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield batch
+            if on_batch:
+                on_batch(len(batch))
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    return data
+
+
+def csv_stream(
+    engine: Engine,
+    statement,
+    header: Iterable[str],
+    format_row: Callable[[Sequence], Iterable],
+    batch_size: int = BATCH_SIZE,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Iterator[bytes]:
+    """CSV bytes for `statement`, one chunk per batch, starting with a UTF-8 BOM and the header"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # UTF-8 BOM so Excel recognizes the encoding (keeps Arabic text intact)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    yield _drain(buffer)
+
+    for batch in iter_batches(engine, statement, batch_size, on_batch):
+        writer.writerows(format_row(row) for row in batch)
+        yield _drain(buffer)
+
+
+def row_to_record(row) -> Dict:
+    """JSON-ready dict of a result row (dates as ISO 8601)"""
+    record = dict(row._mapping)
+    for key, value in record.items():
+        if isinstance(value, (datetime, date)):
+            record[key] = value.isoformat()
+    return record
+
+
+def ndjson_stream(
+    engine: Engine,
+    statement,
+    format_record: Callable[[Sequence], Dict] = row_to_record,
+    batch_size: int = BATCH_SIZE,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Iterator[bytes]:
+    """One JSON object per line for `statement`, one chunk per batch"""
+    for batch in iter_batches(engine, statement, batch_size, on_batch):
+        lines = [json.dumps(format_record(row), ensure_ascii=False, default=str) for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def validate_options(format: str, compression: Optional[str]) -> None:
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(FORMATS)}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid compression. Must be one of: {', '.join(COMPRESSIONS)}")
+
+
+def export_chunks(
+    engine: Engine,
+    statement,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    header: Optional[Iterable[str]] = None,
+    format_row: Optional[Callable[[Sequence], Iterable]] = None,
+    format_record: Callable[[Sequence], Dict] = row_to_record,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Iterator[bytes]:
+    """Encoded (and optionally compressed) export bytes, one chunk per batch"""
+    if format == "ndjson":
+        chunks = ndjson_stream(engine, statement, format_record, on_batch=on_batch)
+    else:
+        chunks = csv_stream(engine, statement, header, format_row or list, on_batch=on_batch)
+    if compression == "gzip":
+        chunks = gzip_stream(chunks)
+    return chunks
+
+
+def export_filename(filename_base: str, format: str, compression: Optional[str]) -> str:
+    return f"{filename_base}.{format}" + (".gz" if compression == "gzip" else "")
+
+
+def media_type(format: str, compression: Optional[str]) -> str:
+    return "application/gzip" if compression == "gzip" else MEDIA_TYPES[format]
+
+
+def export_response(
+    engine: Engine,
+    statement,
+    filename_base: str,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    header: Optional[Iterable[str]] = None,
+    format_row: Optional[Callable[[Sequence], Iterable]] = None,
+    format_record: Callable[[Sequence], Dict] = row_to_record
+) -> StreamingResponse:
+    """StreamingResponse for an export in the requested format (call validate_options first)"""
+    chunks = export_chunks(engine, statement, format, compression, header, format_row, format_record)
+    filename = export_filename(filename_base, format, compression)
+    return StreamingResponse(
+        chunks,
+        media_type=media_type(format, compression),
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
@@ -0,0 +1,146 @@
+"""
+Group commit for high-volume inserts (contact form bursts).
+
+Request threads hand ORM objects to a single writer thread per engine and
+block until they are committed. The writer collects up to max_rows objects,
+waiting at most max_wait_ms after the first one, and commits them in one
+transaction. A burst of N submissions then costs about N / max_rows commits
+(fsyncs and SQLite write-lock acquisitions) instead of N.
+
+Objects come back detached but loaded (expire_on_commit=False), so callers can
+read their ids and defaults once submit() returns. A submit() that times out
+withdraws its object if the writer has not picked it up yet; otherwise it keeps
+waiting for the commit, so a timed-out request never leaves a row behind that
+a client retry would duplicate. Writes that must commit
+together with an object (rollups, events) go in its after_insert callback,
+which runs in the batch transaction once the object has its id.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Background thread that commits submitted objects in small batches"""
+
+    def __init__(self, engine: Engine, max_rows: int = 100, max_wait_ms: int = 10):
+        self.engine = engine
+        self.max_rows = max(1, max_rows)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, obj: Any, after_insert: Optional[Callable[[Session, Any], None]] = None,
+               timeout: float = 10.0) -> Any:
+        """
+        Queue `obj` for insertion and wait until it is committed; raises if the insert failed.
+        after_insert(session, obj) runs in the same transaction, after `obj` is flushed.
+        Raises TimeoutError only when `obj` was withdrawn unwritten.
+        """
+        future: Future = Future()
+        self._queue.put((obj, after_insert, future))
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise
+            # The writer already took it; its outcome is final, so wait for it
+            return future.result()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush whatever is queued and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[Any, Optional[Callable], Future]]) -> None:
+        # Drop objects whose submitter gave up; the rest can no longer be withdrawn
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            with Session(bind=self.engine, expire_on_commit=False) as session:
+                session.add_all([obj for obj, _, _ in batch])
+                session.flush()
+                for obj, after_insert, _ in batch:
+                    if after_insert:
+                        after_insert(session, obj)
+                session.commit()
+        except Exception:
+            # Retry one by one so a single bad row does not fail the whole batch
+            for obj, after_insert, future in batch:
+                self._flush_one(obj, after_insert, future)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for obj, _, future in batch:
+            future.set_result(obj)
+
+    def _flush_one(self, obj: Any, after_insert: Optional[Callable], future: Future) -> None:
+        try:
+            with Session(bind=self.engine, expire_on_commit=False) as session:
+                session.add(obj)
+                session.flush()
+                if after_insert:
+                    after_insert(session, obj)
+                session.commit()
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += 1
+        future.set_result(obj)
+
+
+_writers: Dict[int, GroupCommitWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(engine: Engine, max_rows: int = 100, max_wait_ms: int = 10) -> GroupCommitWriter:
+    """The shared writer for `engine`, started on first use"""
+    with _writers_lock:
+        writer = _writers.get(id(engine))
+        if writer is None:
+            writer = _writers[id(engine)] = GroupCommitWriter(engine, max_rows, max_wait_ms)
+        return writer
+
+
+def stop_all() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
@@ -0,0 +1,258 @@
+"""
+Background CSV import jobs.
+
+An import job runs the rows staged by an ImportSession through
+CSVImporter.import_leads from a background task, so large imports do not
+run inside the request. After every chunk the job row records how many
+staged rows are done, in the same transaction as the chunk itself, so a
+job whose worker dies can be requeued and continues after the last
+committed chunk. Cancellation is checked between chunks.
+
+A running job is leased to one worker: lease_owner names it and
+heartbeat_at is renewed every HEARTBEAT_SECONDS, also while a chunk is
+being written. Only a job whose heartbeat is older than STALE_AFTER is
+requeued, and every checkpoint first re-checks the lease in its own
+transaction, so a worker that lost its job rolls its chunk back instead of
+importing rows another worker imports too.
+"""
+import json
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from utils import import_sessions
+from utils.csv_importer import CSVImporter
+import models
+
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Running jobs without a heartbeat (queued jobs without any update) for this long are requeued
+STALE_AFTER = timedelta(minutes=5)
+
+# How often a running job's worker renews its lease
+HEARTBEAT_SECONDS = 30
+
+# Failed rows kept on the job row (the failed count stays exact)
+FAILED_ROWS_KEPT = 1000
+
+
+class LeaseLost(Exception):
+    """The job was requeued and claimed by another worker while this one ran it"""
+
+
+def _new_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _renew_lease(db: Session, job_id: int, owner: str) -> bool:
+    """Move the heartbeat forward if `owner` still holds the job (does not commit)"""
+    return db.query(models.ImportJob).filter(
+        models.ImportJob.id == job_id,
+        models.ImportJob.lease_owner == owner
+    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False) == 1
+
+
+def _heartbeat(engine: Engine, job_id: int, owner: str, stop: threading.Event) -> None:
+    """Renew the lease until `stop` is set; a renewal that fails is retried next beat"""
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            with Session(bind=engine) as db:
+                renewed = _renew_lease(db, job_id, owner)
+                db.commit()
+        except Exception:
+            continue
+        if not renewed:
+            return
+
+
+def job_to_dict(job: models.ImportJob) -> Dict:
+    rows_total = job.rows_total or 0
+    rows_done = job.rows_done or 0
+    percent = None
+    if job.status == COMPLETED:
+        percent = 100.0
+    elif rows_total:
+        percent = round(min(rows_done, rows_total) * 100.0 / rows_total, 1)
+
+    # Rate of the current run, so a resumed job is not credited with earlier runs
+    rate = None
+    eta_seconds = None
+    if job.status == RUNNING and job.started_at and job.updated_at:
+        elapsed = (job.updated_at - job.started_at).total_seconds()
+        done_this_run = rows_done - (job.rows_at_start or 0)
+        if elapsed > 0 and done_this_run > 0:
+            rate = done_this_run / elapsed
+            eta_seconds = round(max(rows_total - rows_done, 0) / rate)
+
+    return {
+        "id": job.id,
+        "import_session_id": job.import_session_id,
+        "duplicate_action": job.duplicate_action,
+        "status": job.status,
+        "cancel_requested": bool(job.cancel_requested),
+        "rows_total": rows_total,
+        "rows_done": rows_done,
+        "percent": percent,
+        "rows_per_second": round(rate, 1) if rate else None,
+        "eta_seconds": eta_seconds,
+        "imported": job.imported or 0,
+        "skipped": job.skipped or 0,
+        "failed": job.failed or 0,
+        "failed_rows": json.loads(job.failed_rows) if job.failed_rows else [],
+        "attempts": job.attempts or 0,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def _finish(db: Session, job: models.ImportJob, status: str, error: Optional[str] = None) -> None:
+    """Record the outcome and release the staged rows (commits)"""
+    job.status = status
+    job.error = error[:1000] if error else None
+    job.finished_at = datetime.utcnow()
+    job.lease_owner = None
+    session_error = error or ("Import was cancelled" if status == CANCELLED else None)
+    import_sessions.finish(db, job.import_session, error=session_error)
+    db.commit()
+
+
+def run_job(engine: Engine, job_id: int) -> None:
+    """Run a queued job from its last checkpoint until it finishes or is cancelled (runs as a background task)"""
+    owner = _new_owner()
+    with Session(bind=engine) as db:
+        now = datetime.utcnow()
+        claimed = db.query(models.ImportJob).filter(
+            models.ImportJob.id == job_id,
+            models.ImportJob.status == QUEUED
+        ).update({
+            "status": RUNNING,
+            "lease_owner": owner,
+            "heartbeat_at": now,
+            "started_at": now,
+            "updated_at": now,
+            "rows_at_start": models.ImportJob.rows_done,
+            "attempts": models.ImportJob.attempts + 1
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return
+
+        job = db.get(models.ImportJob, job_id)
+        if job.cancel_requested:
+            # Cancelled while its previous run was interrupted
+            _finish(db, job, CANCELLED)
+            return
+        cancelled = False
+
+        def on_chunk(rows_done: int, chunk: Dict) -> bool:
+            nonlocal cancelled
+            # Checked in the chunk's transaction: a lost lease rolls the chunk back
+            if not _renew_lease(db, job_id, owner):
+                raise LeaseLost()
+            job.rows_done = rows_done
+            job.imported += chunk["imported"]
+            job.skipped += chunk["skipped"]
+            job.failed += len(chunk["failed_rows"])
+            if chunk["failed_rows"]:
+                kept = json.loads(job.failed_rows or "[]")
+                if len(kept) < FAILED_ROWS_KEPT:
+                    job.failed_rows = json.dumps((kept + chunk["failed_rows"])[:FAILED_ROWS_KEPT])
+            db.flush()
+            # Read the flag from the database: the cancel request comes from another session
+            cancelled = bool(db.query(models.ImportJob.cancel_requested).filter(
+                models.ImportJob.id == job_id
+            ).scalar())
+            return not cancelled
+
+        stop = threading.Event()
+        threading.Thread(
+            target=_heartbeat, args=(engine, job_id, owner, stop), name=f"import-job-{job_id}-lease", daemon=True
+        ).start()
+        try:
+            CSVImporter(db).import_leads(
+                import_sessions.iter_rows(job.import_session),
+                job.duplicate_action,
+                resume_after=job.rows_done or 0,
+                on_chunk=on_chunk
+            )
+        except LeaseLost:
+            # Another worker runs the job now; leave it to that worker
+            db.rollback()
+            return
+        except Exception as e:
+            db.rollback()
+            _finish(db, job, FAILED, error=str(e))
+            return
+        finally:
+            stop.set()
+
+        _finish(db, job, CANCELLED if cancelled else COMPLETED)
+
+
+def start_in_thread(engine: Engine, job_id: int) -> None:
+    """Run a job on a daemon thread, for callers without BackgroundTasks (startup)"""
+    threading.Thread(target=run_job, args=(engine, job_id), name=f"import-job-{job_id}", daemon=True).start()
+
+
+def cancel(db: Session, job: models.ImportJob) -> None:
+    """
+    Cancel a job (commits). A queued job is cancelled at once; a running one
+    stops after its current chunk, keeping the chunks already committed.
+    """
+    cancelled = db.query(models.ImportJob).filter(
+        models.ImportJob.id == job.id,
+        models.ImportJob.status == QUEUED
+    ).update({"status": CANCELLED, "cancel_requested": True}, synchronize_session=False)
+    if cancelled:
+        db.refresh(job)
+        _finish(db, job, CANCELLED)
+        return
+    db.query(models.ImportJob).filter(models.ImportJob.id == job.id).update(
+        {"cancel_requested": True}, synchronize_session=False
+    )
+    db.commit()
+    db.refresh(job)
+
+
+def requeue_interrupted(db: Session) -> List[int]:
+    """
+    Put back in the queue running jobs whose lease lapsed (their worker stopped
+    heartbeating, e.g. it was restarted) and queued jobs nobody picked up;
+    returns their ids for the caller to run after committing. Each job is
+    requeued by one caller only, even across workers, and never while its
+    lease is still being renewed.
+    """
+    now = datetime.utcnow()
+    cutoff = now - STALE_AFTER
+    stale = db.query(models.ImportJob.id, models.ImportJob.status, models.ImportJob.lease_owner).filter(
+        ((models.ImportJob.status == RUNNING) & (models.ImportJob.heartbeat_at < cutoff)) |
+        ((models.ImportJob.status == QUEUED) & (models.ImportJob.updated_at < cutoff))
+    ).all()
+    requeued = []
+    for job_id, job_status, owner in stale:
+        if job_status == RUNNING:
+            # Only the lease that was seen lapsing, and only if it was not renewed since
+            still_stale = (models.ImportJob.lease_owner == owner) & (models.ImportJob.heartbeat_at < cutoff)
+        else:
+            still_stale = models.ImportJob.updated_at < cutoff
+        claimed = db.query(models.ImportJob).filter(
+            models.ImportJob.id == job_id,
+            models.ImportJob.status == job_status,
+            still_stale
+        ).update({"status": QUEUED, "lease_owner": None, "updated_at": now}, synchronize_session=False)
+        if claimed:
+            requeued.append(job_id)
+    return requeued
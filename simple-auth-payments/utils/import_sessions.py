@@ -0,0 +1,156 @@
+"""
+Two-phase CSV lead imports.
+
+/admin/leads/import/validate parses the upload once and stages the valid
+rows in an NDJSON file under settings.IMPORT_DIR: each line is the parsed
+lead plus its normalized keys and the existing lead it matched, so
+/admin/leads/import/execute only needs the ImportSession id and the chosen
+duplicate_action. Staged files are deleted once the session has run or its
+TTL has passed.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, Optional
+from sqlalchemy.orm import Session
+from config import settings
+from utils.csv_importer import CSVImporter
+import models
+
+
+READY = "ready"
+EXECUTING = "executing"
+EXECUTED = "executed"
+FAILED = "failed"
+EXPIRED = "expired"
+
+PREVIEW_ROWS = 10
+
+
+def import_dir() -> str:
+    os.makedirs(settings.IMPORT_DIR, exist_ok=True)
+    return settings.IMPORT_DIR
+
+
+def session_path(session_id: int) -> str:
+    return os.path.join(import_dir(), f"import_{session_id}.ndjson")
+
+
+def session_to_dict(import_session: models.ImportSession) -> Dict:
+    return {
+        "id": import_session.id,
+        "filename": import_session.filename,
+        "status": import_session.status,
+        "valid_rows": import_session.valid_rows or 0,
+        "invalid_rows": import_session.invalid_rows or 0,
+        "duplicate_count": import_session.duplicate_count or 0,
+        "error": import_session.error,
+        "created_at": import_session.created_at.isoformat() if import_session.created_at else None,
+        "executed_at": import_session.executed_at.isoformat() if import_session.executed_at else None,
+        "expires_at": import_session.expires_at.isoformat() if import_session.expires_at else None
+    }
+
+
+def stage(db: Session, importer: CSVImporter, user_id: int, filename: str, source: BinaryIO) -> Dict:
+    """
+    Parse and duplicate-check an upload into a new ImportSession (caller commits).
+    Returns {"session", "errors", "duplicates", "preview"}; raises UnicodeDecodeError
+    for non-UTF-8 input, leaving nothing on disk.
+    """
+    import_session = models.ImportSession(user_id=user_id, filename=filename, status=READY)
+    db.add(import_session)
+    db.flush()
+
+    final_path = session_path(import_session.id)
+    partial_path = final_path + ".part"
+    errors = []
+    duplicates = []
+    preview = []
+    valid_rows = 0
+    rows = importer.iter_leads(source, errors)
+    try:
+        with open(partial_path, "w", encoding="utf-8") as output:
+            while True:
+                batch = list(islice(rows, importer.CHUNK_SIZE))
+                if not batch:
+                    break
+                valid_rows += len(batch)
+                keys = importer.normalize_keys(batch)
+                matches, batch_duplicates = importer.match_and_report(batch, keys)
+                for lead, (email_norm, phone_norm), existing in zip(batch, keys, matches):
+                    record = {**lead, "email_norm": email_norm, "phone_norm": phone_norm, "existing": existing}
+                    output.write(json.dumps(record) + "\n")
+                duplicates.extend(batch_duplicates)
+                preview.extend(batch[:PREVIEW_ROWS - len(preview)])
+        os.replace(partial_path, final_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    import_session.file_path = final_path
+    import_session.valid_rows = valid_rows
+    import_session.invalid_rows = len(errors)
+    import_session.duplicate_count = len(duplicates)
+    import_session.expires_at = datetime.utcnow() + timedelta(minutes=settings.IMPORT_SESSION_TTL_MINUTES)
+    return {
+        "session": import_session,
+        "errors": errors,
+        "duplicates": {"count": len(duplicates), "duplicates": duplicates},
+        "preview": preview
+    }
+
+
+def is_expired(import_session: models.ImportSession) -> bool:
+    return import_session.status == EXPIRED or (
+        import_session.status == READY and import_session.expires_at <= datetime.utcnow()
+    )
+
+
+def claim(db: Session, import_session: models.ImportSession) -> bool:
+    """
+    Move a ready, unexpired session to executing (caller commits). Returns False
+    if it was already claimed, so a double-submitted execute runs it only once.
+    """
+    claimed = db.query(models.ImportSession).filter(
+        models.ImportSession.id == import_session.id,
+        models.ImportSession.status == READY,
+        models.ImportSession.expires_at > datetime.utcnow()
+    ).update({"status": EXECUTING}, synchronize_session=False)
+    db.refresh(import_session)
+    return claimed == 1
+
+
+def iter_rows(import_session: models.ImportSession) -> Iterator[Dict]:
+    """Staged leads in file order, ready for CSVImporter.import_leads"""
+    with open(import_session.file_path, encoding="utf-8") as staged:
+        for line in staged:
+            yield json.loads(line)
+
+
+def delete_session_file(import_session: models.ImportSession) -> None:
+    if import_session.file_path and os.path.exists(import_session.file_path):
+        os.remove(import_session.file_path)
+
+
+def finish(db: Session, import_session: models.ImportSession, error: Optional[str] = None) -> None:
+    """Mark an executing session executed (or failed) and drop its staged rows (caller commits)"""
+    delete_session_file(import_session)
+    import_session.status = FAILED if error else EXECUTED
+    import_session.error = error[:1000] if error else None
+    import_session.file_path = None
+    import_session.executed_at = datetime.utcnow()
+
+
+def cleanup_expired(db: Session) -> int:
+    """Delete staged rows of sessions past their TTL and mark them expired; returns the count (caller commits)"""
+    expired = db.query(models.ImportSession).filter(
+        models.ImportSession.status == READY,
+        models.ImportSession.expires_at <= datetime.utcnow()
+    ).all()
+    for import_session in expired:
+        delete_session_file(import_session)
+        import_session.status = EXPIRED
+        import_session.file_path = None
+    return len(expired)
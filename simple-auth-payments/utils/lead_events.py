@@ -0,0 +1,237 @@
+"""
+Lead activity events for the admin panel's live stream (/contacts/admin/events).
+
+Write paths call record() in their own transaction, which appends a row to
+lead_events. The table is the fan-out between gunicorn workers: each worker
+runs one poller thread that reads new rows and hands them to that worker's
+connected streams. A commit that recorded events wakes the local poller at
+once; events from other workers arrive within POLL_SECONDS.
+
+Event ids only ever increase (the table uses AUTOINCREMENT), so a client can
+resume with Last-Event-ID as long as the events are still retained.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import models
+
+
+LEAD_CREATED = "lead.created"
+STATUS_CHANGED = "lead.status_changed"
+ASSIGNED = "lead.assigned"
+NOTE_ADDED = "lead.note_added"
+RESUBMITTED = "lead.resubmitted"
+
+# Sent instead of events a stream can no longer deliver; the client reloads
+RESET = "reset"
+
+POLL_SECONDS = 1.0
+RETENTION = timedelta(days=1)
+REPLAY_LIMIT = 1000
+
+# Re-read events this far back each poll; on Postgres a lower id can commit after a higher one
+POLL_OVERLAP = timedelta(seconds=2)
+
+
+def _row(event_type: str, lead_id: int, salesman_id: Optional[int], data: Dict[str, Any], now: datetime) -> dict:
+    return {
+        "type": event_type,
+        "contact_request_id": lead_id,
+        "salesman_id": salesman_id,
+        "payload": json.dumps(data, default=str),
+        "created_at": now
+    }
+
+
+def record(db: Session, event_type: str, lead_id: int, salesman_id: Optional[int] = None, **data) -> None:
+    """
+    Append one event in the caller's transaction (does not commit).
+    salesman_id is the salesman the lead is assigned to (for lead.assigned, the
+    new one); salesmen only receive events for their own leads.
+    """
+    record_many(db, event_type, [(lead_id, salesman_id, data)])
+
+
+def record_many(db: Session, event_type: str, events: List[tuple]) -> None:
+    """Bulk form of record(); `events` holds (lead_id, salesman_id, data) tuples"""
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(models.LeadEvent), [
+        _row(event_type, lead_id, salesman_id, data, now) for lead_id, salesman_id, data in events
+    ])
+    if not db.info.get("lead_events_recorded"):
+        # Prune once per transaction
+        db.query(models.LeadEvent).filter(
+            models.LeadEvent.created_at < now - RETENTION
+        ).delete(synchronize_session=False)
+    db.info["lead_events_recorded"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_pollers(session: Session) -> None:
+    if session.info.pop("lead_events_recorded", False):
+        for bus in list(_buses.values()):
+            bus.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_events(session: Session) -> None:
+    session.info.pop("lead_events_recorded", None)
+
+
+def event_to_dict(lead_event) -> dict:
+    return {
+        "id": lead_event.id,
+        "type": lead_event.type,
+        "lead_id": lead_event.contact_request_id,
+        "salesman_id": lead_event.salesman_id,
+        "data": json.loads(lead_event.payload) if lead_event.payload else {},
+        "created_at": lead_event.created_at.isoformat()
+    }
+
+
+def visible_to(event_dict: dict, user: models.User) -> bool:
+    """Admins and accountants see every event; salesmen only events on leads assigned to them"""
+    return user.role != "salesman" or event_dict["salesman_id"] == user.id
+
+
+def latest_id(engine: Engine) -> int:
+    with Session(bind=engine) as session:
+        return session.query(models.LeadEvent.id).order_by(models.LeadEvent.id.desc()).limit(1).scalar() or 0
+
+
+def replay(engine: Engine, after_id: int, user: models.User, limit: int = REPLAY_LIMIT) -> Optional[List[dict]]:
+    """
+    Retained events after `after_id` that `user` may see, oldest first.
+    Returns None when the gap cannot be replayed: events after `after_id` have
+    already been pruned, or more than `limit` of them were missed (the client
+    must reload instead of resuming).
+    """
+    with Session(bind=engine) as session:
+        oldest = session.query(models.LeadEvent.id).order_by(models.LeadEvent.id).limit(1).scalar()
+        if oldest is not None and oldest > after_id + 1:
+            return None
+
+        query = session.query(models.LeadEvent).filter(models.LeadEvent.id > after_id)
+        if user.role == "salesman":
+            query = query.filter(models.LeadEvent.salesman_id == user.id)
+        missed = [event_to_dict(row) for row in query.order_by(models.LeadEvent.id).limit(limit + 1)]
+        return None if len(missed) > limit else missed
+
+
+class LeadEventBus:
+    """One poller thread per worker and engine, fanning new events out to subscribed streams"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._subscribers: Set[tuple] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._seen: deque = deque(maxlen=10000)
+        self._seen_ids: Set[int] = set()
+        self._since: Optional[datetime] = None
+        self._last_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a stream; call from the event loop that will read the queue"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=REPLAY_LIMIT)
+        with self._lock:
+            self._subscribers.add((queue, asyncio.get_running_loop()))
+            if self._thread is None:
+                self._prime()
+                self._thread = threading.Thread(target=self._run, name="lead-event-poller", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {entry for entry in self._subscribers if entry[0] is not queue}
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if not subscribers:
+                continue
+            try:
+                events = self._poll()
+            except Exception:
+                continue
+            for lead_event in events:
+                for queue, loop in subscribers:
+                    try:
+                        loop.call_soon_threadsafe(_offer, queue, lead_event)
+                    except RuntimeError:
+                        # Loop closed; the stream is gone
+                        self.unsubscribe(queue)
+
+    def _prime(self) -> None:
+        """Start from the current end of the log; events already committed are not streamed live"""
+        self._since = datetime.utcnow()
+        with Session(bind=self.engine) as session:
+            recent = session.query(models.LeadEvent.id).filter(
+                models.LeadEvent.created_at >= self._since - POLL_OVERLAP
+            ).all()
+        for (event_id,) in recent:
+            self._remember(event_id)
+        self._last_id = latest_id(self.engine)
+
+    def _remember(self, event_id: int) -> None:
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_ids.discard(self._seen[0])
+        self._seen.append(event_id)
+        self._seen_ids.add(event_id)
+
+    def _poll(self) -> List[dict]:
+        with Session(bind=self.engine) as session:
+            rows = session.query(models.LeadEvent).filter(
+                (models.LeadEvent.id > self._last_id) |
+                (models.LeadEvent.created_at >= self._since - POLL_OVERLAP)
+            ).order_by(models.LeadEvent.id).all()
+
+        fresh = []
+        for row in rows:
+            if row.id in self._seen_ids:
+                continue
+            self._remember(row.id)
+            fresh.append(event_to_dict(row))
+            self._last_id = max(self._last_id, row.id)
+        self._since = max([self._since] + [row.created_at for row in rows])
+        return fresh
+
+
+def _offer(queue: asyncio.Queue, lead_event: dict) -> None:
+    # A stream that stopped reading does not grow without bound: what it has
+    # queued is dropped and replaced by a reset, so the client reloads
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"id": lead_event["id"], "type": RESET})
+        return
+    queue.put_nowait(lead_event)
+
+
+_buses: Dict[int, LeadEventBus] = {}
+_buses_lock = threading.Lock()
+
+
+def bus_for(engine: Engine) -> LeadEventBus:
+    """The shared bus for `engine`, created on first use"""
+    with _buses_lock:
+        bus = _buses.get(id(engine))
+        if bus is None:
+            bus = _buses[id(engine)] = LeadEventBus(engine)
+        return bus
@@ -0,0 +1,254 @@
+"""
+Lead funnel rollups behind /admin/analytics/leads.
+
+Write paths that create a lead or change its status call record_* in their own
+transaction: status changes are appended to lead_status_changes and one
+lead_funnel_rollups row per (day, from_status, to_status, segment) is bumped.
+Reading a year of funnel data then only touches the rollup table.
+rebuild_funnel() recomputes the rollups from contact_requests and
+lead_status_changes (e.g. after imports that bypassed the hooks).
+"""
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Date, func, insert, literal, select, type_coerce, update
+from sqlalchemy.orm import Session
+import models
+from utils.analytics import bucket_start
+
+
+CREATED = "created"
+LEAD_STATUSES = ("new", "contacted", "qualified", "converted", "not_interested")
+DIMENSIONS = ("country", "referral_source", "language_preference", "num_locations")
+
+
+def _day_of(column):
+    return type_coerce(func.date(column), Date)
+
+
+def _segment(lead) -> tuple:
+    return tuple(getattr(lead, dimension) or "" for dimension in DIMENSIONS)
+
+
+def _bump(db: Session, day: date, from_status: str, to_status: str, segment: tuple, delta: int = 1) -> None:
+    """Add delta to one rollup row, creating it if needed (does not commit)"""
+    Rollup = models.LeadFunnelRollup
+    key = {"day": day, "from_status": from_status, "to_status": to_status, **dict(zip(DIMENSIONS, segment))}
+    # Concurrent first bumps can both insert; update just one matching row so none is counted twice
+    target = select(Rollup.id).where(*[getattr(Rollup, column) == value for column, value in key.items()]).limit(1)
+    result = db.execute(
+        update(Rollup)
+        .where(Rollup.id == target.scalar_subquery())
+        .values(count=Rollup.count + delta),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.execute(insert(Rollup).values(count=delta, **key))
+
+
+def record_lead_created(db: Session, lead: models.ContactRequest) -> None:
+    """Count a new lead in its initial status (does not commit)"""
+    created_at = lead.created_at or datetime.utcnow()
+    _bump(db, created_at.date(), CREATED, lead.status or "new", _segment(lead))
+
+
+def record_leads_created(db: Session, leads: Iterable[Dict]) -> None:
+    """
+    Bulk form of record_lead_created for imports (does not commit); `leads` are
+    column dicts with created_at, status and the segment columns.
+    """
+    created: Counter = Counter()
+    for lead in leads:
+        created_at = lead.get("created_at") or datetime.utcnow()
+        segment = tuple(lead.get(dimension) or "" for dimension in DIMENSIONS)
+        created[(created_at.date(), lead.get("status") or "new", segment)] += 1
+    for (day, status, segment), count in created.items():
+        _bump(db, day, CREATED, status, segment, count)
+
+
+def record_status_change(
+    db: Session,
+    lead: models.ContactRequest,
+    old_status: str,
+    new_status: str,
+    changed_by_id: Optional[int] = None
+) -> None:
+    """Log a status change and count it (does not commit)"""
+    record_status_changes(db, [(lead, old_status)], new_status, changed_by_id)
+
+
+def record_status_changes(db: Session, leads: Iterable, new_status: str, changed_by_id: Optional[int] = None) -> None:
+    """
+    Bulk form of record_status_change. `leads` holds (lead, old_status) pairs;
+    lead can be any row with id and the segment columns. Unchanged leads are skipped.
+    """
+    now = datetime.utcnow()
+    log = []
+    transitions: Counter = Counter()
+    for lead, old_status in leads:
+        old_status = old_status or "new"
+        if old_status == new_status:
+            continue
+        log.append({
+            "contact_request_id": lead.id,
+            "from_status": old_status,
+            "to_status": new_status,
+            "changed_by_id": changed_by_id,
+            "changed_at": now
+        })
+        transitions[(old_status, _segment(lead))] += 1
+
+    if not log:
+        return
+    db.execute(insert(models.LeadStatusChange), log)
+    for (old_status, segment), count in transitions.items():
+        _bump(db, now.date(), old_status, new_status, segment, count)
+
+
+def rebuild_funnel(db: Session) -> int:
+    """
+    Recompute all rollups from the source tables; returns the number of rollup rows (caller commits).
+    A lead's initial status is the from_status of its first logged change, or its
+    current status if it has never changed.
+    """
+    Rollup = models.LeadFunnelRollup
+    Lead = models.ContactRequest
+    Change = models.LeadStatusChange
+    segment = [func.coalesce(getattr(Lead, dimension), "") for dimension in DIMENSIONS]
+    columns = ["day", "from_status", "to_status", *DIMENSIONS, "count"]
+
+    db.query(Rollup).delete(synchronize_session=False)
+
+    first_change = select(
+        Change.contact_request_id,
+        func.min(Change.id).label("first_id")
+    ).group_by(Change.contact_request_id).subquery()
+    initial = db.query(Change.contact_request_id, Change.from_status).join(
+        first_change, Change.id == first_change.c.first_id
+    ).subquery()
+
+    created_day = _day_of(Lead.created_at)
+    initial_status = func.coalesce(initial.c.from_status, Lead.status, "new")
+    created = select(
+        created_day, literal(CREATED), initial_status, *segment, func.count(Lead.id)
+    ).select_from(Lead).outerjoin(
+        initial, initial.c.contact_request_id == Lead.id
+    ).group_by(created_day, initial_status, *segment)
+    db.execute(insert(Rollup).from_select(columns, created))
+
+    changed_day = _day_of(Change.changed_at)
+    changed = select(
+        changed_day, Change.from_status, Change.to_status, *segment, func.count(Change.id)
+    ).select_from(Change).join(
+        Lead, Lead.id == Change.contact_request_id
+    ).group_by(changed_day, Change.from_status, Change.to_status, *segment)
+    db.execute(insert(Rollup).from_select(columns, changed))
+
+    return db.query(Rollup).count()
+
+
+def _filtered(query, start: Optional[date], end: Optional[date], filters: Dict[str, str]):
+    Rollup = models.LeadFunnelRollup
+    if start:
+        query = query.filter(Rollup.day >= start)
+    if end:
+        query = query.filter(Rollup.day <= end)
+    for dimension, value in filters.items():
+        if value is not None:
+            query = query.filter(getattr(Rollup, dimension) == value)
+    return query
+
+
+def _stages(entered: Dict[str, int], leads: int) -> Dict:
+    return {
+        "leads": leads,
+        "stages": [
+            {
+                "status": lead_status,
+                "count": entered.get(lead_status, 0),
+                "rate": round(entered.get(lead_status, 0) / leads, 4) if leads else None
+            }
+            for lead_status in LEAD_STATUSES
+        ],
+        "conversion_rate": round(entered.get("converted", 0) / leads, 4) if leads else None
+    }
+
+
+def funnel(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    filters: Optional[Dict[str, str]] = None,
+    group_by: Optional[str] = None
+) -> Dict:
+    """
+    Leads created in the range and how many leads entered each status in the
+    range, overall or per value of one segment dimension (group_by).
+    """
+    Rollup = models.LeadFunnelRollup
+    group_columns = [getattr(Rollup, group_by)] if group_by else []
+    query = db.query(
+        *group_columns,
+        Rollup.from_status,
+        Rollup.to_status,
+        func.sum(Rollup.count)
+    )
+    query = _filtered(query, start, end, filters or {})
+    query = query.group_by(*group_columns, Rollup.from_status, Rollup.to_status)
+
+    leads: Counter = Counter()
+    entered: Dict[str, Counter] = {}
+    for row in query:
+        value = row[0] if group_by else ""
+        from_status, to_status, count = row[-3:]
+        if from_status == CREATED:
+            leads[value] += count or 0
+        entered.setdefault(value, Counter())[to_status] += count or 0
+
+    if not group_by:
+        return _stages(entered.get("", {}), leads[""])
+    return {
+        "group_by": group_by,
+        "groups": [
+            {"value": value, **_stages(entered[value], leads[value])}
+            for value in sorted(entered, key=lambda v: (-leads[v], v))
+        ]
+    }
+
+
+def funnel_series(
+    db: Session,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    filters: Optional[Dict[str, str]] = None
+) -> List[Dict]:
+    """New leads, status entries and from->to transitions per bucket"""
+    Rollup = models.LeadFunnelRollup
+    query = db.query(
+        Rollup.day,
+        Rollup.from_status,
+        Rollup.to_status,
+        func.sum(Rollup.count)
+    )
+    query = _filtered(query, start, end, filters or {})
+    query = query.group_by(Rollup.day, Rollup.from_status, Rollup.to_status)
+
+    buckets: Dict[date, Dict] = {}
+    for day, from_status, to_status, count in query:
+        period = bucket_start(day, granularity)
+        bucket = buckets.setdefault(period, {
+            "period": period.isoformat(),
+            "created": 0,
+            "entered": {},
+            "transitions": {}
+        })
+        count = count or 0
+        bucket["entered"][to_status] = bucket["entered"].get(to_status, 0) + count
+        if from_status == CREATED:
+            bucket["created"] += count
+        else:
+            transition = f"{from_status}->{to_status}"
+            bucket["transitions"][transition] = bucket["transitions"].get(transition, 0) + count
+
+    return [buckets[period] for period in sorted(buckets)]
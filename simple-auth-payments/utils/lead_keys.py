@@ -0,0 +1,182 @@
+"""
+Normalized lead identity keys used for duplicate detection.
+
+email_norm and phone_norm are stored on contact_requests (set on every ORM
+insert/update, see models.py) and indexed, so "have we seen this person?"
+is an index lookup for the submit form, the CSV importer and the merge tool.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+import models
+
+
+# Keys per IN (...) lookup; stays under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+_NON_DIGITS = re.compile(r"\D")
+
+# Mailbox providers that ignore dots and +tags in the local part
+_DOT_INSENSITIVE_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Lowercased, trimmed address; gmail dots and +tags removed"""
+    if not email:
+        return None
+    email = email.strip().lower()
+    local, at, domain = email.rpartition("@")
+    if not at or not local:
+        return email or None
+    if domain in _DOT_INSENSITIVE_DOMAINS:
+        local = local.split("+", 1)[0].replace(".", "")
+        domain = _DOT_INSENSITIVE_DOMAINS[domain]
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: Optional[str], country_code: Optional[str] = None) -> Optional[str]:
+    """
+    E.164 form (+<country code><national number>) of a form/CSV phone number.
+    Handles "+..." and "00..." international input, a leading trunk 0, and
+    national input that already repeats the country code. Returns None when
+    the result cannot be a valid E.164 number.
+    """
+    if not phone:
+        return None
+    raw = phone.strip()
+    digits = _NON_DIGITS.sub("", raw)
+    code = _NON_DIGITS.sub("", country_code or "")
+
+    if raw.startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]
+    else:
+        national = digits.lstrip("0")
+        # "966501234567" typed with +966 selected already includes the code
+        if code and national.startswith(code) and len(national) - len(code) >= 8:
+            national = national[len(code):]
+        number = code + national
+
+    if not 7 <= len(number) <= 15:
+        return None
+    return f"+{number}"
+
+
+def apply_keys(contact: models.ContactRequest) -> None:
+    """Set email_norm / phone_norm from the contact's current email and phone"""
+    contact.email_norm = normalize_email(contact.email)
+    contact.phone_norm = normalize_phone(contact.phone, contact.country_code)
+
+
+def find_existing(db: Session, email: Optional[str], phone: Optional[str], country_code: Optional[str] = None):
+    """Oldest lead sharing the normalized email or phone, or None"""
+    email_norm = normalize_email(email)
+    phone_norm = normalize_phone(phone, country_code)
+    conditions = []
+    if email_norm:
+        conditions.append(models.ContactRequest.email_norm == email_norm)
+    if phone_norm:
+        conditions.append(models.ContactRequest.phone_norm == phone_norm)
+    if not conditions:
+        return None
+    return db.query(models.ContactRequest).filter(or_(*conditions)).order_by(models.ContactRequest.id).first()
+
+
+def find_existing_many(db: Session, column, keys: Iterable[str], *fields) -> Dict[str, tuple]:
+    """
+    Oldest lead per key for many normalized keys at once, with chunked
+    IN (...) lookups on `column` (email_norm or phone_norm).
+    Returns {key: (id, *fields)}; keys with no lead are absent.
+    """
+    keys = sorted({key for key in keys if key})
+    found: Dict[str, tuple] = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        # Core select: ORM row handling costs more than the lookup on large imports
+        rows = db.execute(
+            select(column, models.ContactRequest.id, *fields)
+            .where(column.in_(keys[start:start + LOOKUP_CHUNK]))
+            .order_by(models.ContactRequest.id)
+        )
+        for key, *lead in rows:
+            found.setdefault(key, tuple(lead))
+    return found
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """
+    Compute keys for rows written before the columns existed; returns rows updated (commits per batch).
+    updated_at is kept as is: filling derived keys is not an edit to the lead.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            models.ContactRequest.id,
+            models.ContactRequest.email,
+            models.ContactRequest.phone,
+            models.ContactRequest.country_code
+        ).filter(
+            models.ContactRequest.email_norm.is_(None),
+            models.ContactRequest.id > last_id
+        ).order_by(models.ContactRequest.id).limit(batch_size).all()
+        if not rows:
+            return updated
+
+        table = models.ContactRequest.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("lead_id")).values(
+                email_norm=bindparam("email_norm"),
+                phone_norm=bindparam("phone_norm"),
+                # Without an explicit value the column's onupdate would stamp every row
+                updated_at=table.c.updated_at
+            ),
+            [
+                {
+                    "lead_id": row.id,
+                    "email_norm": normalize_email(row.email),
+                    "phone_norm": normalize_phone(row.phone, row.country_code)
+                }
+                for row in rows
+            ]
+        )
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def duplicate_groups(db: Session) -> List[List[int]]:
+    """
+    Lead ids that share an email_norm or phone_norm, grouped transitively
+    (A shares an email with B, B shares a phone with C -> one group).
+    Each group is sorted oldest first.
+    """
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(ids: Iterable[int]) -> None:
+        ids = list(ids)
+        root = find(ids[0])
+        for other in ids[1:]:
+            parent[find(other)] = root
+
+    for column in (models.ContactRequest.email_norm, models.ContactRequest.phone_norm):
+        duplicated = db.query(column).filter(column.isnot(None)).group_by(column).having(
+            func.count(models.ContactRequest.id) > 1
+        )
+        groups: Dict[str, List[int]] = {}
+        for key, lead_id in db.query(column, models.ContactRequest.id).filter(column.in_(duplicated)):
+            groups.setdefault(key, []).append(lead_id)
+        for ids in groups.values():
+            union(ids)
+
+    components: Dict[int, List[int]] = {}
+    for lead_id in parent:
+        components.setdefault(find(lead_id), []).append(lead_id)
+    return [sorted(ids) for ids in components.values() if len(ids) > 1]
@@ -0,0 +1,55 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key of the row it was
+taken from and the direction to page in. Following it seeks straight to that
+position through the (created_at, id) index instead of counting past OFFSET
+rows, so page 1000 costs the same as page 1.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import and_, or_
+
+
+NEXT = "next"
+PREV = "prev"
+
+
+def encode_cursor(created_at: datetime, row_id: int, direction: str) -> str:
+    payload = json.dumps({"c": created_at.isoformat(), "i": row_id, "d": direction}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """Decode a cursor into (created_at, id, direction); raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction = payload["d"]
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["c"]), int(payload["i"]), direction
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def seek(query, created_at_column, id_column, created_at: datetime, row_id: int, direction: str, newest_first: bool = True):
+    """
+    Restrict and order `query` to the rows after (NEXT) or before (PREV) the
+    cursor position in newest-first order (oldest-first with newest_first=False).
+    PREV pages come back in the opposite order; callers reverse them.
+    """
+    if (direction == NEXT) == newest_first:
+        position = or_(
+            created_at_column < created_at,
+            and_(created_at_column == created_at, id_column < row_id)
+        )
+        return query.filter(position).order_by(created_at_column.desc(), id_column.desc())
+
+    position = or_(
+        created_at_column > created_at,
+        and_(created_at_column == created_at, id_column > row_id)
+    )
+    return query.filter(position).order_by(created_at_column.asc(), id_column.asc())
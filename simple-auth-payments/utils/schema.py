@@ -0,0 +1,51 @@
+"""
+Lightweight schema upgrades for existing databases.
+
+Base.metadata.create_all() creates missing tables but never alters tables
+that already exist, so columns and indexes added to the models later are
+added here on startup.
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from database import Base
+
+
+# Optional SQL expression used to fill a newly added column on existing rows.
+# Columns not listed here are left NULL for existing rows.
+BACKFILLS: Dict[Tuple[str, str], str] = {
+    ("contact_requests", "duplicate_count"): "0",
+}
+
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    """Add model columns and indexes missing from existing tables"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                backfill = BACKFILLS.get((table.name, column.name))
+                if backfill:
+                    conn.execute(text(
+                        f'UPDATE {table.name} SET {column.name} = {backfill} WHERE {column.name} IS NULL'
+                    ))
+                changes.append(f"{table.name}.{column.name}")
+
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    changes.append(index.name)
+
+    return changes
@@ -0,0 +1,194 @@
+"""
+Full-text lead search backed by an SQLite FTS5 table.
+
+lead_search holds one row per lead (rowid = contact_requests.id) with the
+lead's name, email, phone, business name and the text of all its notes.
+Triggers on contact_requests and contact_notes keep it in sync inside the
+writing transaction, so application code never touches it directly.
+
+Arabic text is folded the same way on both sides: diacritics and tatweel are
+stripped and alef / yeh / teh marbuta variants are unified, so a query typed
+without harakat still matches names stored with them.
+
+On other databases search falls back to a (slower) LIKE scan.
+"""
+import re
+import threading
+from typing import Dict, List, Tuple
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import models
+
+
+TABLE = "lead_search"
+
+# Column weights for bm25 ranking, in table column order
+COLUMNS = ("name", "email", "phone", "business_name", "notes")
+WEIGHTS = (10.0, 6.0, 6.0, 4.0, 1.0)
+
+MAX_TERMS = 8
+
+# Arabic normalization: (character, replacement)
+ARABIC_FOLDS: Tuple[Tuple[str, str], ...] = (
+    ("آ", "ا"),  # alef with madda -> alef
+    ("أ", "ا"),  # alef with hamza above -> alef
+    ("إ", "ا"),  # alef with hamza below -> alef
+    ("ٱ", "ا"),  # alef wasla -> alef
+    ("ى", "ي"),  # alef maksura -> yeh
+    ("ة", "ه"),  # teh marbuta -> heh
+    ("ـ", ""),  # tatweel
+) + tuple((chr(code), "") for code in range(0x064B, 0x0653))  # harakat, shadda, sukun
+
+_ready: Dict[int, bool] = {}
+_ready_lock = threading.Lock()
+
+
+def normalize(value: str) -> str:
+    """Apply the Arabic folds used by the index to a Python string"""
+    for char, replacement in ARABIC_FOLDS:
+        value = value.replace(char, replacement)
+    return value
+
+
+def _fold_sql(expression: str) -> str:
+    """Wrap a SQL expression in the REPLACE() calls equivalent to normalize()"""
+    for char, replacement in ARABIC_FOLDS:
+        expression = f"replace({expression}, '{char}', '{replacement}')"
+    return expression
+
+
+def _document_select(id_expression: str) -> str:
+    """SELECT producing the lead_search row for the lead(s) matching id_expression"""
+    notes = (
+        "coalesce((SELECT group_concat(n.note_text, ' ') FROM contact_notes n "
+        "WHERE n.contact_request_id = c.id), '')"
+    )
+    columns = [
+        "c.id",
+        _fold_sql("c.first_name || ' ' || c.last_name"),
+        "c.email",
+        "c.country_code || c.phone || ' ' || c.phone",
+        _fold_sql("c.business_name"),
+        _fold_sql(notes)
+    ]
+    return f"SELECT {', '.join(columns)} FROM contact_requests c WHERE {id_expression}"
+
+
+def _reindex(id_expression: str) -> str:
+    return (
+        f"DELETE FROM {TABLE} WHERE rowid = {id_expression}; "
+        f"INSERT INTO {TABLE}(rowid, {', '.join(COLUMNS)}) {_document_select(f'c.id = {id_expression}')};"
+    )
+
+
+def _ddl() -> List[str]:
+    lead_columns = "first_name, last_name, email, phone, country_code, business_name"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        f"{', '.join(COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_lead_insert AFTER INSERT ON contact_requests BEGIN "
+        f"{_reindex('NEW.id')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_lead_update AFTER UPDATE OF {lead_columns} ON contact_requests BEGIN "
+        f"{_reindex('NEW.id')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_lead_delete AFTER DELETE ON contact_requests BEGIN "
+        f"DELETE FROM {TABLE} WHERE rowid = OLD.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_note_insert AFTER INSERT ON contact_notes BEGIN "
+        f"{_reindex('NEW.contact_request_id')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_note_update AFTER UPDATE ON contact_notes BEGIN "
+        f"{_reindex('OLD.contact_request_id')} {_reindex('NEW.contact_request_id')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLE}_note_delete AFTER DELETE ON contact_notes BEGIN "
+        f"{_reindex('OLD.contact_request_id')} END",
+    ]
+
+
+def is_supported(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """
+    Create the FTS table and triggers if missing (SQLite only).
+    A newly created index is backfilled from existing leads. Returns True if
+    the index was created. Cheap after the first call per engine.
+    """
+    if not is_supported(engine):
+        return False
+
+    with _ready_lock:
+        if _ready.get(id(engine)):
+            return False
+
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": TABLE}
+            ).first() is not None
+            for statement in _ddl():
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {TABLE}(rowid, {', '.join(COLUMNS)}) {_document_select('1 = 1')}"))
+
+        _ready[id(engine)] = True
+        return not exists
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Repopulate the index from contact_requests and contact_notes; returns the number of leads indexed (caller commits)"""
+    db.execute(text(f"DELETE FROM {TABLE}"))
+    db.execute(text(f"INSERT INTO {TABLE}(rowid, {', '.join(COLUMNS)}) {_document_select('1 = 1')}"))
+    db.execute(text(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')"))
+    return db.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar()
+
+
+def query_terms(q: str) -> List[str]:
+    """Normalized search terms from user input (letters and digits only)"""
+    return re.findall(r"\w+", normalize(q))[:MAX_TERMS]
+
+
+def _match_expression(terms: List[str]) -> str:
+    # Every term must match; each is a prefix query. Terms are \w+ so quoting is safe.
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_lead_ids(db: Session, q: str, current_user: models.User, limit: int) -> List[Tuple[int, float]]:
+    """Return [(lead id, score)] best match first; salesmen only get their assigned leads"""
+    terms = query_terms(q)
+    if not terms:
+        return []
+
+    if not is_supported(db.get_bind()):
+        return _like_search(db, terms, current_user, limit)
+
+    scope = ""
+    params = {"match": _match_expression(terms), "limit": limit}
+    if current_user.role == "salesman":
+        scope = "AND rowid IN (SELECT contact_request_id FROM lead_assignments WHERE salesman_id = :salesman_id)"
+        params["salesman_id"] = current_user.id
+
+    weights = ", ".join(str(weight) for weight in WEIGHTS)
+    rows = db.execute(text(
+        f"SELECT rowid, bm25({TABLE}, {weights}) AS score FROM {TABLE} "
+        f"WHERE {TABLE} MATCH :match {scope} ORDER BY score LIMIT :limit"
+    ), params).all()
+    # bm25 is lower-is-better; flip it so larger scores rank higher for clients
+    return [(row_id, round(-score, 4)) for row_id, score in rows]
+
+
+def _like_search(db: Session, terms: List[str], current_user: models.User, limit: int) -> List[Tuple[int, float]]:
+    """Portable fallback: every term must prefix-match one of the searchable lead columns"""
+    contact = models.ContactRequest
+    query = db.query(contact.id)
+    for term in terms:
+        pattern = f"{term}%"
+        query = query.filter(or_(
+            contact.first_name.ilike(pattern),
+            contact.last_name.ilike(pattern),
+            contact.email.ilike(pattern),
+            contact.phone.ilike(pattern),
+            contact.business_name.ilike(pattern)
+        ))
+    if current_user.role == "salesman":
+        query = query.join(models.LeadAssignment).filter(models.LeadAssignment.salesman_id == current_user.id)
+    rows = query.order_by(contact.created_at.desc()).limit(limit).all()
+    return [(row_id, 0.0) for row_id, in rows]
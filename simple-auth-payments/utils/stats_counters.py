@@ -0,0 +1,177 @@
+"""
+Incrementally maintained counters behind /admin/stats.
+
+Every write path that changes a user or payment calls one of the record_*
+helpers below in the same transaction as its own change, so the counters are
+committed (or rolled back) together with the data they describe. Reading the
+stats is then a single SELECT over a handful of rows.
+"""
+from typing import Dict
+from sqlalchemy import case, func, insert, literal, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+
+
+USERS_TOTAL = "users_total"
+USERS_ACTIVE = "users_active"
+PAYMENTS_TOTAL = "payments_total"
+PAYMENT_STATUS_PREFIX = "payments:"
+REVENUE_PREFIX = "revenue_cents:"
+LEADS_DUPLICATES = "leads_duplicates"
+
+# INSERT constructs with ON CONFLICT DO UPDATE, per dialect
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def payment_status_key(status: str) -> str:
+    return f"{PAYMENT_STATUS_PREFIX}{status or 'pending'}"
+
+
+def revenue_key(currency: str) -> str:
+    return f"{REVENUE_PREFIX}{(currency or 'usd').lower()}"
+
+
+def bump(db: Session, name: str, delta: int = 1) -> None:
+    """
+    Add delta to a counter inside the caller's transaction (does not commit).
+    A counter's first bump creates it; concurrent first bumps are merged by
+    the upsert instead of failing on the primary key.
+    """
+    if not delta:
+        return
+
+    upsert_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert_insert is not None:
+        db.execute(
+            upsert_insert(models.StatsCounter)
+            .values(name=name, value=delta)
+            .on_conflict_do_update(
+                index_elements=[models.StatsCounter.name],
+                set_={"value": models.StatsCounter.value + delta}
+            )
+        )
+        return
+
+    result = db.execute(
+        update(models.StatsCounter)
+        .where(models.StatsCounter.name == name)
+        .values(value=models.StatsCounter.value + delta)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(models.StatsCounter).values(name=name, value=delta))
+
+
+def record_user_created(db: Session, user: models.User) -> None:
+    bump(db, USERS_TOTAL)
+    if user.is_active is not False:
+        bump(db, USERS_ACTIVE)
+
+
+def record_user_deleted(db: Session, user: models.User) -> None:
+    bump(db, USERS_TOTAL, -1)
+    if user.is_active:
+        bump(db, USERS_ACTIVE, -1)
+
+
+def record_user_status_change(db: Session, was_active: bool, is_active: bool) -> None:
+    if bool(was_active) != bool(is_active):
+        bump(db, USERS_ACTIVE, 1 if is_active else -1)
+
+
+def record_payment_created(db: Session, payment: models.Payment) -> None:
+    bump(db, PAYMENTS_TOTAL)
+    bump(db, payment_status_key(payment.status))
+    if payment.status == "succeeded":
+        bump(db, revenue_key(payment.currency), payment.amount_cents)
+
+
+def record_payment_status_change(db: Session, payment: models.Payment, old_status: str, new_status: str) -> None:
+    if old_status == new_status:
+        return
+
+    bump(db, payment_status_key(old_status), -1)
+    bump(db, payment_status_key(new_status))
+    if new_status == "succeeded":
+        bump(db, revenue_key(payment.currency), payment.amount_cents)
+    elif old_status == "succeeded":
+        bump(db, revenue_key(payment.currency), -payment.amount_cents)
+
+
+def record_duplicate_lead(db: Session) -> None:
+    """A contact form submission was linked to an existing lead instead of creating one"""
+    bump(db, LEADS_DUPLICATES)
+
+
+def read_counters(db: Session) -> Dict[str, int]:
+    """Read all counters in one query"""
+    rows = db.query(models.StatsCounter.name, models.StatsCounter.value).all()
+    return {name: value or 0 for name, value in rows}
+
+
+def compute_exact(db: Session) -> Dict[str, int]:
+    """Recompute every counter from the source tables in a single aggregate query"""
+    users = select(
+        literal(USERS_TOTAL).label("name"),
+        func.count(models.User.id).label("value")
+    )
+    active_users = select(
+        literal(USERS_ACTIVE).label("name"),
+        func.coalesce(func.sum(case((models.User.is_active == True, 1), else_=0)), 0).label("value")
+    )
+    payments_by_status = select(
+        (literal(PAYMENT_STATUS_PREFIX) + func.coalesce(models.Payment.status, "pending")).label("name"),
+        func.count(models.Payment.id).label("value")
+    ).group_by(models.Payment.status)
+    revenue_by_currency = select(
+        (literal(REVENUE_PREFIX) + func.lower(func.coalesce(models.Payment.currency, "usd"))).label("name"),
+        func.sum(models.Payment.amount_cents).label("value")
+    ).where(models.Payment.status == "succeeded").group_by(func.lower(func.coalesce(models.Payment.currency, "usd")))
+    duplicate_leads = select(
+        literal(LEADS_DUPLICATES).label("name"),
+        func.coalesce(func.sum(models.ContactRequest.duplicate_count), 0).label("value")
+    )
+
+    counters: Dict[str, int] = {USERS_TOTAL: 0, USERS_ACTIVE: 0, PAYMENTS_TOTAL: 0}
+    for name, value in db.execute(union_all(users, active_users, payments_by_status, revenue_by_currency, duplicate_leads)):
+        counters[name] = counters.get(name, 0) + (value or 0)
+        if name.startswith(PAYMENT_STATUS_PREFIX):
+            counters[PAYMENTS_TOTAL] += value or 0
+    return counters
+
+
+def rebuild_counters(db: Session) -> Dict[str, int]:
+    """Replace the stored counters with freshly computed values (caller commits)"""
+    counters = compute_exact(db)
+    db.query(models.StatsCounter).delete(synchronize_session=False)
+    db.execute(insert(models.StatsCounter), [
+        {"name": name, "value": value} for name, value in counters.items()
+    ])
+    return counters
+
+
+def build_stats(counters: Dict[str, int]) -> Dict:
+    """Shape counters into the /admin/stats response"""
+    payments_by_status = {
+        name[len(PAYMENT_STATUS_PREFIX):]: value
+        for name, value in counters.items()
+        if name.startswith(PAYMENT_STATUS_PREFIX) and value
+    }
+    revenue_by_currency = {
+        name[len(REVENUE_PREFIX):]: value
+        for name, value in counters.items()
+        if name.startswith(REVENUE_PREFIX) and value
+    }
+    revenue_cents = sum(revenue_by_currency.values())
+
+    return {
+        "total_users": counters.get(USERS_TOTAL, 0),
+        "active_users": counters.get(USERS_ACTIVE, 0),
+        "total_payments": counters.get(PAYMENTS_TOTAL, 0),
+        "successful_payments": payments_by_status.get("succeeded", 0),
+        "total_revenue_cents": revenue_cents,
+        "total_revenue_usd": revenue_cents / 100,
+        "payments_by_status": payments_by_status,
+        "revenue_by_currency": revenue_by_currency,
+        "duplicate_leads": counters.get(LEADS_DUPLICATES, 0)
+    }